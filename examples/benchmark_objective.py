@@ -0,0 +1,47 @@
+import contextlib
+import os
+import time
+
+import numpy as np
+
+import simulation
+
+"""
+Description: Compares the time taken by a full run_model call against the objective-only fast path
+that the optimizer uses, for the same speed array [speed -> distance].
+"""
+
+
+def main(rounds=50):
+    simulation_model = simulation.Simulation(race_type="ASC")
+
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    full_times = np.empty(rounds)
+    objective_times = np.empty(rounds)
+
+    # the two paths are timed alternately and compared by their median, which filters out scheduling noise
+    for i in range(rounds):
+        # the full path prints its progress, which is part of its cost but would flood the benchmark output
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            full_distance = simulation_model.run_model(speed=input_speed, plot_results=False)
+            full_times[i] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        objective_distance = simulation_model.objective(speed=input_speed)
+        objective_times[i] = time.perf_counter() - start
+
+        assert full_distance == objective_distance, "objective() must match run_model()"
+
+    full_time = np.median(full_times)
+    objective_time = np.median(objective_times)
+
+    print(f"Distance travelled: {objective_distance:.2f}km\n"
+          f"run_model:  {full_time * 1000:.2f}ms per call\n"
+          f"objective:  {objective_time * 1000:.2f}ms per call\n"
+          f"Speedup:    {full_time / objective_time:.2f}x\n")
+
+
+if __name__ == "__main__":
+    main()
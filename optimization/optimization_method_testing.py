@@ -1,3 +1,4 @@
+import contextlib
 import datetime
 import functools
 import time as timer
@@ -6,6 +7,7 @@ import numpy as np
 from scipy.optimize import minimize, shgo, differential_evolution
 
 import simulation
+from simulation.common import helpers
 
 
 # TODO: make objective function take simulation_duration as argument
@@ -109,6 +111,56 @@ def negative_distance_from_speed_array(speed_kmh):
     return distance_travelled
 
 
+def negative_population_distances(speed_matrix, simulation_model, chunk_size=8, pool=None, workers=1):
+    """
+    Objective function for vectorized_differential_evolution_optimization, backed by the full simulation. The
+    population is simulated with the objective-only path of Simulation.objective, chunk_size speed profiles at a
+    time, so nothing is printed for every generation.
+
+    :param speed_matrix: (float[8][S]) S speed profiles (km/h) of 8 set-points each, one per column as scipy
+        passes the population in vectorized mode, or (float[8]) a single speed profile
+    :param simulation_model: Simulation object to evaluate the speed profiles with
+    :param chunk_size: maximum number of profiles simulated at once, which bounds memory usage
+    :param pool: optional pool created with helpers.make_worker_pool(simulation_model, workers), that the
+        population is split over
+    :param workers: number of worker processes of pool
+    :returns: (float[S]) negative distance travelled by each speed profile, or (float) for a single speed profile
+    """
+
+    speed_profiles = np.atleast_2d(np.transpose(speed_matrix))
+
+    if pool is None:
+        distances = _population_distances(simulation_model, speed_profiles, chunk_size)
+    else:
+        parts = [part for part in np.array_split(speed_profiles, workers) if len(part) > 0]
+        distances = np.concatenate(pool.starmap(_distances_in_worker, [(part, chunk_size) for part in parts]))
+
+    return -distances if np.ndim(speed_matrix) > 1 else -distances[0]
+
+
+def negative_distance_and_gradient(speed_kmh, simulation_model):
+    """
+    Objective function for gradient-based methods (use with jac=True), backed by the full simulation.
+
+    :param speed_kmh: (float[8]) speed set-points in km/h
+    :param simulation_model: Simulation object to evaluate the speed set-points with
+    :returns: tuple of the negative distance travelled (float) and its gradient (float[8])
+    """
+
+    distance_travelled, distance_gradient, _, _ = simulation_model.calculate_gradients(speed_kmh)
+
+    return -distance_travelled, -distance_gradient
+
+
+def _population_distances(simulation_model, speed_profiles, chunk_size):
+    return np.concatenate([simulation_model.objective(speed=speed_profiles[start:start + chunk_size])
+                           for start in range(0, len(speed_profiles), chunk_size)])
+
+
+def _distances_in_worker(speed_profiles, chunk_size):
+    return _population_distances(helpers.get_worker_object(), speed_profiles, chunk_size)
+
+
 def display_result(res):
     print(f"{res.message} \n")
     print(f"Optimal solution: {res.x.round(2)} \n")
@@ -187,6 +239,56 @@ def differential_evolution_optimization():
     return optimal_solution.x
 
 
+@timeit
+def vectorized_differential_evolution_optimization(race_type="ASC", workers=1, chunk_size=8, maxiter=1000, polish=True):
+    # Same search as differential_evolution_optimization, but against the full simulation, with the whole
+    # population of each generation evaluated in batched passes instead of one member at a time
+
+    max_speed = 104
+    bounds = [(20, max_speed), ] * 8
+
+    simulation_model = simulation.Simulation(race_type)
+
+    # forked workers inherit the Simulation (and its route and weather arrays) instead of a pickled copy
+    with helpers.make_worker_pool(simulation_model, workers) if workers > 1 else contextlib.nullcontext() as pool:
+        # vectorized evaluation requires the population to be updated once per generation
+        optimal_solution = differential_evolution(negative_population_distances, bounds=bounds,
+                                                  args=(simulation_model, chunk_size, pool, workers),
+                                                  disp=True, strategy="best1bin", atol=1e-2, mutation=(0.2, 0.5),
+                                                  popsize=15, recombination=0.9, maxiter=maxiter, polish=polish,
+                                                  vectorized=True, updating="deferred")
+
+    print(f"{optimal_solution.message} \n")
+    print(f"Optimal solution: {optimal_solution.x.round(2)} \n")
+    print(f"Average speed: {np.mean(optimal_solution.x).round(1)}km/h")
+    print(f"Maximum distance: {-optimal_solution.fun:.2f}km\n")
+
+    return optimal_solution.x
+
+
+@timeit
+def gradient_optimization(method="L-BFGS-B", initial_speed=40, race_type="ASC"):
+    # Uses the analytical gradient of the full simulation, which BFGS, L-BFGS-B and TNC otherwise
+    # have to approximate with finite differences over a function with many small jumps
+
+    max_speed = 104
+    bounds = [(20, max_speed), ] * 8
+
+    simulation_model = simulation.Simulation(race_type)
+
+    initial_guess = np.repeat(initial_speed, 8).astype(float)
+    optimal_solution = minimize(negative_distance_and_gradient, x0=initial_guess, args=(simulation_model,),
+                                jac=True, method=method, bounds=bounds, options={'disp': True})
+
+    print(f"{optimal_solution.message} \n")
+    print(f"Optimal solution: {optimal_solution.x.round(2)} \n")
+    print(f"Average speed: {np.mean(optimal_solution.x).round(1)}km/h")
+    print(f"Maximum distance: {-optimal_solution.fun:.2f}km")
+    print(f"Function evaluations: {optimal_solution.nfev}\n")
+
+    return optimal_solution.x
+
+
 @timeit
 def bfgs_optimization(initial_speed=0):
     # Result: does not work
@@ -22,7 +22,7 @@ setup(name='simulation',
           'simulation': ['py.typed'],
       },
       install_requires=[
-          'numpy', 'scipy', 'requests', 'polyline', 'tqdm', 'matplotlib', 'pandas', 'seaborn', 'numba', 'bayesian_optimization', 'timezonefinder', "python-dotenv"
+          'numpy', 'scipy', 'requests', 'polyline', 'tqdm', 'matplotlib', 'pandas', 'seaborn', 'numba', 'bayesian_optimization~=1.4.3', 'timezonefinder', "python-dotenv"
       ],
       extras_require={
         'mpi': [
@@ -38,4 +38,9 @@ setup(name='simulation',
       long_description=long_description,
       long_description_content_type='text/markdown',
       version="0.3a1",
+      entry_points={
+          'console_scripts': [
+              'simulation = simulation.cli:main',
+          ],
+      },
       )
\ No newline at end of file
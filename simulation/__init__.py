@@ -1,3 +1,5 @@
+import sys
+
 from simulation.common import Consumer
 from simulation.common import Producer
 from simulation.common import Storage
@@ -23,5 +25,6 @@ from simulation.main import Simulation
 
 __version__ = "0.3a1"
 
-print(f"Package 'simulation' imported. Version: {__version__}\n")
+# printed to stderr, so that the JSON output of the command-line interface (see cli.py) is the only output on stdout
+print(f"Package 'simulation' imported. Version: {__version__}\n", file=sys.stderr)
 
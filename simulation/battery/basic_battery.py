@@ -127,3 +127,32 @@ class BasicBattery(BaseBattery):
         voltage_array = self.calculate_voltage_from_discharge_capacity(discharge_capacity_array)
 
         return soc_array, voltage_array, stored_energy_array
+
+    def calculate_soc_derivative_array(self, cumulative_energy_array):
+        """
+        Calculates the derivative of the state of charge returned by update_array with respect to the cumulative
+        energy change at each time step. Where the stored energy is clipped (empty or full battery), the derivative
+        is 0.
+
+        :param cumulative_energy_array: a NumPy array containing the cumulative energy changes at each time step
+        experienced by the battery
+
+        :return: a NumPy array containing the derivative of the battery state of charge with respect to the
+        cumulative energy change (per J) at each time step
+        """
+
+        stored_energy_array = np.full_like(cumulative_energy_array, fill_value=self.stored_energy)
+        stored_energy_array += cumulative_energy_array / 3600
+
+        energy_discharged_array = self.max_energy_capacity - stored_energy_array
+
+        # derivative of calculate_discharge_capacity_from_energy
+        discharge_capacity_derivative = 2.32857 / (2 * np.sqrt(18747.06027 - 2.32857 * energy_discharged_array))
+        soc_derivative = self.calculate_soc_from_discharge_capacity.deriv()(0)
+
+        # stored energy (Wh) -> energy discharged -> discharge capacity -> state of charge
+        soc_derivative_array = soc_derivative * discharge_capacity_derivative * -1 / 3600
+
+        clipped = np.logical_or(stored_energy_array <= 0, stored_energy_array >= self.max_energy_capacity)
+
+        return np.where(clipped, 0, soc_derivative_array)
@@ -0,0 +1,217 @@
+"""
+Description: the `simulation` command-line interface. Every command runs headless, prints its result as a JSON
+object to stdout, with the time taken by every stage of the command, and prints the progress output of the
+simulation to stderr.
+
+    simulation run --speed 40 50 60
+    simulation sweep --speeds 30 40 50 60
+    simulation optimize --method plan
+    simulation profile --repeats 5
+"""
+
+import argparse
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+
+import numpy as np
+
+import simulation
+from simulation.main.SimulationServer import to_json
+
+
+def run(simulation_model, args, timings):
+    speed = np.array(args.speed, dtype=float)
+
+    with _timed(timings, "run"):
+        result = simulation_model.run_batch(speed[np.newaxis, :])
+
+    return {
+        "speed": speed,
+        "distance_travelled": result.distance_travelled[0],
+        "time_taken": result.time_taken[0],
+        "final_soc": result.final_soc[0],
+    }
+
+
+def sweep(simulation_model, args, timings):
+    speeds = np.array(args.speeds, dtype=float)
+
+    # every speed is held constant over the whole race
+    speed_matrix = np.repeat(speeds[:, np.newaxis], args.num_setpoints, axis=1)
+
+    with _timed(timings, "sweep"):
+        result = simulation_model.run_batch(speed_matrix, chunk_size=args.chunk_size)
+
+    return {
+        "speeds": speeds,
+        "distance_travelled": result.distance_travelled,
+        "time_taken": result.time_taken,
+        "final_soc": result.final_soc,
+        "best_speed": speeds[np.argmax(result.distance_travelled)],
+    }
+
+
+def optimize(simulation_model, args, timings):
+    if args.method == "plan":
+        with _timed(timings, "planner_setup"):
+            speed_planner = simulation.main.SpeedPlanner(simulation_model, segment_length=args.segment_length)
+
+        with _timed(timings, "optimize"):
+            plan = speed_planner.plan(objective=args.objective, target_distance=args.target_distance)
+
+        return {
+            "method": args.method,
+            "distance_travelled": plan.distance_travelled,
+            "time_taken": plan.time_taken,
+            "final_soc": plan.final_soc,
+            "segment_boundaries": plan.segment_boundaries,
+            "speeds": plan.speeds,
+            "departure_times": plan.departure_times,
+        }
+
+    with _timed(timings, "optimize"):
+        best_point, fidelity_report = simulation_model.optimize_multi_fidelity(
+            screening_points=args.screening_points, n_iter=args.n_iter, seed=args.seed)
+
+    return {
+        "method": args.method,
+        "distance_travelled": best_point["target"],
+        "speed": list(best_point["params"].values()),
+        "fidelity_report": fidelity_report,
+    }
+
+
+def profile(simulation_model, args, timings):
+    speed = np.array(args.speed, dtype=float)
+    speed_matrix = speed[np.newaxis, :]
+
+    # the first run includes compiling the numba functions
+    with _timed(timings, "first_run"):
+        simulation_model.run_batch(speed_matrix)
+
+    run_times = np.empty(args.repeats)
+    objective_times = np.empty(args.repeats)
+
+    for i in range(args.repeats):
+        start = time.perf_counter()
+        simulation_model.run_batch(speed_matrix)
+        run_times[i] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        simulation_model.objective(speed=speed)
+        objective_times[i] = time.perf_counter() - start
+
+    timings["run_median"] = np.median(run_times)
+    timings["objective_median"] = np.median(objective_times)
+
+    profiler = cProfile.Profile()
+    with _timed(timings, "profiled_run"):
+        profiler.runcall(simulation_model.run_batch, speed_matrix)
+
+    stats = pstats.Stats(profiler)
+    functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:args.top]
+
+    return {
+        "speed": speed,
+        "repeats": args.repeats,
+        "functions": [
+            {
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": calls,
+                "total_time": total_time,
+                "cumulative_time": cumulative_time,
+            }
+            for (filename, line, name), (_, calls, total_time, cumulative_time, _) in functions
+        ],
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="simulation", description="UBC Solar's simulation environment")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--race-type", default="ASC", choices=["ASC", "FSGP"])
+    common.add_argument("--tick", type=int, default=None,
+                        help="length of the simulation's time step in seconds, instead of the one in the settings")
+    common.add_argument("--quiet", action="store_true", help="do not print the progress of the simulation")
+    common.add_argument("--indent", type=int, default=2, help="indentation of the JSON output")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", parents=[common], help="simulate a single speed array")
+    run_parser.add_argument("--speed", type=float, nargs="+", default=[20] * 8,
+                            help="speed set-points in km/h, stretched over the simulation duration")
+    run_parser.set_defaults(function=run)
+
+    sweep_parser = subparsers.add_parser("sweep", parents=[common], help="simulate a range of constant speeds")
+    sweep_parser.add_argument("--speeds", type=float, nargs="+", default=list(range(20, 110, 10)),
+                              help="constant speeds to simulate, in km/h")
+    sweep_parser.add_argument("--num-setpoints", type=int, default=8)
+    sweep_parser.add_argument("--chunk-size", type=int, default=8,
+                              help="maximum number of speeds to simulate at once")
+    sweep_parser.set_defaults(function=sweep)
+
+    optimize_parser = subparsers.add_parser("optimize", parents=[common], help="find the best speeds")
+    optimize_parser.add_argument("--method", default="plan", choices=["plan", "multi-fidelity"],
+                                 help="dynamic programming SpeedPlanner, or Simulation.optimize_multi_fidelity")
+    optimize_parser.add_argument("--objective", default="distance", choices=["distance", "time"])
+    optimize_parser.add_argument("--target-distance", type=float, default=None, help="in km, for --objective time")
+    optimize_parser.add_argument("--segment-length", type=float, default=5000, help="in m, for --method plan")
+    optimize_parser.add_argument("--screening-points", type=int, default=2000, help="for --method multi-fidelity")
+    optimize_parser.add_argument("--n-iter", type=int, default=20, help="for --method multi-fidelity")
+    optimize_parser.add_argument("--seed", type=int, default=None, help="for --method multi-fidelity")
+    optimize_parser.set_defaults(function=optimize)
+
+    profile_parser = subparsers.add_parser("profile", parents=[common],
+                                           help="time the simulation and list the functions it spends time in")
+    profile_parser.add_argument("--speed", type=float, nargs="+", default=[20] * 8)
+    profile_parser.add_argument("--repeats", type=int, default=10)
+    profile_parser.add_argument("--top", type=int, default=15, help="number of functions to list")
+    profile_parser.set_defaults(function=profile)
+
+    return parser
+
+
+def main(argv=None):
+    start = time.perf_counter()
+    args = build_parser().parse_args(argv)
+
+    # nothing is shown, so plots must not open a window
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    timings = {}
+    stdout = sys.stdout
+
+    # the JSON result is the only output on stdout
+    with open(os.devnull, "w") if args.quiet else contextlib.nullcontext(sys.stderr) as progress_output, \
+            contextlib.redirect_stdout(progress_output):
+        with _timed(timings, "setup"):
+            simulation_model = simulation.Simulation(args.race_type)
+
+            if args.tick is not None:
+                simulation_model = simulation_model.with_fidelity(tick=args.tick)
+
+        result = args.function(simulation_model, args, timings)
+
+    timings["total"] = time.perf_counter() - start
+
+    result = dict(command=args.command, race_type=args.race_type, **result, timings=timings)
+
+    json.dump(to_json(result), stdout, indent=args.indent)
+    stdout.write("\n")
+
+
+@contextlib.contextmanager
+def _timed(timings, stage):
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from simulation.common.consumer import Consumer
 from simulation.common.producer import Producer
 from simulation.common.storage import Storage
-from simulation.common.exceptions import BatteryEmptyError
+from simulation.common.exceptions import BatteryEmptyError, SimulationServerError
 from simulation.common.helpers import timeit
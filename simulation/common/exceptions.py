@@ -7,3 +7,7 @@ Contains all the custom exceptions used in the simulation package
 
 class BatteryEmptyError(Exception):
     pass
+
+
+class SimulationServerError(Exception):
+    pass
@@ -1,11 +1,11 @@
 import functools
+import multiprocessing
 import numpy as np
 import time as timer
 import datetime
 from _datetime import datetime
 from _datetime import date
 
-from matplotlib import pyplot as plt
 from numba import jit, njit
 
 from simulation.common import constants
@@ -30,6 +30,43 @@ def timeit(func):
     return wrapper_timer
 
 
+# object held by the worker processes of a pool created with make_worker_pool
+_worker_object = None
+
+
+def _set_worker_object(worker_object):
+    global _worker_object
+    _worker_object = worker_object
+
+
+def get_worker_object():
+    """
+    Returns the object that make_worker_pool gave to this worker process. Functions that are mapped over the
+    pool call this to get it, so that only their arguments are sent to the workers with every task.
+    """
+
+    return _worker_object
+
+
+def make_worker_pool(worker_object, workers):
+    """
+    Creates a pool of worker processes that each hold worker_object, see get_worker_object. Where the platform
+    supports it, the pool is forked so every worker inherits worker_object, and the route and weather arrays it
+    refers to, instead of receiving a pickled copy.
+
+    :param worker_object: object the worker processes need, e.g. a Simulation object
+    :param workers: (int) number of worker processes
+    :returns: multiprocessing Pool object, to be used in a with statement
+    """
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+
+    return context.Pool(workers, initializer=_set_worker_object, initargs=(worker_object,))
+
+
 def date_from_unix_timestamp(unix_timestamp):
     return datetime.utcfromtimestamp(unix_timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
@@ -54,51 +91,158 @@ def checkForNonConsecutiveZeros(array, verbose=False):
         return True
 
 
-def reshape_and_repeat(input_array, reshape_length):
-    if input_array.size >= reshape_length:
-        print(f"Input array of shape {input_array.shape} was not reshaped\n")
+def reshape_and_repeat(input_array, reshape_length, verbose=True):
+    """
+    Stretches input_array along its last axis to reshape_length by repeating each element, padding the end with
+    the last element when reshape_length is not a multiple of the input length.
+
+    :param input_array: (float[M]) array to be stretched. May also be a 2D array (float[K][M]), in which case each
+        row is stretched independently.
+    :param reshape_length: (int) target length of the last axis
+    :param verbose: set to False to skip printing the reshape information
+    :returns: (float[reshape_length] or float[K][reshape_length]) stretched array
+    """
+
+    if input_array.shape[-1] >= reshape_length:
+        if verbose:
+            print(f"Input array of shape {input_array.shape} was not reshaped\n")
         return input_array
     else:
-        quotient_remainder_tuple = divmod(reshape_length, input_array.size)
-        temp = np.repeat(input_array, quotient_remainder_tuple[0])
-        result = np.append(temp, np.repeat(temp[-1], quotient_remainder_tuple[1]))
+        quotient_remainder_tuple = divmod(reshape_length, input_array.shape[-1])
+        temp = np.repeat(input_array, quotient_remainder_tuple[0], axis=-1)
+        result = np.append(temp, np.repeat(temp[..., -1:], quotient_remainder_tuple[1], axis=-1), axis=-1)
 
-        print(f"Reshaped input array from {input_array.shape} to {result.shape}\n")
+        if verbose:
+            print(f"Reshaped input array from {input_array.shape} to {result.shape}\n")
         return result
 
 
+def resume_cumsum(values, initial=None):
+    """
+    Cumulative sum of values, continued from the running total initial. The result is bit-for-bit identical to
+    the tail of the cumulative sum over the full array, since the additions happen in the same order. This lets a
+    cumulative sum be recomputed from a checkpoint instead of from the start of the array.
+
+    :param values: (float[M]) values to accumulate
+    :param initial: (float) running total before values[0], or None to start from zero
+    :returns: (float[M]) cumulative sums
+    """
+
+    if initial is None:
+        return np.cumsum(values)
+
+    return np.cumsum(np.concatenate(([initial], values)))[1:]
+
 
 def add_acceleration(input_array, acceleration):
     """
     Takes in the speed array with sudden speed changes and an acceleration scalar,
     return a speed array with constant acceleration / deceleration
-    :param input_array: (int[N]) input speed array (km/h)
+
+    The speed is rate-limited in a single pass: every element can differ from the previous (already limited)
+    element by at most the acceleration of one time step, so the result never overshoots a set-point.
+
+    :param input_array: (int[N]) input speed array (km/h). May also be a 2D array (int[K][N]) where each row
+        is a separate speed profile.
+    :param acceleration: (int) acceleration (km/h^2)
+    :return:speed array with acceleration (float[N] or float[K][N])
+    """
+    input_array = np.asarray(input_array, dtype=float)
+
+    # acceleration per second (kmh/s)
+    acceleration = abs(acceleration) / 3600
+
+    speed_profiles = np.ascontiguousarray(input_array.reshape(-1, input_array.shape[-1]))
+
+    return limit_rate_of_change(speed_profiles, acceleration).reshape(input_array.shape)
+
+
+@njit(cache=True)
+def limit_rate_of_change(input_array, max_change):
+    """
+    Limits the change between consecutive elements of each row of a 2D array to max_change, starting from
+    the first element of every row. Compiled with numba as it is inherently sequential.
+
+    :param input_array: (float[K][N]) rows of values to limit
+    :param max_change: (float) maximum absolute change between consecutive elements
+
+    :return: (float[K][N]) rate-limited copy of input_array
+    """
+    result = np.empty_like(input_array)
+
+    for row in range(input_array.shape[0]):
+        if input_array.shape[1] == 0:
+            continue
+
+        result[row, 0] = input_array[row, 0]
+
+        for i in range(1, input_array.shape[1]):
+            lower_bound = result[row, i - 1] - max_change
+            upper_bound = result[row, i - 1] + max_change
+            result[row, i] = min(max(input_array[row, i], lower_bound), upper_bound)
+
+    return result
+
+
+def get_acceleration_source_indices(input_array, acceleration):
+    """
+    Finds, for every element of the speed array returned by add_acceleration, the index of the input element that
+    it follows. An element that is not rate-limited follows itself, while an element that is rate-limited is the
+    previous element plus or minus a constant, so it follows the same input element as the previous one.
+
+    This is the Jacobian of add_acceleration: the derivative of output element i with respect to input element j is
+    1 if the source index of i is j, and 0 otherwise.
+
+    :param input_array: (int[N]) input speed array (km/h). May also be a 2D array (int[K][N]) where each row
+        is a separate speed profile.
     :param acceleration: (int) acceleration (km/h^2)
-    :return:speed array with acceleration (int[N])
+    :return: (int[N] or int[K][N]) index of the input element followed by each element of the output
     """
-    input_array = input_array.astype(float)
-    array_diff = np.diff(input_array)
-    array_index = np.where(array_diff != 0)
+    input_array = np.asarray(input_array, dtype=float)
 
     # acceleration per second (kmh/s)
     acceleration = abs(acceleration) / 3600
 
-    for i in array_index[0]:
-        # check if accelerate or decelerate
-        if array_diff[i] > 0:
-            while input_array[i] < input_array[i + 1] and i + 1 < len(input_array) - 1:
-                #print("i'm stuck in this if while loop")
-                input_array[i + 1] = input_array[i] + acceleration
-                i += 1
-
-        else:
-            while input_array[i] > input_array[i + 1] and i + 1 < len(input_array) - 1:
-                #print("i'm stuck in this else while loop")
-                input_array[i + 1] = input_array[i] - acceleration
-                i += 1
-
-    return input_array
- 
+    speed_profiles = np.ascontiguousarray(input_array.reshape(-1, input_array.shape[-1]))
+
+    return rate_of_change_source_indices(speed_profiles, acceleration).reshape(input_array.shape)
+
+
+@njit(cache=True)
+def rate_of_change_source_indices(input_array, max_change):
+    """
+    Companion of limit_rate_of_change that returns, for every limited element, the index of the input element whose
+    value it tracks.
+
+    :param input_array: (float[K][N]) rows of values to limit
+    :param max_change: (float) maximum absolute change between consecutive elements
+
+    :return: (int[K][N]) source index of every element of the rate-limited array
+    """
+    result = np.empty_like(input_array)
+    sources = np.empty(input_array.shape, dtype=np.int64)
+
+    for row in range(input_array.shape[0]):
+        if input_array.shape[1] == 0:
+            continue
+
+        result[row, 0] = input_array[row, 0]
+        sources[row, 0] = 0
+
+        for i in range(1, input_array.shape[1]):
+            lower_bound = result[row, i - 1] - max_change
+            upper_bound = result[row, i - 1] + max_change
+
+            if lower_bound <= input_array[row, i] <= upper_bound:
+                result[row, i] = input_array[row, i]
+                sources[row, i] = i
+            else:
+                result[row, i] = min(max(input_array[row, i], lower_bound), upper_bound)
+                sources[row, i] = sources[row, i - 1]
+
+    return sources
+
+
 def hour_from_unix_timestamp(unix_timestamp):
     val = datetime.utcfromtimestamp(unix_timestamp)
     return val.hour
@@ -111,10 +255,10 @@ def adjust_timestamps_to_local_times(timestamps, starting_drive_time, time_zones
 
     :param timestamps: (int[N]) timestamps starting from 0, in seconds
     :param starting_drive_time: (int[N]) local time that the car was start to be driven in UNIX time (Daylight Saving included)
-    :param time_zones: (int[N])
+    :param time_zones: (int[N]) or (int[K][N]) for a batch of K speed profiles
     """
 
-    return np.array(timestamps + starting_drive_time - (time_zones[0] - time_zones), dtype=np.uint64)
+    return np.array(timestamps + starting_drive_time - (time_zones[..., :1] - time_zones), dtype=np.uint64)
 
 
 def calculate_path_distances(coords):
@@ -153,6 +297,89 @@ def calculate_path_distances(coords):
 
     return path_distances
 
+def calculate_path_bearings(coords):
+    """
+    Calculates the initial great-circle bearing from every coordinate to the next one.
+    https://www.movable-type.co.uk/scripts/latlong.html
+
+    :param coords: A NumPy array [n][latitude, longitude]. May also be a batch of paths [k][n][latitude, longitude].
+
+    :returns bearings: a NumPy array [n][bearings] in degrees (0 - 360, clockwise from north). The last
+        coordinate has no next coordinate, so it takes the bearing of the second last coordinate.
+    """
+
+    coords = np.radians(coords)
+
+    lat_1 = coords[..., :-1, 0]
+    lat_2 = coords[..., 1:, 0]
+    diff_lng = coords[..., 1:, 1] - coords[..., :-1, 1]
+
+    y = np.sin(diff_lng) * np.cos(lat_2)
+    x = np.cos(lat_1) * np.sin(lat_2) - np.sin(lat_1) * np.cos(lat_2) * np.cos(diff_lng)
+
+    theta = np.arctan2(y, x)
+
+    bearings = ((theta * 180) / np.pi + 360) % 360
+
+    return np.concatenate((bearings, bearings[..., -1:]), axis=-1)
+
+
+def calculate_path_midpoints(cumulative_path_distances):
+    """
+    Calculates the distance from the starting point at which the vehicle is equally far from two consecutive
+    path coordinates. A vehicle that has travelled further than midpoints[i] is closer to coordinate i + 1
+    than to coordinate i.
+
+    :param cumulative_path_distances: (float[N]) cumulative distances of each path coordinate from the start
+
+    :returns: (float[N-1]) the midpoint distances between every pair of consecutive coordinates
+    """
+
+    return (cumulative_path_distances[:-1] + cumulative_path_distances[1:]) / 2
+
+
+def calculate_closest_indices(cumulative_distances, path_midpoints):
+    """
+    Maps every distance travelled to the index of the closest path coordinate, using the midpoints
+    between consecutive coordinates (see calculate_path_midpoints()).
+
+    Since the midpoints are sorted, a single binary search per distance replaces walking along the path.
+
+    :param cumulative_distances: (float[N] or float[K][N]) distances from the starting point. May be a 2D array
+        where each row is a separate speed profile.
+    :param path_midpoints: (float[M]) sorted midpoint distances of the path
+
+    :returns: (int[N] or int[K][N]) indices of the closest coordinates, capped at M - 1
+    """
+
+    closest_indices = np.searchsorted(path_midpoints, cumulative_distances, side="left")
+
+    return np.minimum(closest_indices, max(len(path_midpoints) - 1, 0))
+
+
+def find_nearest_sorted_indices(sorted_values, values):
+    """
+    Returns the index of the element of sorted_values that is nearest to each element of values. When a value is
+    exactly halfway between two elements, the earlier element is chosen (same as np.argmin of the differences).
+
+    :param sorted_values: (float[T]) array sorted in ascending order
+    :param values: (float[N]) values to look up, may have any shape
+
+    :returns: (int[N]) indices into sorted_values, with the same shape as values
+    """
+
+    if len(sorted_values) == 1:
+        return np.zeros(np.shape(values), dtype=np.intp)
+
+    right_indices = np.clip(np.searchsorted(sorted_values, values, side="left"), 1, len(sorted_values) - 1)
+    left_indices = right_indices - 1
+
+    left_differences = np.abs(values - sorted_values[left_indices])
+    right_differences = np.abs(sorted_values[right_indices] - values)
+
+    return np.where(left_differences <= right_differences, left_indices, right_indices)
+
+
 def get_array_directional_wind_speed(vehicle_bearings, wind_speeds, wind_directions):
     """
     Returns the array of wind speed in m/s, in the direction opposite to the
@@ -0,0 +1,102 @@
+import numpy as np
+
+"""
+Description: contains vectorized time helper functions. These operate on whole arrays of UNIX timestamps
+(uint64, int or datetime64) at once, instead of converting every timestamp with datetime.utcfromtimestamp().
+
+Note: the simulation stores local times as UNIX timestamps that have already been shifted by the local time zone
+(see helpers.adjust_timestamps_to_local_times), so the UTC calendar fields of these timestamps are the local
+calendar fields.
+"""
+
+
+def to_datetime64(unix_timestamps):
+    """
+    Converts an array of UNIX timestamps (in seconds) to a NumPy datetime64[s] array.
+
+    :param unix_timestamps: (int[N]) UNIX timestamps in seconds, or a datetime64 array
+
+    :returns: (datetime64[s][N]) array of datetimes, with the same shape as unix_timestamps
+    """
+
+    unix_timestamps = np.asarray(unix_timestamps)
+
+    if np.issubdtype(unix_timestamps.dtype, np.datetime64):
+        return unix_timestamps.astype("datetime64[s]")
+
+    return unix_timestamps.astype(np.int64).astype("datetime64[s]")
+
+
+def get_local_date(unix_timestamps):
+    """
+    Returns the calendar date of every timestamp.
+
+    :param unix_timestamps: (int[N]) UNIX timestamps in seconds, or a datetime64 array
+
+    :returns: (datetime64[D][N]) array of dates
+    """
+
+    return to_datetime64(unix_timestamps).astype("datetime64[D]")
+
+
+def get_day_of_year(unix_timestamps):
+    """
+    Returns the day of the year of every timestamp, with January 1 being day 1.
+
+    :param unix_timestamps: (int[N]) UNIX timestamps in seconds, or a datetime64 array
+
+    :returns: (int[N]) array of days of the year
+    """
+
+    datetimes = to_datetime64(unix_timestamps)
+
+    days = datetimes.astype("datetime64[D]")
+    years = datetimes.astype("datetime64[Y]").astype("datetime64[D]")
+
+    return (days - years).astype(np.int64) + 1
+
+
+def get_seconds_since_midnight(unix_timestamps):
+    """
+    Returns the number of seconds elapsed since midnight for every timestamp.
+
+    :param unix_timestamps: (int[N]) UNIX timestamps in seconds, or a datetime64 array
+
+    :returns: (int[N]) array of seconds since midnight
+    """
+
+    datetimes = to_datetime64(unix_timestamps)
+
+    return (datetimes - datetimes.astype("datetime64[D]")).astype(np.int64)
+
+
+def get_hour_of_day(unix_timestamps):
+    """
+    Returns the hour of the day (0 - 23) of every timestamp. Vectorized equivalent of
+    helpers.hour_from_unix_timestamp().
+
+    :param unix_timestamps: (int[N]) UNIX timestamps in seconds, or a datetime64 array
+
+    :returns: (int[N]) array of hours
+    """
+
+    return get_seconds_since_midnight(unix_timestamps) // 3600
+
+
+def get_day_of_year_and_local_hour(unix_timestamps):
+    """
+    Vectorized equivalent of converting every timestamp with datetime.utcfromtimestamp() and
+    helpers.get_day_of_year().
+
+    :param unix_timestamps: (int[N]) local times in UNIX seconds (timestamps that have already been adjusted
+        to the local time zone, as returned by adjust_timestamps_to_local_times())
+
+    :returns: a tuple of (day_of_year, local_hour) arrays, both the same shape as unix_timestamps
+        - day_of_year: (int[N]) the day of the year, with January 1 being day 1
+        - local_hour: (float[N]) the local time in hours from midnight, including minutes and seconds
+    """
+
+    hours, seconds_past_hour = np.divmod(get_seconds_since_midnight(unix_timestamps), 3600)
+    local_hour = hours + seconds_past_hour / 3600
+
+    return get_day_of_year(unix_timestamps), local_hour
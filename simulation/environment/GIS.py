@@ -1,5 +1,4 @@
 import json
-import math
 import os
 import sys
 
@@ -8,9 +7,6 @@ import polyline
 import requests
 import datetime
 import pytz
-from matplotlib import pyplot as plt
-from timezonefinder import TimezoneFinder
-from tqdm import tqdm
 
 from data.route.__init__ import route_directory
 from simulation.common import helpers
@@ -90,6 +86,24 @@ class GIS:
         self.path_gradients = helpers.calculate_path_gradients(self.path_elevations,
                                                                self.path_distances)
 
+        # bearings only depend on the route, so they are computed once here
+        self.path_bearings = helpers.calculate_path_bearings(self.path)
+
+    @property
+    def path_distances(self):
+        """
+        Returns the N-1 distances between consecutive path coordinates. Setting this attribute also refreshes
+        the cumulative path distances and the midpoint table used by calculate_closest_gis_indices().
+        """
+
+        return self._path_distances
+
+    @path_distances.setter
+    def path_distances(self, path_distances):
+        self._path_distances = path_distances
+        self.cumulative_path_distances = np.cumsum(path_distances)
+        self.path_midpoints = helpers.calculate_path_midpoints(self.cumulative_path_distances)
+
     def calculate_closest_gis_indices(self, cumulative_distances):
         """
         Takes in an array of point distances from starting point, returns a list of 
@@ -97,36 +111,13 @@ class GIS:
         closest to the point distances
 
         :param cumulative_distances: (float[N]) array of distances,
-        where cumulative_distances[x] > cumulative_distances[x-1]
-        
-        :returns: (float[N]) array of indices of path
-        """
-
-        current_coordinate_index = 0
-        result = []
-
-        path_distances = self.path_distances.copy()
-        cumulative_path_distances = np.cumsum(path_distances)
-        cumulative_path_distances[::2] *= -1
-        average_distances = np.abs(np.diff(cumulative_path_distances) / 2)
-
-        with tqdm(total=len(cumulative_distances), file=sys.stdout, desc="Calculating closest GIS indices") as pbar:
-            for distance in np.nditer(cumulative_distances):
-                if distance > average_distances[current_coordinate_index]:
-                    if current_coordinate_index > len(average_distances) - 1:
-                        current_coordinate_index = len(average_distances) - 1
-                    else:
-                        current_coordinate_index += 1
-                        if current_coordinate_index > len(average_distances) - 1:
-                            current_coordinate_index = len(average_distances) - 1
-
-                result.append(current_coordinate_index)
+        where cumulative_distances[x] > cumulative_distances[x-1]. May also be a 2D array (float[K][N]) where
+        each row is the cumulative distance of a separate speed profile.
 
-                pbar.update(1)
-
-        print()
+        :returns: (int[N]) array of indices of path, or (int[K][N]) for a 2D input
+        """
 
-        return np.array(result)
+        return helpers.calculate_closest_indices(cumulative_distances, self.path_midpoints)
 
     def calculate_time_zones(self, coords):
         """
@@ -137,6 +128,9 @@ class GIS:
         :returns time_diff: (float[N]) array of time differences in seconds
         """
 
+        # timezonefinder is slow to import and only needed when the route is updated
+        from timezonefinder import TimezoneFinder
+
         timezones_return = np.zeros(len(coords))
 
         tf = TimezoneFinder()
@@ -350,31 +344,14 @@ class GIS:
 
     def calculate_current_heading_array(self):
         """
-        Calculates the bearing of the vehicle between consecutive points
+        Returns the bearing of the vehicle between consecutive points, in degrees. The bearings are
+        calculated once per route when the GIS object is initialised (see helpers.calculate_path_bearings).
         https://www.movable-type.co.uk/scripts/latlong.html
-        """
-        bearing_array = np.zeros(len(self.path))
-
-        for index in range(0, len(self.path) - 1):
-            coord_1 = np.radians(self.path[index])
-            coord_2 = np.radians(self.path[index + 1])
-
-            y = math.sin(coord_2[1] - coord_1[1]) \
-                * math.cos(coord_2[0])
 
-            x = math.cos(coord_1[0]) \
-                * math.sin(coord_2[0]) \
-                - math.sin(coord_1[0]) \
-                * math.cos(coord_2[0]) \
-                * math.cos(coord_2[1] - coord_1[1])
-
-            theta = math.atan2(y, x)
-
-            bearing_array[index] = ((theta * 180) / math.pi + 360) % 360
-
-        bearing_array[-1] = bearing_array[-2]
+        :returns: (float[N]) array of bearings at every point of the path
+        """
 
-        return bearing_array
+        return self.path_bearings
 
     def update_vehicle_position(self, incremental_distance):
         """
@@ -422,6 +399,8 @@ class GIS:
         modified_elevations = self.bump_elevations(stop_array=stop_array_y3, elevations=elevations)
 
         if show_plot:
+            from matplotlib import pyplot as plt
+
             x1 = np.arange(0.0, len(not_charge), 1)
             y1 = np.array(not_charge)
 
@@ -6,11 +6,8 @@ A class to perform calculation and approximations for obtaining quantities
     such as solar time, solar position, and the various types of solar irradiance.
 """
 
-import datetime
 import numpy as np
-from simulation.common import helpers
-from tqdm import tqdm
-import sys
+from simulation.common import helpers, time_utils
 
 
 class SolarCalculations:
@@ -158,6 +155,78 @@ class SolarCalculations:
 
     # ----- Calculation of modes of solar irradiance -----
 
+    def calculate_solar_irradiance(self, latitude, longitude, time_zone_utc, day_of_year,
+                                   local_time, elevation=0, cloud_cover=0, return_intermediates=False):
+        """
+        Calculates the solar position and all modes of solar irradiance in a single pass. The declination
+        angle, Equation of Time, hour angle and zenith angle are each computed exactly once per sample and
+        shared by the DNI, DHI and GHI calculations. calculate_DNI(), calculate_DHI() and calculate_GHI()
+        all delegate to this method.
+
+        latitude: The latitude of a location on Earth
+        longitude: The longitude of a location on Earth
+        time_zone_utc: The UTC time zone of your area in seconds of UTC offset.
+        day_of_year: The number of the day of the current year, with January 1
+            being the first day of the year.
+        local_time: The local time in hours from midnight. (Adjust for Daylight Savings)
+        elevation: The local elevation of a location in metres
+        cloud_cover: The percentage cloud cover, from 0 to 100
+        return_intermediates: if True, returns a dictionary of every intermediate quantity instead of only
+            the Global Horizontal Irradiance
+
+        note: If local time and time_zone_utc are both unadjusted for Daylight Savings, the
+                calculation will end up just the same
+
+        Returns: The Global Horizontal Irradiance in W/m2, or if return_intermediates is True, a dictionary with
+            the keys "declination_angle", "eot", "hour_angle", "elevation_angle", "zenith_angle" (all in degrees,
+            except for the EoT correction which is in minutes), "DNI", "DHI" and "GHI" (in W/m2)
+        """
+
+        # ----- Solar position -----
+
+        declination_angle = helpers.calculate_declination_angle(day_of_year)
+
+        lst = helpers.local_time_to_apparent_solar_time(time_zone_utc / 3600, day_of_year, local_time, longitude)
+        hour_angle = 15 * (lst - 12)
+
+        elevation_angle = helpers.compute_elevation_angle_math(declination_angle, hour_angle, latitude)
+        zenith_angle = 90 - elevation_angle
+
+        # ----- Solar irradiance -----
+
+        a = 0.14
+
+        # air_mass = 1 / (math.cos(math.radians(zenith_angle)) + \
+        #            0.50572*pow((96.07995 - zenith_angle), -1.6364))
+
+        cos_zenith_angle = np.cos(np.radians(zenith_angle))
+
+        air_mass = np.float_(1) / np.float_(cos_zenith_angle)
+        with np.errstate(over="ignore"):
+            DNI = self.S_0 * ((1 - a * elevation * 0.001) * np.power(np.power(0.7, air_mass),
+                                                                 0.678) + a * elevation * 0.001)
+        DNI = np.where(zenith_angle > 90, 0, DNI)
+
+        DHI = 0.1 * DNI
+
+        cloud_cover_correction_factor = 1 - (cloud_cover / 100)
+        GHI = DNI * cos_zenith_angle + DHI
+        GHI = cloud_cover_correction_factor * GHI
+
+        if return_intermediates:
+            return {
+                "declination_angle": declination_angle,
+                "eot": helpers.calculate_eot_correction(day_of_year),
+                "hour_angle": hour_angle,
+                "elevation_angle": elevation_angle,
+                "zenith_angle": zenith_angle,
+                "DNI": DNI,
+                "DHI": DHI,
+                "GHI": GHI,
+            }
+
+        return GHI
+
     def calculate_DNI(self, latitude, longitude, time_zone_utc, day_of_year,
                       local_time, elevation):
         """
@@ -179,18 +248,8 @@ class SolarCalculations:
         Returns: The Direct Normal Irradiance in W/m2
         """
 
-        zenith_angle = self.calculate_zenith_angle(latitude, longitude,
-                                                   time_zone_utc, day_of_year, local_time)
-        a = 0.14
-
-        # air_mass = 1 / (math.cos(math.radians(zenith_angle)) + \
-        #            0.50572*pow((96.07995 - zenith_angle), -1.6364))
-
-        air_mass = np.float_(1) / np.float_(np.cos(np.radians(zenith_angle)))
-        with np.errstate(over="ignore"):
-            DNI = self.S_0 * ((1 - a * elevation * 0.001) * np.power(np.power(0.7, air_mass),
-                                                                 0.678) + a * elevation * 0.001)
-        return np.where(zenith_angle > 90, 0, DNI)
+        return self.calculate_solar_irradiance(latitude, longitude, time_zone_utc, day_of_year,
+                                               local_time, elevation, return_intermediates=True)["DNI"]
 
     def calculate_DHI(self, latitude, longitude, time_zone_utc, day_of_year,
                       local_time, elevation):
@@ -213,12 +272,8 @@ class SolarCalculations:
         Returns: The Diffuse Horizontal Irradiance in W/m2
         """
 
-        DNI = self.calculate_DNI(latitude, longitude, time_zone_utc, day_of_year,
-                                 local_time, elevation)
-
-        DHI = 0.1 * DNI
-
-        return DHI
+        return self.calculate_solar_irradiance(latitude, longitude, time_zone_utc, day_of_year,
+                                               local_time, elevation, return_intermediates=True)["DHI"]
 
     def calculate_GHI(self, latitude, longitude, time_zone_utc, day_of_year,
                       local_time, elevation, cloud_cover):
@@ -243,20 +298,8 @@ class SolarCalculations:
         Returns: The Global Horizontal Irradiance in W/m2 
         """
 
-        DHI = self.calculate_DHI(latitude, longitude, time_zone_utc, day_of_year,
-                                 local_time, elevation)
-
-        DNI = self.calculate_DNI(latitude, longitude, time_zone_utc, day_of_year,
-                                 local_time, elevation)
-
-        zenith_angle = self.calculate_zenith_angle(latitude, longitude,
-                                                   time_zone_utc, day_of_year, local_time)
-
-        cloud_cover_correction_factor = 1 - (cloud_cover / 100)
-        GHI = DNI * np.cos(np.radians(zenith_angle)) + DHI
-        GHI = cloud_cover_correction_factor * GHI
-
-        return GHI
+        return self.calculate_solar_irradiance(latitude, longitude, time_zone_utc, day_of_year,
+                                               local_time, elevation, cloud_cover)
 
     # ----- Calculation of modes of solar irradiance, but returning numpy arrays -----
     @helpers.timeit
@@ -281,20 +324,9 @@ class SolarCalculations:
         Returns: (float[N]) Global Horizontal Irradiance in W/m2
         """
 
-        day_of_year = np.zeros(len(coords))
-        local_time = np.zeros(len(coords))
-        with tqdm(total=len(coords), file=sys.stdout, desc="Calculating GHI at each time step") as pbar:
-            for i, _ in enumerate(coords):
-                date = datetime.datetime.utcfromtimestamp(local_times[i])
-
-                day_of_year[i] = helpers.get_day_of_year(date.day, date.month, date.year)
-
-                local_time[i] = date.hour + (float(date.minute * 60 + date.second) / 3600)
-
-                pbar.update(1)
+        day_of_year, local_time = time_utils.get_day_of_year_and_local_hour(local_times)
 
-        ghi = self.calculate_GHI(coords[:, 0], coords[:, 1], time_zones,
+        ghi = self.calculate_GHI(coords[..., 0], coords[..., 1], time_zones,
                                  day_of_year, local_time, elevations, cloud_covers)
-        print()
 
         return ghi
\ No newline at end of file
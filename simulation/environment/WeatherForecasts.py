@@ -105,6 +105,15 @@ class WeatherForecasts:
 
         self.last_updated_time = self.weather_forecast[0, 0, 2]
 
+        # a list of all the coordinates that we have weather data for
+        weather_coords = self.weather_forecast[:, 0, 0:2]
+
+        # distances between all the coordinates that we have weather data for. These only depend on the weather
+        # coordinates, so the midpoint table used by calculate_closest_weather_indices() is built once here.
+        weather_path_distances = calculate_path_distances(weather_coords)
+        self.cumulative_weather_path_distances = np.cumsum(weather_path_distances)
+        self.weather_midpoints = helpers.calculate_path_midpoints(self.cumulative_weather_path_distances)
+
     def get_coord_weather_forecast(self, coord, weather_data_frequency, duration):
         """
         Passes in a single coordinate, returns a weather forecast
@@ -239,10 +248,16 @@ class WeatherForecasts:
         return weather_forecast
 
     def calculate_closest_weather_indices(self, cumulative_distances):
-        current_coordinate_index = 0
-        result = []
+        """
+        Takes in an array of point distances from starting point, returns a list of self.weather_forecast indices
+        of the weather coordinates closest to those points
+
+        :param cumulative_distances: (float[N]) array of distances, where cumulative_distances[x] >
+            cumulative_distances[x-1]. May also be a 2D array (float[K][N]) where each row is the cumulative
+            distance of a separate speed profile.
 
-        # TODO: can rewrite this to use self.gis.path[closest_gis_indices]
+        :returns: (int[N]) array of indices of self.weather_forecast, or (int[K][N]) for a 2D input
+        """
 
         """
         IMPORTANT: we only have weather coordinates for a discrete set of coordinates. However, the car could be at any
@@ -260,34 +275,7 @@ class WeatherForecasts:
         `get_weather_forecast_in_time()` method.
         """
 
-        # a list of all the coordinates that we have weather data for
-        weather_coords = self.weather_forecast[:, 0, 0:2]
-
-        # distances between all the coordinates that we have weather data for
-        weather_path_distances = helpers.calculate_path_distances(weather_coords)
-        cumulative_weather_path_distances = np.cumsum(weather_path_distances)
-
-        # makes every even-index element negative, this allows the use of np.diff() to calculate the sum of consecutive
-        # elements
-        cumulative_weather_path_distances[::2] *= -1
-
-        # contains the average distance between two consecutive elements in the cumulative_weather_path_distances array
-        average_distances = np.abs(np.diff(cumulative_weather_path_distances) / 2)
-
-        for distance in np.nditer(cumulative_distances):
-
-            # makes sure the current_coordinate_index does not exceed its maximum value
-            if current_coordinate_index > len(average_distances) - 1:
-                current_coordinate_index = len(average_distances) - 1
-
-            if distance > average_distances[current_coordinate_index]:
-                current_coordinate_index += 1
-                if current_coordinate_index > len(average_distances) - 1:
-                    current_coordinate_index = len(average_distances) - 1
-
-            result.append(current_coordinate_index)
-
-        return np.array(result)
+        return helpers.calculate_closest_indices(cumulative_distances, self.weather_midpoints)
 
     def get_weather_forecast_in_time(self, indices, unix_timestamps):
         """
@@ -295,10 +283,11 @@ class WeatherForecasts:
         what the weather forecast is at each time step being simulated.
 
         :param indices: (int[N]) coordinate indices of self.weather_forecast
-        :param unix_timestamps: (int[N]) unix timestamps of the vehicle's journey
+        :param unix_timestamps: (int[N]) unix timestamps of the vehicle's journey. Must have the same shape as
+            indices, which may also be 2D ([K][N]) for a batch of speed profiles.
 
         :returns
-        - A numpy array of size [N][9]
+        - A numpy array of size [N][9] (or [K][N][9] for a 2D input)
         - [9]: (latitude, longitude, unix_time, timezone_offset, unix_time_corrected, wind_speed, wind_direction,
                     cloud_cover, precipitation, description)
         """
@@ -314,30 +303,44 @@ class WeatherForecasts:
         below code is accomplishing.
         """
 
-        # each element is the weather forecast for all available times at that coordinate
-        full_weather_forecast_at_coords = self.weather_forecast[indices]
-        dt_local_array = full_weather_forecast_at_coords[0, :, 4]
+        indices = np.asarray(indices)
+        closest_time_stamp_indices = self.get_weather_forecast_time_indices(indices, unix_timestamps)
+
+        return self.weather_forecast[indices, closest_time_stamp_indices]
+
+    def get_weather_forecast_time_indices(self, indices, unix_timestamps):
+        """
+        Finds the forecast time closest to every timestamp, for the weather coordinate at the same position in
+        indices. Together with indices this identifies the weather cell (coordinate and forecast time) that
+        get_weather_forecast_in_time uses at every time step.
+
+        :param indices: (int[N]) coordinate indices of self.weather_forecast, or (int[K][N]) for a batch
+        :param unix_timestamps: (int[N]) unix timestamps of the vehicle's journey, with the same shape as indices
+
+        :returns: (int[N]) indices along the time axis of self.weather_forecast, with the same shape as indices
+        """
 
-        closest_time_stamp_indices = []
+        indices = np.asarray(indices)
+        unix_timestamps = np.asarray(unix_timestamps, dtype=np.float64)
 
-        # this for loop figures out the index of the closest time stamp in the dt_local_array and packages them in an
-        # array
-        for unix_timestamp in unix_timestamps:
-            unix_timestamp_array = np.full_like(dt_local_array, fill_value=unix_timestamp)
-            differences = np.abs(unix_timestamp_array - dt_local_array)
-            minimum_index = np.argmin(differences)
-            closest_time_stamp_indices.append(minimum_index)
+        forecast_times = self.weather_forecast[:, :, 4]
+        num_forecast_times = forecast_times.shape[1]
 
-        #start_time_shift = np.where(full_weather_forecast_at_coords[:, 4] == self.time_of_initialization)[0][0]
-        closest_time_stamp_indices = np.asarray(closest_time_stamp_indices, dtype=np.int32)
+        if indices.size == 0:
+            return np.zeros(indices.shape, dtype=np.int32)
 
-        temp_0 = np.arange(0, full_weather_forecast_at_coords.shape[0])
+        # each weather coordinate has its own local time axis (time zones differ along the route). Shifting the time
+        # axis of coordinate i, and the timestamps looked up at it, by i * span lays the axes out one after the other
+        # in a single sorted array. A span of twice the range of all the times keeps every timestamp nearer to the
+        # times of its own coordinate than to those of its neighbours, so one lookup finds every closest time.
+        origin = min(forecast_times.min(), unix_timestamps.min())
+        span = 2 * (max(forecast_times.max(), unix_timestamps.max()) - origin) + 1
+        shifted_forecast_times = forecast_times - origin + np.arange(len(forecast_times))[:, np.newaxis] * span
 
-        # if you're wondering why or how this works, don't ask because I don't know, it just does
-        # this is what duct-taping looks like in software engineering
-        result = full_weather_forecast_at_coords[tuple((temp_0, closest_time_stamp_indices))]
+        closest_flat_indices = helpers.find_nearest_sorted_indices(shifted_forecast_times.ravel(),
+                                                                   unix_timestamps - origin + indices * span)
 
-        return result
+        return (closest_flat_indices - indices * num_forecast_times).astype(np.int32)
 
     @staticmethod
     def cull_dataset(coords, reduction_factor):
@@ -1,27 +1,33 @@
+import copy
 import datetime
+import hashlib
 import json
 import sys
+import time
 import os
 from dotenv import load_dotenv
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-import seaborn as sns
-from bayes_opt import BayesianOptimization
 from tqdm import tqdm
 
 import simulation
-from simulation.common import helpers
+from simulation.common import helpers, time_utils
 from simulation.common.helpers import adjust_timestamps_to_local_times, get_array_directional_wind_speed
 from simulation.config import settings_directory
+from simulation.main.SimulationCache import SimulationCache
+from simulation.main.SimulationContext import SimulationContext, calculate_not_charge
 from simulation.main.SimulationResult import SimulationResult
 
 
+def _evaluate_speed(speed):
+    return helpers.get_worker_object().objective(speed=speed)
 
 
 class Simulation:
 
+    # time (in seconds) over which the energy rate at a battery depletion is averaged in calculate_gradients
+    __EVENT_RATE_WINDOW = 300
+
     def __init__(self, race_type):
         """
         Instantiates a simple model of the car.
@@ -121,7 +127,17 @@ class Simulation:
 
         self.local_times = 0
 
-        self.timestamps = np.arange(0, self.simulation_duration + self.tick, self.tick)
+        # per-tick state of the last incremental run (see objective), used as checkpoints to resume from
+        self.__checkpoints = None
+
+        # memo of distances travelled for previously simulated speed arrays (see enable_cache)
+        self.cache = None
+
+        # ----- Precomputed speed-independent arrays -----
+
+        self.context = SimulationContext(self.tick, self.simulation_duration, self.start_hour, self.gis, self.weather)
+
+        self.timestamps = self.context.timestamps
 
     @helpers.timeit
     def run_model(self, speed=np.array([20, 20, 20, 20, 20, 20, 20, 20]), plot_results=True, verbose=False, **kwargs):
@@ -158,9 +174,18 @@ class Simulation:
 
         print(f"Input speeds: {speed}\n")
 
-        speed_kmh = helpers.reshape_and_repeat(speed, self.simulation_duration)
-        speed_kmh = np.insert(speed_kmh, 0, 0)
-        speed_kmh = helpers.add_acceleration(speed_kmh, 500)
+        # optimizer calls only need the distance travelled, which may have been simulated already
+        cache = self.__get_cache() if kwargs else None
+
+        if cache is not None:
+            speed = cache.quantize(speed)
+            distance_travelled = cache.get(speed)
+
+            if distance_travelled is not None:
+                print(f"Using cached result. Maximum distance traversable: {distance_travelled:.2f}km\n")
+                return distance_travelled
+
+        speed_kmh = self.__expand_speed_array(speed)
 
         # ------ Run calculations and get result and modified speed array -------
 
@@ -199,20 +224,525 @@ class Simulation:
 
             self.__plot_graph(arrays_to_plot, y_label, "Simulation Result")
 
+        if cache is not None:
+            cache.put(speed, distance_travelled)
+
         return distance_travelled
 
     @helpers.timeit
-    def optimize(self, *args, **kwargs):
+    def run_batch(self, speed_matrix, chunk_size=8):
+        """
+        Evaluates many speed profiles in one go. Each row of speed_matrix is treated the same way run_model treats
+        its speed array (stretched over the simulation duration, then accelerated), and all rows in a chunk are
+        pushed through the simulation stages together as a 2D array.
+
+        Rows are processed chunk_size at a time to bound memory usage, since every intermediate array has one
+        float per tick for each row in the chunk.
+
+        :param speed_matrix: (float[K][M]) K speed profiles (km/h), each with M set-points
+        :param chunk_size: (int) maximum number of profiles to simulate at once
+        :returns: SimulationResult where distance_travelled (km), time_taken (s) and final_soc (%) are (float[K])
+            arrays holding the result of each profile. arrays is left as None.
+        """
+
+        speed_matrix = np.atleast_2d(np.asarray(speed_matrix, dtype=float))
+        assert chunk_size >= 1, "chunk_size must be a positive integer"
+
+        distance_travelled = np.empty(speed_matrix.shape[0])
+        time_taken = np.empty(speed_matrix.shape[0])
+        final_soc = np.empty(speed_matrix.shape[0])
+
+        for start in range(0, speed_matrix.shape[0], chunk_size):
+            chunk = slice(start, start + chunk_size)
+
+            speed_kmh = self.__expand_speed_array(speed_matrix[chunk])
+
+            result = self.__run_simulation_calculations(speed_kmh)
+
+            distance_travelled[chunk] = result.distance_travelled
+            time_taken[chunk] = result.time_taken
+            final_soc[chunk] = result.final_soc
+
+        return SimulationResult(distance_travelled=distance_travelled, time_taken=time_taken, final_soc=final_soc)
+
+    def run_stream(self, speed, chunk_duration=86400):
+        """
+        Generator version of run_model for long races. The race is simulated chunk_duration seconds at a time, and
+        only the state at the end of a chunk (position, battery energy, speed and time in motion) is carried over
+        to the next one, so the memory used depends on the length of a chunk and not on the length of the race.
+        Nothing is printed or plotted.
+
+        Joining the arrays of every chunk gives exactly the arrays of run_model for the same speed array.
+
+        :param speed: (float[M]) speed set-points in km/h, stretched over the simulation duration as in run_model
+        :param chunk_duration: (int) simulated time per chunk in seconds
+        :returns: generator of SimulationResult objects, one per chunk. Their arrays are the arrays of run_model
+            for the ticks of the chunk, and distance_travelled, time_taken and final_soc are the totals up to the
+            end of the chunk.
+        """
+
+        speed = np.asarray(speed, dtype=float)
+        context = self.context
+
+        num_timestamps = context.num_ticks + 1
+        chunk_ticks = max(chunk_duration // self.tick, 1)
+        max_route_distance = context.max_route_distance
+        start_time_zone = context.path_time_zones[0]
+
+        # the wind at every tick is the forecast of roll_by_tick ticks later, wrapped around to the start of the
+        # race (see __run_simulation_calculations), so a second stream of positions runs that far ahead
+        first_forecast_time = self.weather.get_weather_forecast_in_time(np.zeros(1, dtype=int),
+                                                                        [self.time_of_initialization])[0, 2]
+        roll_by_tick = self.__get_wind_roll(first_forecast_time)
+        positions_ahead = self.__stream_positions(speed, roll_by_tick % num_timestamps, chunk_ticks)
+
+        self.basic_lvs.update(self.tick)
+        lvs_consumed_energy = self.basic_lvs.get_consumed_energy()
+
+        # state carried over between chunks
+        position_state = None
+        cumulative_energy = None
+        cumulative_distance = None
+        total_time_in_motion = 0
+        reached_route_end = False
+
+        for chunk_start in range(0, num_timestamps, chunk_ticks):
+            chunk_stop = min(chunk_start + chunk_ticks, num_timestamps)
+
+            timestamps, not_charge, speed_kmh, cumulative_distances, position_state = self.__calculate_positions(
+                speed, chunk_start, chunk_stop, position_state)
+
+            # ----- Weather and location calculations -----
+
+            closest_gis_indices = helpers.calculate_closest_indices(cumulative_distances, context.path_midpoints)
+
+            gis_route_elevations_at_each_tick = context.path_elevations[closest_gis_indices]
+            gis_vehicle_bearings = context.path_bearings[closest_gis_indices]
+            gradients = context.path_gradients[closest_gis_indices]
+            time_zones = context.path_time_zones[closest_gis_indices]
+
+            local_times = np.array(timestamps + self.time_of_initialization - (start_time_zone - time_zones),
+                                   dtype=np.uint64)
+
+            timestamps_ahead, cumulative_distances_ahead = next(positions_ahead)
+            timestamps_ahead = timestamps_ahead[:chunk_stop - chunk_start]
+            cumulative_distances_ahead = cumulative_distances_ahead[:chunk_stop - chunk_start]
+
+            time_zones_ahead = context.path_time_zones[
+                helpers.calculate_closest_indices(cumulative_distances_ahead, context.path_midpoints)]
+            local_times_ahead = np.array(timestamps_ahead + self.time_of_initialization -
+                                         (start_time_zone - time_zones_ahead), dtype=np.uint64)
+            weather_forecasts_ahead = self.weather.get_weather_forecast_in_time(
+                helpers.calculate_closest_indices(cumulative_distances_ahead, context.weather_midpoints),
+                local_times_ahead)
+
+            wind_speeds = get_array_directional_wind_speed(gis_vehicle_bearings, weather_forecasts_ahead[:, 5],
+                                                           weather_forecasts_ahead[:, 6])
+
+            cloud_covers = np.zeros(timestamps.shape)
+
+            route_coords_at_each_tick = context.route_coords[closest_gis_indices]
+            day_of_year, local_time = time_utils.get_day_of_year_and_local_hour(local_times)
+            solar_irradiances = self.solar_calculations.calculate_GHI(route_coords_at_each_tick[:, 0],
+                                                                      route_coords_at_each_tick[:, 1],
+                                                                      time_zones, day_of_year, local_time,
+                                                                      gis_route_elevations_at_each_tick,
+                                                                      cloud_covers)
+
+            # ----- Energy calculations -----
+
+            motor_consumed_energy = self.basic_motor.calculate_energy_in(speed_kmh, gradients, wind_speeds, self.tick)
+            array_produced_energy = self.basic_array.calculate_produced_energy(solar_irradiances, self.tick)
+
+            motor_consumed_energy = np.logical_and(motor_consumed_energy, not_charge) * motor_consumed_energy
+
+            delta_energy = array_produced_energy - (motor_consumed_energy + lvs_consumed_energy)
+
+            cumulative_delta_energy = helpers.resume_cumsum(delta_energy, cumulative_energy)
+            cumulative_energy = cumulative_delta_energy[-1]
+
+            state_of_charge = self.basic_battery.update_array(cumulative_delta_energy)[0]
+            state_of_charge[np.abs(state_of_charge) < 1e-03] = 0
+
+            # ----- Distance travelled -----
+
+            speed_kmh = np.logical_and(not_charge, state_of_charge) * speed_kmh
+            time_in_motion = np.logical_and(timestamps != 0, speed_kmh) * self.tick
+
+            distance = speed_kmh * (time_in_motion / 3600)
+            distances = helpers.resume_cumsum(distance, cumulative_distance)
+            cumulative_distance = distances[-1]
+            distances = distances.clip(0, max_route_distance / 1000)
+
+            # the car is not in motion once it has reached the end of the route
+            if not reached_route_end:
+                at_route_end = np.flatnonzero(distances == max_route_distance / 1000)
+                in_motion_before_end = slice(None) if at_route_end.size == 0 else slice(at_route_end[0])
+                total_time_in_motion += np.sum(time_in_motion[in_motion_before_end])
+                reached_route_end = at_route_end.size > 0
+
+            results = SimulationResult()
+
+            results.arrays = [
+                speed_kmh,
+                distances,
+                state_of_charge,
+                delta_energy,
+                solar_irradiances,
+                wind_speeds,
+                gis_route_elevations_at_each_tick,
+                cloud_covers
+            ]
+            results.distance_travelled = distances[-1]
+            results.time_taken = str(datetime.timedelta(seconds=int(total_time_in_motion)))
+            results.final_soc = state_of_charge[-1] * 100 + 0.
+
+            yield results
+
+    def __calculate_positions(self, speed, start, stop, state):
+        """
+        Calculates the speed and position of the car for the ticks from start to stop, continuing from the state
+        of the previous tick. Gives the same values as the corresponding part of run_model.
+
+        :param speed: (float[M]) speed set-points in km/h
+        :param start: (int) index of the first tick
+        :param stop: (int) index after the last tick
+        :param state: the state returned for the previous tick, or None if start is 0
+        :returns: tuple of the timestamps, not_charge, speed (km/h, with the car stopped while charging) and
+            cumulative distance (m) of every tick, and the state after the last tick
+        """
+
+        num_ticks = self.context.num_ticks
+        tick_indices = np.arange(start, stop)
+
+        # same as stretching the speed array over the simulation duration, for these ticks only
+        if speed.shape[-1] >= num_ticks:
+            speed_kmh = speed[np.maximum(tick_indices - 1, 0)]
+        else:
+            repeats = num_ticks // speed.shape[-1]
+            speed_kmh = speed[np.minimum((tick_indices - 1) // repeats, speed.shape[-1] - 1)]
+
+        speed_kmh = np.where(tick_indices == 0, 0, speed_kmh)
+
+        if state is None:
+            previous_speed, previous_distance = None, None
+            speed_kmh = helpers.add_acceleration(speed_kmh, 500 * self.tick)
+        else:
+            previous_speed, previous_distance = state
+            speed_kmh = helpers.add_acceleration(np.insert(speed_kmh, 0, previous_speed), 500 * self.tick)[1:]
+
+        timestamps = tick_indices * self.tick
+        tick_array = np.where(tick_indices == 0, 0, self.tick)
+        not_charge = calculate_not_charge(timestamps, self.start_hour)
+
+        moving_speed_kmh = np.logical_and(speed_kmh, not_charge) * speed_kmh
+        cumulative_distances = helpers.resume_cumsum(tick_array * moving_speed_kmh / 3.6, previous_distance)
+
+        return timestamps, not_charge, moving_speed_kmh, cumulative_distances, (speed_kmh[-1],
+                                                                               cumulative_distances[-1])
+
+    def __stream_positions(self, speed, first_tick, chunk_ticks):
+        """
+        Generator of the timestamps and cumulative distances of consecutive ranges of chunk_ticks ticks, starting
+        at first_tick and wrapping around to the first tick of the simulation after the last one.
+        """
+
+        num_timestamps = self.context.num_ticks + 1
+
+        tick, state = 0, None
+        while tick < first_tick:
+            stop = min(tick + chunk_ticks, first_tick)
+            state = self.__calculate_positions(speed, tick, stop, state)[-1]
+            tick = stop
+
+        while True:
+            timestamps, cumulative_distances = [], []
+
+            remaining = chunk_ticks
+            while remaining > 0:
+                stop = min(tick + remaining, num_timestamps)
+                chunk_timestamps, _, _, chunk_distances, state = self.__calculate_positions(speed, tick, stop, state)
+
+                timestamps.append(chunk_timestamps)
+                cumulative_distances.append(chunk_distances)
+
+                remaining -= stop - tick
+                tick = stop
+
+                if tick == num_timestamps:
+                    tick, state = 0, None
+
+            yield np.concatenate(timestamps), np.concatenate(cumulative_distances)
+
+    def objective(self, speed=None, incremental=False, **kwargs):
+        """
+        Objective-only fast path of run_model, meant to be called repeatedly by optimizers. Only the quantities
+        needed for the distance travelled are calculated: nothing is printed or plotted, and no result arrays or
+        SimulationResult object are built. Returns exactly the same distance as run_model for the same input.
+
+        If incremental is True, the per-tick state of the run is kept as a checkpoint, and the next incremental
+        call only recomputes the simulation from the first tick at which its speed differs from the previous call.
+        This makes perturbing a single speed set-point (as coordinate-wise optimizers do) much cheaper than a full
+        run, and still returns exactly the same distance. The checkpoints are discarded if the settings, route,
+        weather or car parameters have changed since the previous call (see get_fingerprint).
+
+        If caching is enabled (see enable_cache), single speed profiles are rounded to the resolution of the cache
+        and previously simulated ones are looked up instead of simulated again.
+
+        :param speed: array that specifies the solar car's driving speed at each time step. May also be a 2D
+            array where each row is a separate speed profile (not supported when incremental is True).
+        :param incremental: set to True to resume from the checkpoints of the previous incremental call
+        :param **kwargs: variable list of arguments that specify the car's driving speed at each time step.
+            Overrides the speed parameter.
+        :returns: (float) distance travelled in km, or (float[K]) for a 2D speed array
+        """
+
+        # Used by the optimization function as it passes values as keyword arguments instead of a numpy array
+        if kwargs:
+            speed = np.fromiter(kwargs.values(), dtype=float)
+
+        speed = np.asarray(speed)
+        cache = self.__get_cache() if speed.ndim == 1 else None
+
+        if cache is not None:
+            speed = cache.quantize(speed)
+            distance_travelled = cache.get(speed)
+
+            if distance_travelled is not None:
+                return distance_travelled
+
+        speed_kmh = self.__expand_speed_array(speed, verbose=False)
+
+        if incremental:
+            assert speed_kmh.ndim == 1, "Incremental runs only support a single speed profile"
+            distance_travelled = self.__run_incremental_calculations(speed_kmh)
+        else:
+            distance_travelled = self.__run_simulation_calculations(speed_kmh, objective_only=True)
+
+        if cache is not None:
+            cache.put(speed, distance_travelled)
+
+        return distance_travelled
+
+    def calculate_gradients(self, speed):
+        """
+        Calculates the distance travelled and the final battery state of charge for a speed array, along with their
+        gradients with respect to each speed set-point, so gradient-based optimizers can be used.
+
+        The derivatives are propagated in forward mode through the acceleration limit (see
+        helpers.get_acceleration_source_indices), the motor model (BasicMotor.calculate_energy_in_derivative), the
+        array model and the battery model (BasicBattery.calculate_soc_derivative_array). Driving faster moves the
+        car further along the route at every later tick, which changes the solar irradiance it receives; this is
+        included through the change in irradiance between consecutive route points. The road gradients and the
+        wind are looked up per route segment and weather station, so they are piecewise constant along the route
+        and their derivative is taken as 0.
+
+        The speed changes the distance in two ways: directly, at every tick the car is moving, and by moving the
+        ticks at which the battery runs empty (or recovers), since the car stops while the battery is empty. The
+        second effect is included by shifting those events by the change in cumulative energy at the event divided
+        by the rate at which the energy changes there.
+
+        :param speed: (float[M]) speed set-points in km/h
+        :returns: tuple of distance travelled (float, in km), its gradient (float[M], in km per km/h), final state
+            of charge (float, in %) and its gradient (float[M], in % per km/h)
+        """
+
+        speed = np.asarray(speed, dtype=float)
+        num_setpoints = speed.shape[0]
+        context = self.context
+
+        speed_kmh = helpers.reshape_and_repeat(speed, context.num_ticks, verbose=False)
+        speed_kmh = np.insert(speed_kmh, 0, 0)
+        source_indices = helpers.get_acceleration_source_indices(speed_kmh, 500 * self.tick)
+        speed_kmh = helpers.add_acceleration(speed_kmh, 500 * self.tick)
+
+        # set-point that each element of the stretched speed array comes from, where -1 is the stationary start
+        if num_setpoints >= context.num_ticks:
+            setpoints = np.arange(-1, speed_kmh.shape[0] - 1)
+        else:
+            repeats = context.num_ticks // num_setpoints
+            setpoints = np.insert(np.minimum(np.arange(context.num_ticks) // repeats, num_setpoints - 1), 0, -1)
+
+        # the car does not move while charging, so the speed has no effect there
+        setpoint_at_each_tick = np.where(context.not_charge, setpoints[source_indices], -1)
+
+        result = self.__run_simulation_calculations(speed_kmh)
+        moving_speed_kmh, _, state_of_charge, delta_energy, solar_irradiances, wind_speeds, _, _ = result.arrays
+
+        speed_kmh = np.logical_and(speed_kmh, context.not_charge) * speed_kmh
+
+        cumulative_distances = np.cumsum(context.tick_array * speed_kmh / 3.6)
+        closest_gis_indices = helpers.calculate_closest_indices(cumulative_distances, context.path_midpoints)
+
+        # ----- Motor energy derivatives -----
+
+        motor_energy_derivatives = self.basic_motor.calculate_energy_in_derivative(
+            speed_kmh, context.path_gradients[closest_gis_indices], wind_speeds, self.tick)
+
+        # the motor does not consume energy when the car is stationary
+        motor_energy_derivatives[speed_kmh == 0] = 0
+
+        # ----- Array energy derivatives with respect to the position on the route -----
+
+        time_zones = context.path_time_zones[closest_gis_indices]
+        local_times = adjust_timestamps_to_local_times(context.timestamps, self.time_of_initialization, time_zones)
+
+        next_gis_indices = np.minimum(closest_gis_indices + 1, len(context.route_coords) - 1)
+        next_route_coords = context.route_coords[next_gis_indices]
+        day_of_year, local_time = time_utils.get_day_of_year_and_local_hour(local_times)
+        next_solar_irradiances = self.solar_calculations.calculate_GHI(
+            next_route_coords[:, 0], next_route_coords[:, 1], time_zones, day_of_year, local_time,
+            context.path_elevations[next_gis_indices], np.zeros_like(solar_irradiances))
+
+        # distance between the route points in meters
+        route_step = context.cumulative_path_distances[next_gis_indices] - \
+            context.cumulative_path_distances[closest_gis_indices]
+        irradiance_derivatives = np.divide(next_solar_irradiances - solar_irradiances, route_step,
+                                           out=np.zeros_like(solar_irradiances), where=route_step > 0)
+
+        # energy produced per meter further along the route, accumulated over time
+        cumulative_array_energy_derivatives = np.cumsum(self.basic_array.calculate_produced_energy(
+            irradiance_derivatives, self.tick))
+        previous_array_energy_derivatives = np.insert(cumulative_array_energy_derivatives[:-1], 0, 0)
+
+        depends_on_speed = setpoint_at_each_tick >= 0
+
+        def cumulative_energy_gradient(last_tick):
+            """
+            :returns: (float[M]) derivative of the cumulative energy change at last_tick with respect to each
+                set-point. The speed at a tick changes the position at every later tick, and the motor energy at
+                that same tick.
+            """
+
+            in_range = depends_on_speed[:last_tick + 1]
+
+            # position (in meters) at every tick from the current one changes by tick / 3.6 per km/h
+            position_effect = context.tick_array[:last_tick + 1] / 3.6 * (
+                    cumulative_array_energy_derivatives[last_tick] - previous_array_energy_derivatives[:last_tick + 1])
+
+            return np.bincount(setpoint_at_each_tick[:last_tick + 1][in_range],
+                               weights=(position_effect - motor_energy_derivatives[:last_tick + 1])[in_range],
+                               minlength=num_setpoints)
+
+        # ----- Distance gradient -----
+
+        moving = moving_speed_kmh != 0
+        distance_gradient = np.bincount(setpoint_at_each_tick[np.logical_and(moving, depends_on_speed)],
+                                        minlength=num_setpoints) * self.tick / 3600.0
+
+        cumulative_delta_energy = np.cumsum(delta_energy)
+
+        charged = state_of_charge != 0
+        for event_tick in np.flatnonzero(charged[1:] != charged[:-1]) + 1:
+            # the energy change of a single tick varies a lot with the road, so the rate is averaged over the
+            # ticks leading up to the event
+            window_start = max(event_tick - self.__EVENT_RATE_WINDOW // self.tick, 0)
+            energy_rate = (cumulative_delta_energy[event_tick] - cumulative_delta_energy[window_start]) / \
+                ((event_tick - window_start) * self.tick)
+
+            if energy_rate == 0:
+                continue
+
+            # seconds by which the event is delayed per km/h of each set-point
+            event_time_gradient = -cumulative_energy_gradient(event_tick) / energy_rate
+
+            # the car drives up to a depletion and from a recovery
+            direction = 1 if charged[event_tick - 1] else -1
+            distance_gradient += direction * speed_kmh[event_tick] / 3600 * event_time_gradient
+
+        distance_travelled = result.distance_travelled
+        if distance_travelled >= context.max_route_distance / 1000:
+            # the end of the route has been reached
+            distance_gradient = np.zeros(num_setpoints)
+
+        # ----- State of charge gradient -----
+
+        final_soc = result.final_soc
+
+        if state_of_charge[-1] == 0:
+            soc_gradient = np.zeros(num_setpoints)
+        else:
+            soc_derivative = self.basic_battery.calculate_soc_derivative_array(cumulative_delta_energy[-1:])[0]
+            soc_gradient = 100 * soc_derivative * cumulative_energy_gradient(len(delta_energy) - 1)
+
+        return distance_travelled, distance_gradient, final_soc, soc_gradient
+
+    def enable_cache(self, resolution=0.1, max_size=4096, cache_file=None):
+        """
+        Enables memoization of the distance travelled for speed arrays passed to objective, and to run_model by the
+        optimizer. Speed arrays are rounded to the given resolution, so near-identical ones share a result.
+        The fingerprint of the simulation inputs is checked on every lookup, and the cached results are cleared
+        if the settings or the parameters of the car's components have changed since they were simulated.
+
+        :param resolution: (float) speed resolution in km/h that input speeds are rounded to
+        :param max_size: (int) maximum number of results held before the least recently used ones are evicted
+        :param cache_file: (str or Path) optional file that cached results are loaded from and saved to, so they
+            can be reused across sessions as long as the settings, route and weather are unchanged
+        :returns: the SimulationCache object, which is also stored as self.cache
+        """
+
+        self.cache = SimulationCache(self.get_fingerprint(), resolution=resolution, max_size=max_size,
+                                     cache_file=cache_file)
+
+        return self.cache
+
+    def __get_cache(self):
+        """
+        :returns: the SimulationCache, cleared first if the simulation inputs have changed since its results were
+            simulated, or None if caching is not enabled
+        """
+
+        if self.cache is not None:
+            self.cache.set_fingerprint(self.get_fingerprint())
+
+        return self.cache
+
+    def get_fingerprint(self):
+        """
+        Hashes every input the simulation results depend on, other than the speed: the settings, the route,
+        the weather forecasts and the parameters of the car's components.
+
+        :returns: (str) hexadecimal SHA-256 digest
+        """
+
+        fingerprint = hashlib.sha256()
+
+        settings = [self.race_type, self.tick, self.simulation_duration, self.start_hour,
+                    self.initial_battery_charge, self.lvs_power_loss, self.time_of_initialization]
+        fingerprint.update(repr(settings).encode())
+
+        for component in [self.basic_array, self.basic_battery, self.basic_lvs, self.basic_motor]:
+            parameters = sorted((name, value) for name, value in vars(component).items()
+                                if isinstance(value, (bool, int, float, str, np.number)))
+            fingerprint.update(repr(parameters).encode())
+
+        for array in [self.context.route_coords, self.context.path_elevations, self.context.path_time_zones,
+                      self.weather.weather_forecast]:
+            fingerprint.update(np.ascontiguousarray(array).tobytes())
+
+        return fingerprint.hexdigest()
+
+    @helpers.timeit
+    def optimize(self, *args, init_points=200, n_iter=20, workers=1, batch_size=None, **kwargs):
         """
 
         Args:
             *args: Do not serve any function.
+            init_points: number of random speed arrays evaluated before the acquisition starts.
+            n_iter: number of speed arrays suggested by the acquisition function.
+            workers: number of processes that evaluate the simulation. If greater than 1, the random initial
+                points are evaluated in parallel, and the acquisition suggests batches of batch_size points at a time
+                using the constant liar strategy, which are also evaluated in parallel.
+            batch_size: number of points suggested per acquisition batch when workers > 1. Defaults to workers.
             **kwargs: variable list of arguments that specify the car's driving speed at each time step.
 
         Returns: A local maximium for distance found through optimization
 
         """
 
+        # imported here, like the plotting libraries, so that importing the package stays fast
+        from bayes_opt import BayesianOptimization, UtilityFunction
+
         guess_lower_bound = 20
         guess_upper_bound = 80
 
@@ -228,13 +758,23 @@ class Simulation:
         }
 
         # verbose = 1 prints only when a maximum is observed, verbose = 0 is silent
-        optimizer = BayesianOptimization(f=self.run_model, pbounds=bounds,
+        optimizer = BayesianOptimization(f=self.objective, pbounds=bounds,
                                          verbose=2)
 
         # configure these parameters depending on whether optimizing for speed or precision
         # Parameter Explanations: https://github.com/fmfn/BayesianOptimization/blob/master/examples/exploitation_vs_exploration.ipynb
         # Acquisition Functions: https://www.cse.wustl.edu/~garnett/cse515t/spring_2015/files/lecture_notes/12.pdf for an explanation
-        optimizer.maximize(init_points=200, n_iter=20, acq='ucb', xi=1e-1, kappa=10)
+        utility = UtilityFunction(kind='ucb', kappa=10, xi=1e-1)
+
+        if workers > 1:
+            self.__maximize_in_parallel(optimizer, bounds, init_points=init_points, n_iter=n_iter, utility=utility,
+                                        workers=workers, batch_size=batch_size or workers)
+        else:
+            optimizer.maximize(init_points=init_points, n_iter=n_iter, acquisition_function=utility)
+
+        if self.cache is not None:
+            print(f"{self.cache}\n")
+            self.cache.save()
 
         result = optimizer.max
         result_params = list(result["params"].values())
@@ -243,7 +783,7 @@ class Simulation:
         for i in range(len(speed_result)):
             speed_result[i] = result_params[i]
 
-        speed_result = helpers.reshape_and_repeat(speed_result, self.simulation_duration)
+        speed_result = helpers.reshape_and_repeat(speed_result, self.context.num_ticks)
         speed_result = np.insert(speed_result, 0, 0)
 
         arrays_to_plot = self.__run_simulation_calculations(speed_result, verbose=False)
@@ -255,6 +795,237 @@ class Simulation:
 
         return optimizer.max
 
+    def __maximize_in_parallel(self, optimizer, bounds, init_points, n_iter, utility, workers, batch_size):
+        """
+        Parallel counterpart of BayesianOptimization.maximize. Observations are registered in optimizer.
+
+        The points are evaluated on a pool of worker processes. Where the platform supports it, the pool is forked
+        so every worker inherits this Simulation object, and with it the route and weather arrays, instead of
+        receiving a pickled copy. Each acquisition batch is built with the constant liar strategy: a copy of the
+        optimizer is told that every point suggested so far in the batch scored the worst distance observed yet,
+        which pushes its next suggestion elsewhere. The whole batch is then evaluated at once.
+
+        :param optimizer: BayesianOptimization object to register the observations in
+        :param bounds: dictionary of (lower, upper) bounds of each speed set-point
+        :param init_points: number of random points to evaluate before the acquisition starts
+        :param n_iter: number of points suggested by the acquisition
+        :param utility: UtilityFunction used to suggest the points
+        :param workers: number of worker processes
+        :param batch_size: number of points suggested per batch
+        """
+
+        from bayes_opt import BayesianOptimization
+
+        with helpers.make_worker_pool(self, workers) as pool:
+            def evaluate_and_register(points):
+                distances = pool.map(_evaluate_speed, points, chunksize=max(1, len(points) // (4 * workers)))
+
+                for point, distance in zip(points, distances):
+                    # the workers cannot update the cache of this process themselves
+                    if self.cache is not None:
+                        self.cache.put(self.cache.quantize(point), distance)
+
+                    try:
+                        optimizer.register(params=point, target=distance)
+                    except KeyError:
+                        # this exact point has already been observed
+                        pass
+
+            print(f"Evaluating {init_points} initial points on {workers} workers...\n")
+            evaluate_and_register([optimizer.space.random_sample() for _ in range(init_points)])
+
+            for batch_start in range(0, n_iter, batch_size):
+                liar = BayesianOptimization(f=None, pbounds=bounds, verbose=0)
+                for params, target in zip(optimizer.space.params, optimizer.space.target):
+                    liar.register(params=params, target=target)
+
+                lie = optimizer.space.target.min()
+                batch = []
+
+                for _ in range(min(batch_size, n_iter - batch_start)):
+                    utility.update_params()
+                    suggestion = liar.space.params_to_array(liar.suggest(utility))
+
+                    try:
+                        liar.register(params=suggestion, target=lie)
+                    except KeyError:
+                        continue
+
+                    batch.append(suggestion)
+
+                evaluate_and_register(batch)
+
+                print(f"Acquisition batch {batch_start // batch_size + 1}: evaluated {len(batch)} points, "
+                      f"maximum distance so far: {optimizer.max['target']:.2f}km\n")
+
+    def with_fidelity(self, tick=None, route_stride=1):
+        """
+        Returns a copy of this Simulation that runs at a different fidelity: a longer tick and/or a coarser
+        description of the route (see SimulationContext). The copy shares the route and weather objects of this
+        Simulation, so no data is fetched or loaded again. It is meant to screen speed arrays cheaply, its results
+        only approximate those of this Simulation.
+
+        :param tick: (int) length of the discrete time step (in seconds) of the copy. Must divide the simulation
+            duration. Defaults to the tick of this Simulation.
+        :param route_stride: (int) spacing of the route coordinates used by the copy
+        :returns: Simulation object that runs at the requested fidelity
+        """
+
+        tick = self.tick if tick is None else tick
+        assert self.simulation_duration % tick == 0, "tick must divide the simulation duration"
+
+        coarse_model = copy.copy(self)
+
+        coarse_model.tick = tick
+        coarse_model.basic_lvs = simulation.BasicLVS(self.lvs_power_loss * tick)
+        coarse_model.context = SimulationContext(tick, self.simulation_duration, self.start_hour, self.gis,
+                                                 self.weather, route_stride=route_stride)
+        coarse_model.timestamps = coarse_model.context.timestamps
+
+        # checkpoints and cached results of this Simulation do not apply at a different fidelity
+        coarse_model.__checkpoints = None
+        coarse_model.cache = None
+
+        return coarse_model
+
+    @helpers.timeit
+    def optimize_multi_fidelity(self, coarse_tick=60, route_stride=50, screening_points=2000, validation_points=50,
+                                refine_points=10, n_iter=20, seed=None):
+        """
+        Finds the speed array that maximizes the distance travelled in two stages. First, many random speed arrays
+        are screened with a coarse copy of this Simulation (see with_fidelity), which is much cheaper to run. Then
+        only the most promising ones are simulated at full fidelity, and Bayesian optimization is run at full
+        fidelity within the region they span.
+
+        To show whether the screening can be trusted, a random sample of the screened speed arrays is also
+        simulated at full fidelity, and the error between the two fidelities is reported. A high rank correlation
+        means that the coarse simulation orders speed arrays the same way as the full one, which is all the
+        screening relies on.
+
+        :param coarse_tick: (int) tick (in seconds) of the screening simulation
+        :param route_stride: (int) spacing of the route coordinates used by the screening simulation
+        :param screening_points: (int) number of random speed arrays screened at coarse fidelity
+        :param validation_points: (int) number of random screened speed arrays also simulated at full fidelity to
+            measure the error between the fidelities
+        :param refine_points: (int) number of the best screened speed arrays simulated at full fidelity
+        :param n_iter: (int) number of points suggested by the Bayesian optimization at full fidelity
+        :param seed: (int) seed of the random speed arrays
+        :returns: tuple of the best result found (same format as optimize) and a dictionary reporting the error
+            between the fidelities
+        """
+
+        assert 2 <= refine_points <= screening_points, "refine_points must be between 2 and screening_points"
+
+        from bayes_opt import BayesianOptimization, UtilityFunction
+        from scipy import stats
+
+        guess_lower_bound = 20
+        guess_upper_bound = 80
+        num_setpoints = 8
+
+        coarse_model = self.with_fidelity(tick=coarse_tick, route_stride=route_stride)
+
+        # ----- Screening at coarse fidelity -----
+
+        random_generator = np.random.default_rng(seed)
+        candidates = random_generator.uniform(guess_lower_bound, guess_upper_bound,
+                                              size=(screening_points, num_setpoints))
+
+        start = time.perf_counter()
+        coarse_distances = coarse_model.run_batch(candidates, chunk_size=64).distance_travelled
+        coarse_time = (time.perf_counter() - start) / screening_points
+
+        # ----- Error between fidelities -----
+
+        best_indices = np.argsort(coarse_distances)[::-1][:refine_points]
+        validation_indices = random_generator.choice(screening_points, size=min(validation_points, screening_points),
+                                                     replace=False)
+
+        compared_indices = np.union1d(best_indices, validation_indices)
+
+        start = time.perf_counter()
+        fine_distances = np.array([self.objective(speed=candidates[i]) for i in compared_indices])
+        fine_time = (time.perf_counter() - start) / len(compared_indices)
+
+        errors = coarse_distances[compared_indices] - fine_distances
+
+        fidelity_report = {
+            "coarse_tick": coarse_tick,
+            "route_stride": route_stride,
+            "compared_points": len(compared_indices),
+            "mean_absolute_error": np.mean(np.abs(errors)),
+            "max_absolute_error": np.max(np.abs(errors)),
+            "mean_error": np.mean(errors),
+            "rank_correlation": stats.spearmanr(coarse_distances[compared_indices], fine_distances).correlation,
+            "coarse_time_per_evaluation": coarse_time,
+            "fine_time_per_evaluation": fine_time,
+        }
+
+        print(f"Fidelity report (tick {coarse_tick}s, route stride {route_stride}, "
+              f"{len(compared_indices)} points compared):\n"
+              f"  mean absolute error: {fidelity_report['mean_absolute_error']:.2f}km, "
+              f"max absolute error: {fidelity_report['max_absolute_error']:.2f}km, "
+              f"mean error: {fidelity_report['mean_error']:.2f}km\n"
+              f"  rank correlation: {fidelity_report['rank_correlation']:.3f}\n"
+              f"  time per evaluation: {coarse_time * 1000:.2f}ms coarse, {fine_time * 1000:.2f}ms full\n")
+
+        # ----- Refinement at full fidelity -----
+
+        best_candidates = candidates[best_indices]
+        bounds = {f"x{i}": (best_candidates[:, i].min(), best_candidates[:, i].max()) for i in range(num_setpoints)}
+
+        optimizer = BayesianOptimization(f=self.objective, pbounds=bounds, verbose=2)
+
+        for index, fine_distance in zip(compared_indices, fine_distances):
+            if index in best_indices:
+                optimizer.register(params=candidates[index], target=fine_distance)
+
+        optimizer.maximize(init_points=0, n_iter=n_iter,
+                           acquisition_function=UtilityFunction(kind='ucb', kappa=10, xi=1e-1))
+
+        if self.cache is not None:
+            print(f"{self.cache}\n")
+            self.cache.save()
+
+        return optimizer.max, fidelity_report
+
+    def get_local_times_datetime(self):
+        """
+        Returns the local time at every tick of the most recent simulation run as a NumPy datetime64 array.
+        These are only for reference, so they are produced on request rather than during every run.
+
+        :returns: (datetime64[s][N]) local times of the most recent simulation run
+        """
+
+        return time_utils.to_datetime64(self.local_times)
+
+    def __expand_speed_array(self, speed, verbose=True):
+        """
+        Stretches a speed array over the simulation duration, prepends the stationary starting tick and applies
+        the car's acceleration limit.
+
+        :param speed: (float[M]) speed set-points in km/h, or (float[K][M]) for K separate speed profiles
+        :param verbose: set to False to skip printing the reshape information
+        :returns: (float[N]) speed at every tick in km/h, or (float[K][N]) for a 2D input
+        """
+
+        speed_kmh = helpers.reshape_and_repeat(speed, self.context.num_ticks, verbose=verbose)
+        speed_kmh = np.insert(speed_kmh, 0, 0, axis=-1)
+
+        # add_acceleration allows one second of acceleration between consecutive elements, which are a tick apart
+        speed_kmh = helpers.add_acceleration(speed_kmh, 500 * self.tick)
+
+        return speed_kmh
+
+    def __get_wind_roll(self, first_forecast_time):
+        """
+        :param first_forecast_time: (int) UNIX timestamp of the weather forecast at the start of the race
+        :returns: (int) number of ticks the wind forecasts are rolled by, so the wind at every tick is the forecast
+            of that many ticks later
+        """
+
+        return 3600 * (24 + self.start_hour - helpers.hour_from_unix_timestamp(first_forecast_time)) // self.tick
+
     def __plot_graph(self, arrays_to_plot, array_labels, graph_title):
         """
 
@@ -277,6 +1048,12 @@ class Simulation:
             If number of plots is odd, produces a 1 x len(arrays_to_plot) plot
 
         """
+        # the plotting libraries take most of the time it takes to import the package, so they are only imported
+        # once something is plotted
+        import matplotlib.pyplot as plt
+        import pandas as pd
+        import seaborn as sns
+
         compress_constant = int(self.timestamps.shape[0] / 5000)
 
         sns.set_style("whitegrid")
@@ -316,32 +1093,33 @@ class Simulation:
         _ = plt.tight_layout()
         _ = plt.show()
 
-    def __run_simulation_calculations(self, speed_kmh, verbose=False):
+    def __run_simulation_calculations(self, speed_kmh, verbose=False, objective_only=False):
         """
         Helper method to perform all calculations used in run_model. Returns a SimulationResult object 
         containing members that specify total distance travelled and time taken at the end of the simulation
         and final battery state of charge. This is where most of the main simulation logic happens.
 
+        All calculations are performed along the last axis, so speed_kmh may also be a 2D array where each row is
+        a separate speed profile (see run_batch). In that case the result members are arrays with one entry per
+        row, time_taken is given in seconds, and the state of this Simulation object is left untouched.
+
         :param speed_kmh: array that specifies the solar car's driving speed (in km/h) at each time step
+        :param verbose: Boolean to control logging and debugging behaviour
+        :param objective_only: if True, skips everything that does not contribute to the distance travelled and
+            only returns the distance travelled (in km) instead of a SimulationResult
         """
 
-        tick_array = np.diff(self.timestamps)
-        tick_array = np.insert(tick_array, 0, 0)
-
-        # ----- Setting up Timing Constraints -----
-
-        # Implementing day start/end charging (Charge from 7am-9am and 6pm-8pm) for ASC and
-        # (Charge from 8am-9am and 6pm-8pm) for FSGP
-        # ASC: 13 Hours of Race Day, 9 Hours of Driving
+        single_profile = speed_kmh.ndim == 1
 
-        simulation_hours = np.arange(self.start_hour, self.start_hour + self.simulation_duration / (60 * 60))
+        # route and settings dependent arrays are precomputed once in the SimulationContext
+        context = self.context
 
-        simulation_hours_by_second = np.append(np.repeat(simulation_hours, 3600),
-                                               self.start_hour + self.simulation_duration / (60 * 60)).astype(int)
+        tick_array = context.tick_array
 
-        driving_time_boolean = [(simulation_hours_by_second % 24) <= 8, (simulation_hours_by_second % 24) >= 18]
+        # ----- Setting up Timing Constraints -----
 
-        not_charge = np.invert(np.logical_or.reduce(driving_time_boolean))
+        # ASC: 13 Hours of Race Day, 9 Hours of Driving
+        not_charge = context.not_charge
 
         # ----- Apply Timing Constraints to Speed Array -----
 
@@ -350,7 +1128,7 @@ class Simulation:
         # Acceleration currently is broken and I'm not sure why. Have to take another look at this soon.
         # speed_kmh = helpers.add_acceleration(speed_kmh, 500)
 
-        if verbose:
+        if verbose and single_profile and not objective_only:
             print("no way i'm in  here right")
             self.__plot_graph([not_charge], ["not charge"], "not charge")
             self.__plot_graph([speed_kmh], ["updated speed (km/h)"], "speed")
@@ -360,7 +1138,7 @@ class Simulation:
         # Array of cumulative distances obtained from the timestamps
 
         distances = tick_array * speed_kmh / 3.6
-        cumulative_distances = np.cumsum(distances)
+        cumulative_distances = np.cumsum(distances, axis=-1)
 
         temp = cumulative_distances
 
@@ -372,60 +1150,61 @@ class Simulation:
             closest_weather_indices is a 1:1 mapping between a weather condition, and its closest point on a map.
         """
 
-        closest_gis_indices = self.gis.calculate_closest_gis_indices(cumulative_distances)
-        closest_weather_indices = self.weather.calculate_closest_weather_indices(cumulative_distances)
-
-        path_distances = self.gis.path_distances
-        cumulative_distances = np.cumsum(path_distances)  # [cumulative_distances] = meters
+        closest_gis_indices = helpers.calculate_closest_indices(cumulative_distances, context.path_midpoints)
+        closest_weather_indices = helpers.calculate_closest_indices(cumulative_distances, context.weather_midpoints)
 
-        max_route_distance = cumulative_distances[-1]
+        max_route_distance = context.max_route_distance
 
-        self.route_length = max_route_distance / 1000.0  # store the route length in kilometers
+        self.route_length = context.route_length  # store the route length in kilometers
 
         # Array of elevations at every route point
-        gis_route_elevations = self.gis.get_path_elevations()
-
-        gis_route_elevations_at_each_tick = gis_route_elevations[closest_gis_indices]
+        gis_route_elevations_at_each_tick = context.path_elevations[closest_gis_indices]
 
         # Get the azimuth angle of the vehicle at every location
-        gis_vehicle_bearings = self.vehicle_bearings[closest_gis_indices]
+        gis_vehicle_bearings = context.path_bearings[closest_gis_indices]
 
         # Get array of path gradients
-        gradients = self.gis.get_gradients(closest_gis_indices)
+        gradients = context.path_gradients[closest_gis_indices]
 
         # ----- Timing Calculations -----
 
         # Get time zones at each point on the GIS path
-        time_zones = self.gis.get_time_zones(closest_gis_indices)
+        time_zones = context.path_time_zones[closest_gis_indices]
 
         # Local times in UNIX timestamps
-        local_times = adjust_timestamps_to_local_times(self.timestamps, self.time_of_initialization, time_zones)
-
-        # only for reference (may be used in the future)
-        local_times_datetime = np.array(
-            [datetime.datetime.utcfromtimestamp(local_unix_time) for local_unix_time in local_times])
-        time_of_day_hour = np.array([helpers.hour_from_unix_timestamp(ti) for ti in local_times])
+        local_times = adjust_timestamps_to_local_times(context.timestamps, self.time_of_initialization, time_zones)
 
         # Get the weather at every location
         weather_forecasts = self.weather.get_weather_forecast_in_time(closest_weather_indices, local_times)
-        roll_by_tick = 3600 * (24 + self.start_hour - helpers.hour_from_unix_timestamp(weather_forecasts[0, 2]))
-        weather_forecasts = np.roll(weather_forecasts, -roll_by_tick, 0)
-        absolute_wind_speeds = weather_forecasts[:, 5]
-        wind_directions = weather_forecasts[:, 6]
-        cloud_covers = weather_forecasts[:, 7]
 
-        # TODO: remove after done with testing
-        cloud_covers = np.zeros_like(cloud_covers)
+        # every speed profile starts at the same place and time, so the first forecast is shared by all of them
+        roll_by_tick = self.__get_wind_roll(weather_forecasts[..., 0, 2].flat[0])
+        absolute_wind_speeds = np.roll(weather_forecasts[..., 5], -roll_by_tick, -1)
+        wind_directions = np.roll(weather_forecasts[..., 6], -roll_by_tick, -1)
+
+        # TODO: remove after done with testing (cloud cover is weather_forecasts[..., 7], rolled the same way)
+        cloud_covers = np.zeros(weather_forecasts.shape[:-1])
 
         # Get the wind speeds at every location
         wind_speeds = get_array_directional_wind_speed(gis_vehicle_bearings, absolute_wind_speeds,
                                                        wind_directions)
 
         # Get an array of solar irradiance at every coordinate and time
-        solar_irradiances = self.solar_calculations.calculate_array_GHI(self.route_coords[closest_gis_indices],
-                                                                        time_zones, local_times,
-                                                                        gis_route_elevations_at_each_tick,
-                                                                        cloud_covers)
+        route_coords_at_each_tick = context.route_coords[closest_gis_indices]
+
+        if objective_only:
+            # same calculation as calculate_array_GHI, without its timing printout
+            day_of_year, local_time = time_utils.get_day_of_year_and_local_hour(local_times)
+            solar_irradiances = self.solar_calculations.calculate_GHI(route_coords_at_each_tick[..., 0],
+                                                                      route_coords_at_each_tick[..., 1],
+                                                                      time_zones, day_of_year, local_time,
+                                                                      gis_route_elevations_at_each_tick,
+                                                                      cloud_covers)
+        else:
+            solar_irradiances = self.solar_calculations.calculate_array_GHI(route_coords_at_each_tick,
+                                                                            time_zones, local_times,
+                                                                            gis_route_elevations_at_each_tick,
+                                                                            cloud_covers)
 
         # TLDR: we have now obtained solar irradiances, wind speeds, and gradients at each tick
 
@@ -445,15 +1224,9 @@ class Simulation:
         # net energy added to the battery
         delta_energy = produced_energy - consumed_energy
 
-        # ----- Array initialisation -----
-
-        # used to calculate the time the car was in motion
-        tick_array = np.full_like(self.timestamps, fill_value=self.tick, dtype='f4')
-        tick_array[0] = 0
-
         # ----- Array calculations -----
 
-        cumulative_delta_energy = np.cumsum(delta_energy)
+        cumulative_delta_energy = np.cumsum(delta_energy, axis=-1)
         battery_variables_array = self.basic_battery.update_array(cumulative_delta_energy)
 
         # stores the battery SOC at each time step
@@ -465,7 +1238,7 @@ class Simulation:
         # when the car is charging the car does not move
         # at night the car does not move
 
-        if verbose:
+        if verbose and single_profile and not objective_only:
             self.__plot_graph([temp, closest_gis_indices, closest_weather_indices],
                               ["speed dist (m)", "gis ind", "weather ind"], "Distances and indices")
             self.__plot_graph([gradients, time_zones, gis_vehicle_bearings],
@@ -483,26 +1256,32 @@ class Simulation:
         else:
             speed_kmh = np.logical_and(not_charge, state_of_charge) * speed_kmh
 
-        time_in_motion = np.logical_and(tick_array, speed_kmh) * self.tick
+        # used to calculate the time the car was in motion
+        time_in_motion = np.logical_and(context.motion_tick_array, speed_kmh) * self.tick
+
+        if objective_only:
+            distance = speed_kmh * (time_in_motion / 3600)
+            distance_travelled = np.cumsum(distance, axis=-1)[..., -1].clip(0, max_route_distance / 1000)
 
-        final_soc = state_of_charge[-1] * 100 + 0.
+            # a single profile gives a scalar, not a 0-d array
+            return distance_travelled[()]
+
+        final_soc = state_of_charge[..., -1] * 100 + 0.
 
         distance = speed_kmh * (time_in_motion / 3600)
-        distances = np.cumsum(distance)
+        distances = np.cumsum(distance, axis=-1)
 
         # Car cannot exceed Max distance, and it is not in motion after exceeded
         distances = distances.clip(0, max_route_distance / 1000)
 
-        try:
-            max_dist_index = np.where(distances == max_route_distance / 1000)[0][0]
-        except IndexError:
-            max_dist_index = len(time_in_motion)
+        reached_route_end = distances == max_route_distance / 1000
+        max_dist_index = np.where(np.any(reached_route_end, axis=-1), np.argmax(reached_route_end, axis=-1),
+                                  distances.shape[-1])
 
-        time_in_motion = np.array(
-            (list(time_in_motion[0:max_dist_index])) + list(np.zeros_like(time_in_motion[max_dist_index:])))
+        in_motion_before_end = np.arange(distances.shape[-1]) < np.expand_dims(max_dist_index, -1)
+        time_in_motion = np.where(in_motion_before_end, time_in_motion, 0)
 
-        time_taken = np.sum(time_in_motion)
-        time_taken = str(datetime.timedelta(seconds=int(time_taken)))
+        time_taken = np.sum(time_in_motion, axis=-1)
 
         results = SimulationResult()
 
@@ -516,11 +1295,149 @@ class Simulation:
             gis_route_elevations_at_each_tick,
             cloud_covers
         ]
-        results.distance_travelled = distances[-1]
-        results.time_taken = time_taken
-        results.final_soc = final_soc
 
-        self.time_zones = time_zones
-        self.local_times = local_times
+        if single_profile:
+            results.distance_travelled = distances[-1]
+            results.final_soc = final_soc[()]
+            results.time_taken = str(datetime.timedelta(seconds=int(time_taken)))
+
+            self.time_zones = time_zones
+            self.local_times = local_times
+        else:
+            results.distance_travelled = distances[..., -1]
+            results.final_soc = final_soc
+            results.time_taken = time_taken
 
         return results
+
+    def __run_incremental_calculations(self, speed_kmh):
+        """
+        Performs the same calculations as __run_simulation_calculations with objective_only set to True, but
+        resumes from the checkpoints of the previous incremental run instead of starting at t=0.
+
+        Every stage is causal (the state at a tick only depends on the speed up to that tick) except for the
+        weather, which is rolled in time. So the position dependent arrays are recomputed from the first tick k
+        whose speed changed, the wind is re-rolled over the whole simulation, and the energy and distance arrays
+        are recomputed from the first tick at which either the position or the wind changed. Cumulative sums are
+        continued from the checkpointed running totals, so the result is bit-for-bit identical to a full run.
+
+        :param speed_kmh: (float[N]) the solar car's driving speed (in km/h) at each time step
+        :returns: (float) distance travelled in km
+        """
+
+        context = self.context
+        checkpoints = self.__checkpoints
+        fingerprint = self.get_fingerprint()
+
+        # the checkpoints are updated in place, so they are only kept if this run completes
+        self.__checkpoints = None
+
+        # checkpoints of a run with different settings, route, weather or car parameters do not apply
+        if checkpoints is not None and checkpoints["fingerprint"] != fingerprint:
+            checkpoints = None
+
+        # the car does not move while charging, so speed changes during the charging windows make no difference
+        speed_kmh = np.logical_and(speed_kmh, context.not_charge) * speed_kmh
+
+        if checkpoints is None:
+            # nothing to resume from, so the first run computes every tick
+            num_ticks = speed_kmh.shape[0]
+            checkpoints = {name: np.zeros(num_ticks, dtype=dtype) for name, dtype in [
+                ("speed_kmh", float), ("cumulative_distances", float), ("closest_gis_indices", int),
+                ("time_zones", float), ("local_times", np.uint64),
+                ("solar_irradiances", float), ("absolute_wind_speeds", float), ("wind_directions", float),
+                ("wind_speeds", float), ("cumulative_delta_energy", float),
+                ("travel_distances", float)]}
+            checkpoints["fingerprint"] = fingerprint
+            k = 0
+        else:
+            changed_ticks = np.flatnonzero(speed_kmh != checkpoints["speed_kmh"])
+            if changed_ticks.size == 0:
+                self.__checkpoints = checkpoints
+                return checkpoints["distance_travelled"]
+            k = changed_ticks[0]
+
+        checkpoints["speed_kmh"][k:] = speed_kmh[k:]
+
+        def running_total(name, tick):
+            return checkpoints[name][tick - 1] if tick > 0 else None
+
+        # ----- Position dependent calculations, from tick k -----
+
+        distances = context.tick_array[k:] * speed_kmh[k:] / 3.6
+        cumulative_distances = helpers.resume_cumsum(distances, running_total("cumulative_distances", k))
+        checkpoints["cumulative_distances"][k:] = cumulative_distances
+
+        closest_gis_indices = helpers.calculate_closest_indices(cumulative_distances, context.path_midpoints)
+        closest_weather_indices = helpers.calculate_closest_indices(cumulative_distances, context.weather_midpoints)
+        checkpoints["closest_gis_indices"][k:] = closest_gis_indices
+
+        checkpoints["time_zones"][k:] = context.path_time_zones[closest_gis_indices]
+        time_zones = checkpoints["time_zones"]
+
+        # local times are relative to the time zone at the start, which never changes
+        checkpoints["local_times"][k:] = adjust_timestamps_to_local_times(context.timestamps,
+                                                                          self.time_of_initialization, time_zones)[k:]
+        local_times = checkpoints["local_times"]
+
+        weather_forecasts = self.weather.get_weather_forecast_in_time(closest_weather_indices, local_times[k:])
+        checkpoints["absolute_wind_speeds"][k:] = weather_forecasts[:, 5]
+        checkpoints["wind_directions"][k:] = weather_forecasts[:, 6]
+
+        if k == 0:
+            # every run starts at the same place and time, so the first forecast is shared by all of them
+            checkpoints["roll_by_tick"] = self.__get_wind_roll(weather_forecasts[0, 2])
+
+        route_coords_at_each_tick = context.route_coords[closest_gis_indices]
+        day_of_year, local_time = time_utils.get_day_of_year_and_local_hour(local_times[k:])
+        checkpoints["solar_irradiances"][k:] = self.solar_calculations.calculate_GHI(
+            route_coords_at_each_tick[:, 0], route_coords_at_each_tick[:, 1], time_zones[k:], day_of_year,
+            local_time, context.path_elevations[closest_gis_indices], np.zeros(len(closest_gis_indices)))
+
+        # ----- Wind, over the whole simulation since the weather is rolled in time -----
+
+        roll_by_tick = checkpoints["roll_by_tick"]
+        gis_vehicle_bearings = context.path_bearings[checkpoints["closest_gis_indices"]]
+        wind_speeds = get_array_directional_wind_speed(gis_vehicle_bearings,
+                                                       np.roll(checkpoints["absolute_wind_speeds"], -roll_by_tick),
+                                                       np.roll(checkpoints["wind_directions"], -roll_by_tick))
+
+        changed_wind_ticks = np.flatnonzero(wind_speeds[:k] != checkpoints["wind_speeds"][:k])
+        j = changed_wind_ticks[0] if changed_wind_ticks.size > 0 else k
+        checkpoints["wind_speeds"][j:] = wind_speeds[j:]
+
+        # ----- Energy calculations, from tick j -----
+
+        gradients = context.path_gradients[checkpoints["closest_gis_indices"][j:]]
+
+        lvs_consumed_energy = self.basic_lvs.get_consumed_energy()
+        motor_consumed_energy = self.basic_motor.calculate_energy_in(speed_kmh[j:], gradients, wind_speeds[j:],
+                                                                     self.tick)
+        array_produced_energy = self.basic_array.calculate_produced_energy(checkpoints["solar_irradiances"][j:],
+                                                                           self.tick)
+
+        motor_consumed_energy = np.logical_and(motor_consumed_energy, context.not_charge[j:]) * motor_consumed_energy
+
+        delta_energy = array_produced_energy - (motor_consumed_energy + lvs_consumed_energy)
+
+        cumulative_delta_energy = helpers.resume_cumsum(delta_energy, running_total("cumulative_delta_energy", j))
+        checkpoints["cumulative_delta_energy"][j:] = cumulative_delta_energy
+
+        state_of_charge = self.basic_battery.update_array(cumulative_delta_energy)[0]
+        state_of_charge[np.abs(state_of_charge) < 1e-03] = 0
+
+        # ----- Distance travelled, from tick j -----
+
+        speed_kmh = np.logical_and(context.not_charge[j:], state_of_charge) * speed_kmh[j:]
+        time_in_motion = np.logical_and(context.motion_tick_array[j:], speed_kmh) * self.tick
+
+        travel_distances = helpers.resume_cumsum(speed_kmh * (time_in_motion / 3600),
+                                                 running_total("travel_distances", j))
+        checkpoints["travel_distances"][j:] = travel_distances
+
+        distance_travelled = travel_distances[-1:].clip(0, context.max_route_distance / 1000)[0]
+        checkpoints["distance_travelled"] = distance_travelled
+
+        self.__checkpoints = checkpoints
+
+        return distance_travelled
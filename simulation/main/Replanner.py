@@ -0,0 +1,67 @@
+import time
+
+import simulation
+from simulation.main.SpeedPlanner import SpeedPlanner
+
+
+class Replanner:
+    def __init__(self, simulation_model=None, race_type="ASC", **planner_kwargs):
+        """
+        Instantiates a Replanner object. This re-plans the speed for the rest of the race from the current
+        position, state of charge and time of the car, for use during the race.
+
+        Loading the route and weather, precomputing the route arrays (see SimulationContext) and the segment
+        tables of the SpeedPlanner are all done once, here. Every call to replan then only runs the dynamic
+        programming of SpeedPlanner.plan from the current state of the car, which takes well under a second.
+
+        :param simulation_model: Simulation object to plan for. If None, a Simulation of race_type is created.
+        :param race_type: (str) race type of the Simulation created when simulation_model is None
+        :param planner_kwargs: keyword arguments of the SpeedPlanner, e.g. segment_length or soc_bins
+        """
+
+        self.simulation_model = simulation.Simulation(race_type) if simulation_model is None else simulation_model
+        self.speed_planner = SpeedPlanner(self.simulation_model, **planner_kwargs)
+
+        self.latest_plan = None
+        self.latency = None
+
+    def get_simulation_time(self, wall_clock_time):
+        """
+        :param wall_clock_time: (float) UNIX time, in the convention of Simulation.time_of_initialization
+        :returns: (float) time since the start of the simulation, in seconds
+        """
+
+        return wall_clock_time - self.simulation_model.time_of_initialization
+
+    def replan(self, distance, state_of_charge, wall_clock_time, objective="distance", target_distance=None):
+        """
+        Plans the speed for the rest of the race from the current state of the car.
+
+        :param distance: (float) distance of the car from the start of the route, in km
+        :param state_of_charge: (float) current battery state of charge (0 - 1)
+        :param wall_clock_time: (float) current UNIX time, in the convention of Simulation.time_of_initialization
+        :param objective: "distance" or "time", see SpeedPlanner.plan
+        :param target_distance: (float) distance from the start of the route to reach, in km, see SpeedPlanner.plan
+        :returns: SpeedPlan object starting at the current state of the car, with times since the start of the
+            simulation. It is also stored in latest_plan, and the time taken to compute it, in seconds, in latency.
+        """
+
+        start_time = self.get_simulation_time(wall_clock_time)
+
+        if not 0 <= start_time <= self.simulation_model.simulation_duration:
+            raise ValueError(f"The time {wall_clock_time} is {start_time:.0f}s from the start of the simulation, "
+                             f"which is outside of the simulation duration")
+        if not 0 <= distance <= self.simulation_model.context.route_length:
+            raise ValueError(f"The distance {distance}km is not on the route, which is "
+                             f"{self.simulation_model.context.route_length:.2f}km long")
+        if not 0 <= state_of_charge <= 1:
+            raise ValueError(f"The state of charge must be between 0 and 1, not {state_of_charge}")
+
+        start = time.perf_counter()
+        plan = self.speed_planner.plan(objective=objective, target_distance=target_distance,
+                                       initial_soc=state_of_charge, start_distance=distance, start_time=start_time)
+
+        self.latency = time.perf_counter() - start
+        self.latest_plan = plan
+
+        return plan
@@ -0,0 +1,267 @@
+import copy
+import time
+
+import numpy as np
+
+from simulation.common import helpers
+
+
+def _evaluate_chunk(samples):
+    return helpers.get_worker_object().evaluate(samples)
+
+
+class _ScaledBattery:
+    def __init__(self, battery, capacity_scale):
+        """
+        A battery with the energy capacity of battery multiplied by capacity_scale, as if cells were added in
+        parallel. At the same state of charge every energy is scaled and the voltage is unchanged, so the state of
+        charge after an energy change is the one of the original battery after the scaled down energy change.
+
+        :param battery: BasicBattery object to scale
+        :param capacity_scale: (float[K][1]) factor the energy capacity is multiplied by, one row per speed profile
+        """
+
+        self.battery = battery
+        self.capacity_scale = capacity_scale
+
+    def update_array(self, cumulative_energy_array):
+        soc_array, voltage_array, stored_energy_array = self.battery.update_array(
+            cumulative_energy_array / self.capacity_scale)
+
+        return soc_array, voltage_array, stored_energy_array * self.capacity_scale
+
+
+class SensitivityAnalysis:
+
+    # car constants that can be analysed, with the Simulation attribute of the component that holds them
+    PARAMETERS = {
+        "vehicle_mass": "basic_motor",
+        "road_friction": "basic_motor",
+        "tire_radius": "basic_motor",
+        "air_density": "basic_motor",
+        "vehicle_frontal_area": "basic_motor",
+        "drag_coefficient": "basic_motor",
+        "panel_efficiency": "basic_array",
+        "panel_size": "basic_array",
+        "max_energy_capacity": "basic_battery",
+    }
+
+    def __init__(self, simulation_model, speed, parameter_bounds=None, relative_range=0.1, chunk_size=16,
+                 workers=1):
+        """
+        Instantiates a SensitivityAnalysis object. This finds which car constants the distance travelled with a
+        speed profile depends on most, with the Morris (elementary effects) and Sobol (variance based) methods.
+
+        Every sample of the parameters is simulated with the same speed profile. Samples are simulated
+        chunk_size at a time with Simulation.objective, with the parameters of the chunk set on copies of the car
+        components as column arrays, so the car models calculate every sample of the chunk at once. With
+        workers > 1 the chunks are spread over a pool of worker processes, forked where the platform supports it.
+
+        :param simulation_model: Simulation object whose route, weather, settings and car models are simulated
+        :param speed: (float[M]) speed set-points in km/h, stretched over the simulation duration as in run_model
+        :param parameter_bounds: dictionary of the (lower, upper) bounds of every parameter to analyse, keyed by
+            names in PARAMETERS. Defaults to every parameter in PARAMETERS.
+        :param relative_range: (float) the bounds of parameters in parameter_bounds given as None are the
+            current value of the parameter plus or minus this fraction of it
+        :param chunk_size: (int) maximum number of samples to simulate at once
+        :param workers: (int) number of worker processes
+        """
+
+        if parameter_bounds is None:
+            parameter_bounds = dict.fromkeys(self.PARAMETERS)
+
+        unknown_parameters = set(parameter_bounds) - set(self.PARAMETERS)
+        if unknown_parameters:
+            raise ValueError(f"Unknown car parameters: {sorted(unknown_parameters)}. "
+                             f"Choose from {list(self.PARAMETERS)}.")
+
+        self.simulation_model = simulation_model
+        self.speed = np.asarray(speed, dtype=float)
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+        self.parameter_names = list(parameter_bounds)
+        self.bounds = np.empty((len(self.parameter_names), 2))
+
+        for i, name in enumerate(self.parameter_names):
+            if parameter_bounds[name] is None:
+                value = getattr(getattr(simulation_model, self.PARAMETERS[name]), name)
+                self.bounds[i] = (1 - relative_range) * value, (1 + relative_range) * value
+            else:
+                self.bounds[i] = parameter_bounds[name]
+
+    def evaluate(self, samples):
+        """
+        Simulates the speed profile for every sample of the parameters, chunk_size samples at a time.
+
+        :param samples: (float[K][P]) values of the parameters, in the order of parameter_names
+        :returns: (float[K]) distance travelled with every sample, in km
+        """
+
+        samples = np.atleast_2d(samples)
+        distances = np.empty(samples.shape[0])
+
+        for start in range(0, samples.shape[0], self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            simulation_model = self.__get_simulation_model(samples[chunk])
+
+            # objective is not timed, so nothing is printed for every chunk
+            speed_matrix = np.tile(self.speed, (samples[chunk].shape[0], 1))
+            distances[chunk] = simulation_model.objective(speed=speed_matrix)
+
+        return distances
+
+    def morris(self, num_trajectories=20, num_levels=4, seed=None):
+        """
+        Screens the parameters with the Morris method. Each trajectory starts at a random point of a grid of
+        num_levels values per parameter, and changes the parameters one at a time, in random order, by
+        num_levels / (2 * (num_levels - 1)) of their range. The change in distance at every step is an elementary
+        effect of that parameter. This takes num_trajectories * (P + 1) simulations.
+
+        :param num_trajectories: (int) number of trajectories
+        :param num_levels: (int) number of grid values per parameter
+        :param seed: seed of the random trajectories
+        :returns: report dictionary with, for every parameter, mu_star (mean absolute elementary effect, in km
+            over the range of the parameter), mu (mean elementary effect) and sigma (standard deviation of the
+            elementary effects), the parameters ranked by mu_star, and the number of simulations and time taken
+        """
+
+        rng = np.random.default_rng(seed)
+        num_parameters = len(self.parameter_names)
+        delta = num_levels / (2 * (num_levels - 1))
+
+        # points of every trajectory in the unit hypercube, and the parameter changed at every step
+        unit_points = np.empty((num_trajectories, num_parameters + 1, num_parameters))
+        orders = np.empty((num_trajectories, num_parameters), dtype=int)
+        steps = np.empty((num_trajectories, num_parameters))
+
+        for trajectory in range(num_trajectories):
+            point = rng.integers(0, num_levels, num_parameters) / (num_levels - 1)
+            orders[trajectory] = rng.permutation(num_parameters)
+
+            unit_points[trajectory, 0] = point
+            for step, parameter in enumerate(orders[trajectory]):
+                steps[trajectory, step] = delta if point[parameter] + delta <= 1 else -delta
+                point = point.copy()
+                point[parameter] += steps[trajectory, step]
+                unit_points[trajectory, step + 1] = point
+
+        start_time = time.perf_counter()
+        distances = self.__evaluate_in_parallel(self.__scale(unit_points.reshape(-1, num_parameters)))
+        elapsed_time = time.perf_counter() - start_time
+
+        distances = distances.reshape(num_trajectories, num_parameters + 1)
+        elementary_effects = np.empty((num_trajectories, num_parameters))
+        elementary_effects[np.arange(num_trajectories)[:, np.newaxis], orders] = np.diff(distances, axis=1) / steps
+
+        indices = {
+            name: {
+                "mu_star": np.mean(np.abs(elementary_effects[:, i])),
+                "mu": np.mean(elementary_effects[:, i]),
+                "sigma": np.std(elementary_effects[:, i]),
+            }
+            for i, name in enumerate(self.parameter_names)
+        }
+
+        return self.__build_report(indices, "mu_star", distances.size, elapsed_time)
+
+    def sobol(self, num_samples=256, seed=None):
+        """
+        Calculates the first order and total Sobol indices of every parameter, with the estimators of Saltelli
+        (first order) and Jansen (total) on two scrambled Sobol sequence sample matrices A and B. This takes
+        num_samples * (P + 2) simulations.
+
+        :param num_samples: (int) number of rows of A and B, best a power of 2
+        :param seed: seed of the scrambling
+        :returns: report dictionary with, for every parameter, the first order index S1 (fraction of the variance
+            of the distance caused by the parameter alone) and total index ST (fraction of the variance the
+            parameter is involved in), the parameters ranked by ST, and the number of simulations and time taken
+        """
+
+        from scipy.stats import qmc
+
+        num_parameters = len(self.parameter_names)
+
+        unit_samples = qmc.Sobol(d=2 * num_parameters, scramble=True, seed=seed).random(num_samples)
+        a, b = unit_samples[:, :num_parameters], unit_samples[:, num_parameters:]
+
+        # A with column i taken from B, for every parameter i
+        ab = np.repeat(a[np.newaxis], num_parameters, axis=0)
+        ab[np.arange(num_parameters), :, np.arange(num_parameters)] = b.T
+
+        start_time = time.perf_counter()
+        distances = self.__evaluate_in_parallel(self.__scale(np.concatenate([a, b, ab.reshape(-1, num_parameters)])))
+        elapsed_time = time.perf_counter() - start_time
+
+        f_a, f_b = distances[:num_samples], distances[num_samples:2 * num_samples]
+        f_ab = distances[2 * num_samples:].reshape(num_parameters, num_samples)
+
+        variance = np.var(np.concatenate([f_a, f_b]))
+
+        # if the distance does not vary at all, no parameter has any influence
+        if variance > 0:
+            first_order = np.mean(f_b * (f_ab - f_a), axis=1) / variance
+            total = 0.5 * np.mean((f_a - f_ab) ** 2, axis=1) / variance
+        else:
+            first_order = total = np.zeros(num_parameters)
+
+        indices = {name: {"S1": first_order[i], "ST": total[i]} for i, name in enumerate(self.parameter_names)}
+
+        return self.__build_report(indices, "ST", distances.size, elapsed_time)
+
+    def __get_simulation_model(self, samples):
+        """
+        :param samples: (float[K][P]) values of the parameters
+        :returns: copy of the Simulation object whose car components hold the parameters of every sample as
+            (float[K][1]) column arrays. The original Simulation object and its components are left untouched.
+        """
+
+        simulation_model = copy.copy(self.simulation_model)
+
+        # the cache holds distances of the original car
+        simulation_model.cache = None
+
+        for component in set(self.PARAMETERS[name] for name in self.parameter_names):
+            setattr(simulation_model, component, copy.copy(getattr(self.simulation_model, component)))
+
+        for i, name in enumerate(self.parameter_names):
+            component = getattr(simulation_model, self.PARAMETERS[name])
+            values = samples[:, i:i + 1]
+
+            if name == "max_energy_capacity":
+                simulation_model.basic_battery = _ScaledBattery(component, values / component.max_energy_capacity)
+            else:
+                setattr(component, name, values)
+
+        return simulation_model
+
+    def __evaluate_in_parallel(self, samples):
+        """
+        Same as evaluate, with the chunks spread over the worker processes.
+        """
+
+        if self.workers <= 1:
+            return self.evaluate(samples)
+
+        chunks = [samples[start:start + self.chunk_size] for start in range(0, samples.shape[0], self.chunk_size)]
+
+        with helpers.make_worker_pool(self, self.workers) as pool:
+            return np.concatenate(pool.map(_evaluate_chunk, chunks))
+
+    def __scale(self, unit_samples):
+        """
+        :param unit_samples: (float[K][P]) points in the unit hypercube
+        :returns: (float[K][P]) the points scaled to the bounds of every parameter
+        """
+
+        return self.bounds[:, 0] + unit_samples * (self.bounds[:, 1] - self.bounds[:, 0])
+
+    @staticmethod
+    def __build_report(indices, ranking_key, num_simulations, elapsed_time):
+        return {
+            "indices": indices,
+            "ranking": sorted(indices, key=lambda name: indices[name][ranking_key], reverse=True),
+            "num_simulations": num_simulations,
+            "time_taken": elapsed_time,
+            "simulations_per_second": num_simulations / elapsed_time,
+        }
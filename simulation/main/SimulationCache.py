@@ -0,0 +1,139 @@
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SimulationCache:
+    def __init__(self, fingerprint, resolution=0.1, max_size=4096, cache_file=None):
+        """
+        Instantiates a SimulationCache object. This is a least-recently-used memo of simulation results, keyed by
+        the input speed array quantized to a given resolution. Speed arrays that round to the same values share
+        an entry, so optimizers that re-evaluate identical or near-identical speeds get the result for free.
+
+        Every entry is only valid for the settings, route and weather that produced it, which is what the
+        fingerprint identifies (see Simulation.get_fingerprint). When a cache_file is given, entries are loaded
+        from it if its fingerprint matches, and written back to it by save().
+
+        :param fingerprint: (str) hash of the simulation inputs that the cached results depend on
+        :param resolution: (float) speed resolution in km/h that input speeds are rounded to
+        :param max_size: (int) maximum number of entries held before the least recently used ones are evicted
+        :param cache_file: (str or Path) optional path of a file the entries are persisted to
+        """
+
+        assert resolution > 0, "resolution must be positive"
+        assert max_size >= 1, "max_size must be a positive integer"
+
+        self.fingerprint = fingerprint
+        self.resolution = resolution
+        self.max_size = max_size
+        self.cache_file = cache_file
+
+        self.hits = 0
+        self.misses = 0
+
+        self.entries = OrderedDict()
+
+        if cache_file is not None and os.path.isfile(cache_file):
+            with open(cache_file, "rb") as f:
+                cache_data = pickle.load(f)
+
+            # results from a different route, weather or settings are not valid here
+            if cache_data["fingerprint"] == fingerprint and cache_data["resolution"] == resolution:
+                print(f"Loaded {len(cache_data['entries'])} cached results from {cache_file}\n")
+                self.entries.update(cache_data["entries"])
+                self.__evict()
+            else:
+                print(f"Cache file {cache_file} was created for different simulation inputs and is ignored\n")
+
+    def quantize(self, speed):
+        """
+        Rounds a speed array to the resolution of the cache.
+
+        :param speed: (float[M]) speed array in km/h
+        :returns: (float[M]) speed array rounded to the closest multiple of the resolution
+        """
+
+        return np.round(np.asarray(speed, dtype=float) / self.resolution) * self.resolution
+
+    def get_key(self, speed):
+        """
+        :param speed: (float[M]) speed array in km/h
+        :returns: (tuple) hashable key of the quantized speed array
+        """
+
+        return tuple(np.round(np.asarray(speed, dtype=float) / self.resolution).astype(np.int64).tolist())
+
+    def get(self, speed):
+        """
+        Looks up the cached result of a speed array, and marks it as the most recently used.
+
+        :param speed: (float[M]) speed array in km/h
+        :returns: the cached result, or None if the speed array has not been simulated yet
+        """
+
+        key = self.get_key(speed)
+
+        if key not in self.entries:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, speed, result):
+        """
+        Stores the result of a speed array, evicting the least recently used entries if the cache is full.
+
+        :param speed: (float[M]) speed array in km/h
+        :param result: result of simulating the quantized speed array
+        """
+
+        key = self.get_key(speed)
+
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        self.__evict()
+
+    def save(self):
+        """
+        Writes the cached entries to the cache file, if one was given.
+        """
+
+        if self.cache_file is None:
+            return
+
+        with open(self.cache_file, "wb") as f:
+            pickle.dump({"fingerprint": self.fingerprint, "resolution": self.resolution, "entries": self.entries}, f)
+
+        print(f"Saved {len(self.entries)} cached results to {self.cache_file}\n")
+
+    def set_fingerprint(self, fingerprint):
+        """
+        Updates the fingerprint of the simulation inputs. The cached entries are cleared if it has changed, since
+        they were simulated with different inputs.
+
+        :param fingerprint: (str) hash of the current simulation inputs
+        """
+
+        if fingerprint != self.fingerprint:
+            self.clear()
+            self.fingerprint = fingerprint
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __evict(self):
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return (f"SimulationCache: {len(self.entries)}/{self.max_size} entries, "
+                f"{self.hits} hits, {self.misses} misses, resolution {self.resolution}km/h")
@@ -0,0 +1,110 @@
+import json
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from simulation.common.exceptions import SimulationServerError
+from simulation.main.SimulationResult import SimulationResult
+from simulation.main.SpeedPlan import SpeedPlan
+from simulation.main.SimulationServer import to_json
+
+
+class SimulationClient:
+    def __init__(self, url="http://127.0.0.1:8765", race_type="ASC", timeout=None):
+        """
+        Instantiates a SimulationClient object. This calls the methods of a Simulation object held by a
+        SimulationServer, and mirrors their signatures and return values.
+
+        :param url: (str) address of the SimulationServer
+        :param race_type: (str) race type of the Simulation object to use
+        :param timeout: (float) time in seconds to wait for a response, or None to wait indefinitely
+        """
+
+        self.url = url.rstrip("/")
+        self.race_type = race_type
+        self.timeout = timeout
+
+    def get_status(self):
+        """
+        :returns: dictionary with the race types served and the number of requests handled by the server
+        """
+
+        return self.__request("status")
+
+    def run_model(self, speed):
+        """
+        Same as Simulation.run_model with plot_results=False.
+
+        :param speed: (float[M]) speed set-points in km/h
+        :returns: (float) distance travelled in km
+        """
+
+        return self.__request("run_model", {"speed": speed})
+
+    def run_batch(self, speed_matrix, chunk_size=8):
+        """
+        Same as Simulation.run_batch.
+
+        :param speed_matrix: (float[K][M]) K speed profiles (km/h), each with M set-points
+        :param chunk_size: (int) maximum number of profiles the server simulates at once
+        :returns: SimulationResult where distance_travelled (km), time_taken (s) and final_soc (%) are (float[K])
+            arrays holding the result of each profile
+        """
+
+        result = self.__request("run_batch", {"speed_matrix": speed_matrix, "chunk_size": chunk_size})
+
+        return SimulationResult(distance_travelled=np.array(result["distance_travelled"]),
+                                time_taken=np.array(result["time_taken"]),
+                                final_soc=np.array(result["final_soc"]))
+
+    def optimize_multi_fidelity(self, **kwargs):
+        """
+        Same as Simulation.optimize_multi_fidelity, with the same keyword arguments.
+
+        :returns: tuple of the best point found and the fidelity report
+        """
+
+        result = self.__request("optimize_multi_fidelity", kwargs)
+
+        return result["max"], result["fidelity_report"]
+
+    def plan(self, **kwargs):
+        """
+        Same as SpeedPlanner.plan on a SpeedPlanner of the served Simulation, with the same keyword arguments.
+
+        :returns: SpeedPlan object
+        """
+
+        result = self.__request("plan", kwargs)
+
+        return SpeedPlan(**{key: np.array(value) for key, value in result.items()})
+
+    def __request(self, method, arguments=None):
+        """
+        Sends a request to the server. Requests with arguments call a method of the served Simulation and are
+        POSTed, the others are GET requests.
+
+        :param method: (str) name of the method or path requested
+        :param arguments: dictionary of the keyword arguments of the method
+        :raises SimulationServerError: if the server responds with an error
+        :returns: the result member of the response
+        """
+
+        if arguments is not None:
+            data = json.dumps(to_json(dict(arguments, race_type=self.race_type))).encode()
+            request = urllib.request.Request(f"{self.url}/{method}", data=data,
+                                             headers={"Content-Type": "application/json"})
+        else:
+            request = urllib.request.Request(f"{self.url}/{method}")
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())["result"]
+        except urllib.error.HTTPError as error:
+            try:
+                message = json.loads(error.read())["error"]
+            except (ValueError, KeyError):
+                message = error.reason
+
+            raise SimulationServerError(f"{method} failed with status {error.code}: {message}") from None
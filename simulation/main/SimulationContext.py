@@ -0,0 +1,134 @@
+import numpy as np
+
+from simulation.common import helpers
+
+
+class SimulationContext:
+    def __init__(self, tick, simulation_duration, start_hour, gis, weather, route_stride=1):
+        """
+        Instantiates a SimulationContext object. This holds every array used in the simulation calculations that
+        only depends on the route and the simulation settings, and not on the speed of the car. It is built once
+        when a Simulation is created so repeated runs (e.g. from the optimizer) only perform the speed-dependent
+        work.
+
+        The context is immutable: its arrays are read-only and its attributes cannot be reassigned. Build a new
+        context if the route or the settings change.
+
+        A route_stride greater than 1 keeps only every route_stride-th route coordinate (and always the last one),
+        which gives a coarser but cheaper description of the route. The distances between the coordinates that
+        are kept are measured along the full route, so the route length does not change.
+
+        :param tick: (int) length of simulation's discrete time step (in seconds)
+        :param simulation_duration: (int) length of simulated time (in seconds)
+        :param start_hour: (int) hour of the day that the simulation starts at
+        :param gis: GIS object of the route being simulated
+        :param weather: WeatherForecasts object of the route being simulated
+        :param route_stride: (int) spacing of the route coordinates that are kept
+        """
+
+        assert route_stride >= 1, "route_stride must be a positive integer"
+
+        # ----- Time arrays -----
+
+        timestamps = np.arange(0, simulation_duration + tick, tick)
+
+        # time elapsed since the previous timestamp, used to integrate speed into distance
+        tick_array = np.diff(timestamps)
+        tick_array = np.insert(tick_array, 0, 0)
+
+        # tick length at every timestamp, used to calculate the time the car was in motion
+        motion_tick_array = np.full_like(timestamps, fill_value=tick, dtype=float)
+        motion_tick_array[0] = 0
+
+        # ----- Charging windows -----
+
+        not_charge = calculate_not_charge(timestamps, start_hour)
+
+        # ----- Route arrays -----
+
+        route_coords = gis.get_path()
+        path_elevations = gis.get_path_elevations()
+        path_time_zones = gis.path_time_zones
+
+        if route_stride == 1:
+            path_distances = gis.path_distances
+            path_gradients = gis.get_path_gradients()
+            path_bearings = gis.calculate_current_heading_array()
+        else:
+            kept_indices = np.unique(np.append(np.arange(0, len(route_coords), route_stride), len(route_coords) - 1))
+            distances_along_route = np.insert(np.cumsum(gis.path_distances), 0, 0)
+
+            route_coords = route_coords[kept_indices]
+            path_elevations = path_elevations[kept_indices]
+            path_time_zones = path_time_zones[kept_indices]
+
+            path_distances = np.diff(distances_along_route[kept_indices])
+            path_gradients = helpers.calculate_path_gradients(path_elevations, path_distances)
+            path_bearings = helpers.calculate_path_bearings(route_coords)
+
+        cumulative_path_distances = np.cumsum(path_distances)  # [cumulative_path_distances] = meters
+
+        self.tick = tick
+        self.route_stride = route_stride
+        self.timestamps = timestamps
+        self.tick_array = tick_array
+        self.motion_tick_array = motion_tick_array
+        self.not_charge = not_charge
+
+        self.route_coords = route_coords
+        self.path_midpoints = helpers.calculate_path_midpoints(cumulative_path_distances)
+        self.path_elevations = path_elevations
+        self.path_gradients = path_gradients
+        self.path_time_zones = path_time_zones
+        self.path_bearings = path_bearings
+        self.cumulative_path_distances = cumulative_path_distances
+        self.max_route_distance = cumulative_path_distances[-1]
+
+        self.weather_midpoints = weather.weather_midpoints
+
+        # read-only views leave the arrays owned by the GIS and WeatherForecasts objects writeable
+        for name, value in list(vars(self).items()):
+            if isinstance(value, np.ndarray):
+                value = value.view()
+                value.flags.writeable = False
+                setattr(self, name, value)
+
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"SimulationContext is immutable, cannot set '{name}'")
+        super().__setattr__(name, value)
+
+    @property
+    def num_ticks(self):
+        """
+        :returns: (int) number of ticks in the simulation, not counting the stationary starting tick
+        """
+
+        return len(self.timestamps) - 1
+
+    @property
+    def route_length(self):
+        """
+        :returns: (float) length of the route in kilometers
+        """
+
+        return self.max_route_distance / 1000.0
+
+
+def calculate_not_charge(timestamps, start_hour):
+    """
+    Implementing day start/end charging (Charge from 7am-9am and 6pm-8pm) for ASC and
+    (Charge from 8am-9am and 6pm-8pm) for FSGP
+
+    :param timestamps: (int[N]) timestamps starting from 0, in seconds
+    :param start_hour: (int) hour of the day that the simulation starts at
+    :returns: (bool[N]) True at every timestamp at which the car is not charging and may drive
+    """
+
+    simulation_hours = (start_hour + timestamps // 3600).astype(int)
+
+    driving_time_boolean = [(simulation_hours % 24) <= 8, (simulation_hours % 24) >= 18]
+
+    return np.invert(np.logical_or.reduce(driving_time_boolean))
@@ -0,0 +1,180 @@
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import simulation
+from simulation.main.SpeedPlanner import SpeedPlanner
+
+
+def to_json(value):
+    """
+    Converts the NumPy arrays and scalars in value to Python lists and numbers, so value can be encoded as JSON.
+    """
+
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+
+    return value
+
+
+class SimulationServer(ThreadingHTTPServer):
+
+    # a client that disconnects does not keep the server from shutting down
+    daemon_threads = True
+
+    METHODS = ["run_model", "run_batch", "optimize_multi_fidelity", "plan"]
+
+    def __init__(self, address=("127.0.0.1", 8765), race_types=("ASC",)):
+        """
+        Instantiates a SimulationServer object. This is a long-running local HTTP server that holds a prepared
+        Simulation object for every race type, so that strategy tools and notebooks do not each pay for loading
+        the route and weather and precomputing the SimulationContext. Use SimulationClient to talk to it.
+
+        Every request is handled in its own thread, so requests are served concurrently. The NumPy operations
+        that most of the simulation time is spent in release the GIL.
+
+        Requests are POSTed as JSON objects to /<method>, where race_type selects the Simulation and the other
+        members are the keyword arguments of the method. The response is a JSON object with a "result" member,
+        or an "error" member and a 404 (unknown method), 400 (invalid arguments) or 500 (failure) status. The
+        methods are:
+
+        - run_model: speed -> distance travelled (km)
+        - run_batch: speed_matrix, chunk_size -> distance_travelled (km), time_taken (s) and final_soc (%) of
+          every speed profile
+        - optimize_multi_fidelity: keyword arguments of Simulation.optimize_multi_fidelity -> best point and
+          fidelity report
+        - plan: keyword arguments of SpeedPlanner.plan -> members of the SpeedPlan
+
+        GET /status returns the race types served and the number of requests handled.
+
+        :param address: tuple of the host and port to listen on
+        :param race_types: race types to prepare a Simulation object for
+        """
+
+        self.simulations = {race_type: simulation.Simulation(race_type) for race_type in race_types}
+
+        # SpeedPlanners are only prepared once a plan is requested
+        self.speed_planners = {}
+        self.lock = threading.Lock()
+        self.requests_handled = 0
+
+        super().__init__(address, _SimulationRequestHandler)
+
+    def handle_method(self, method, arguments):
+        """
+        Runs a method on the Simulation of the race type given in arguments.
+
+        :param method: (str) name of the method
+        :param arguments: dictionary of the race_type and the keyword arguments of the method
+        :returns: the result of the method, convertible to JSON with to_json
+        """
+
+        arguments = dict(arguments)
+        race_type = arguments.pop("race_type", "ASC")
+
+        if race_type not in self.simulations:
+            raise ValueError(f"The race type {race_type} is not served, choose from {list(self.simulations)}")
+
+        simulation_model = self.simulations[race_type]
+
+        if method == "run_model":
+            speed = np.asarray(arguments["speed"], dtype=float)
+            return simulation_model.run_batch(speed[np.newaxis, :]).distance_travelled[0]
+
+        if method == "run_batch":
+            result = simulation_model.run_batch(np.asarray(arguments.pop("speed_matrix"), dtype=float),
+                                                **arguments)
+            return {"distance_travelled": result.distance_travelled, "time_taken": result.time_taken,
+                    "final_soc": result.final_soc}
+
+        if method == "optimize_multi_fidelity":
+            best_point, fidelity_report = simulation_model.optimize_multi_fidelity(**arguments)
+            return {"max": best_point, "fidelity_report": fidelity_report}
+
+        if method == "plan":
+            with self.lock:
+                if race_type not in self.speed_planners:
+                    self.speed_planners[race_type] = SpeedPlanner(simulation_model)
+
+            plan = self.speed_planners[race_type].plan(**arguments)
+            return {"segment_boundaries": plan.segment_boundaries, "speeds": plan.speeds,
+                    "departure_times": plan.departure_times, "arrival_times": plan.arrival_times,
+                    "state_of_charge": plan.state_of_charge}
+
+        raise ValueError(f"Unknown method {method}")
+
+    def get_status(self):
+        return {"race_types": list(self.simulations), "requests_handled": self.requests_handled}
+
+
+class _SimulationRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/status":
+            self.__respond(200, {"result": self.server.get_status()})
+        else:
+            self.__respond(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        method = self.path.strip("/")
+
+        if method not in SimulationServer.METHODS:
+            self.__respond(404, {"error": f"Unknown method {method}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            arguments = json.loads(self.rfile.read(length) or b"{}")
+            result = self.server.handle_method(method, arguments)
+        except KeyError as error:
+            self.__respond(400, {"error": f"Missing argument {error}"})
+        except (ValueError, TypeError) as error:
+            self.__respond(400, {"error": str(error)})
+        except Exception as error:
+            self.__respond(500, {"error": f"{type(error).__name__}: {error}"})
+        else:
+            with self.server.lock:
+                self.server.requests_handled += 1
+
+            self.__respond(200, {"result": to_json(result)})
+
+    def log_message(self, format, *args):
+        # the simulation already prints its progress, so every request is not logged as well
+        pass
+
+    def __respond(self, status, body):
+        encoded_body = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves prepared Simulation objects over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--race-types", nargs="+", default=["ASC"], choices=["ASC", "FSGP"])
+    args = parser.parse_args()
+
+    with SimulationServer((args.host, args.port), args.race_types) as server:
+        print(f"Serving {', '.join(args.race_types)} on http://{args.host}:{args.port}\n")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class SpeedPlan:
+    def __init__(self, segment_boundaries, speeds, departure_times, arrival_times, state_of_charge):
+        """
+        Instantiates a SpeedPlan object. This holds the speed the car should drive at on every route segment, as
+        computed by the SpeedPlanner, along with the times and battery state of charge it is expected to have.
+
+        :param segment_boundaries: (float[S+1]) distance from the start of the route of every segment boundary
+            that the plan passes, in km
+        :param speeds: (float[S]) speed on every segment in km/h
+        :param departure_times: (float[S]) time since the start of the simulation at which every segment is
+            started, in seconds
+        :param arrival_times: (float[S]) time since the start of the simulation at which every segment is
+            finished, in seconds
+        :param state_of_charge: (float[S+1]) expected battery state of charge at every segment boundary (0 - 1)
+        """
+
+        self.segment_boundaries = segment_boundaries
+        self.speeds = speeds
+        self.departure_times = departure_times
+        self.arrival_times = arrival_times
+        self.state_of_charge = state_of_charge
+
+        self.distance_travelled = segment_boundaries[-1] - segment_boundaries[0]
+        self.time_taken = np.sum(arrival_times - departure_times)
+        self.final_soc = state_of_charge[-1] * 100
+
+    def get_speed_array(self, timestamps):
+        """
+        Converts the plan into a speed at every timestamp, in the format used by Simulation.run_model. The speed at
+        a timestamp is the speed driven during the tick that ends at that timestamp, and 0 while the car waits.
+
+        :param timestamps: (float[N]) times since the start of the simulation, in seconds
+        :returns: (float[N]) speed at every timestamp in km/h
+        """
+
+        timestamps = np.asarray(timestamps)
+
+        if len(self.speeds) == 0:
+            return np.zeros(timestamps.shape)
+
+        segment_indices = np.searchsorted(self.arrival_times, timestamps, side="left")
+        segment_indices = np.minimum(segment_indices, len(self.speeds) - 1)
+
+        driving = np.logical_and(timestamps > self.departure_times[segment_indices],
+                                 timestamps <= self.arrival_times[segment_indices])
+
+        return np.where(driving, self.speeds[segment_indices], 0)
+
+    def __str__(self):
+        return (f"SpeedPlan: {len(self.speeds)} segments, distance travelled: {self.distance_travelled:.2f}km, "
+                f"time taken: {self.time_taken / 3600:.2f}h, final SOC: {self.final_soc:.2f}%")
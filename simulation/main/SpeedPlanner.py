@@ -0,0 +1,296 @@
+import numpy as np
+
+from simulation.common import helpers, time_utils
+from simulation.main.SpeedPlan import SpeedPlan
+
+
+class SpeedPlanner:
+    def __init__(self, simulation_model, segment_length=5000, soc_bins=1001, speeds=np.arange(20, 105, 5),
+                 time_step=300):
+        """
+        Instantiates a SpeedPlanner object. This computes the speed to drive at on every segment of the route with
+        dynamic programming, instead of searching over a few constant speeds with a black-box optimizer.
+
+        The route is split into segments of equal length, and the battery state of charge into bins. At every
+        segment boundary, the planner keeps the earliest time at which each state of charge bin can be reached,
+        and extends all of them over the next segment with every candidate speed at once. The state of charge at
+        the end of a segment is rounded to the centre of the closest bin, so the bins need to be small compared
+        to the energy used on a segment. The energy of every
+        segment is calculated with the motor and array models of the simulation (BasicMotor.calculate_energy_in
+        and BasicArray.calculate_produced_energy), with the road gradient, wind and solar irradiance of the segment.
+
+        Everything that does not depend on the speed is calculated here, so plan() can be called repeatedly.
+
+        :param simulation_model: Simulation object whose route, weather, settings and car models are planned for
+        :param segment_length: (float) length of the route segments in m. Over short segments the gradient
+            between the elevations at their ends is noisy, and the plan exploits noise that the simulation does not
+            have (its distance then falls short of the planned one).
+        :param soc_bins: (int) number of state of charge bins, whose centres are evenly spaced from 0 to 1
+        :param speeds: (float[V]) candidate speeds in km/h
+        :param time_step: (int) resolution in seconds of the tables of solar energy and wind along the route
+        """
+
+        assert segment_length > 0, "segment_length must be positive"
+        assert soc_bins >= 2, "soc_bins must be an integer greater than 1"
+
+        context = simulation_model.context
+
+        self.simulation_model = simulation_model
+        self.segment_length = segment_length
+        self.soc_bins = soc_bins
+        self.speeds = np.asarray(speeds, dtype=float)
+        self.time_step = time_step
+
+        self.simulation_duration = simulation_model.simulation_duration
+        self.lvs_power_loss = simulation_model.lvs_power_loss
+
+        # state of charge and energy stored (Wh) at the centre of every bin
+        self.bin_socs = np.linspace(0, 1, soc_bins)
+        self.bin_energies = self.__calculate_energy_from_soc(self.bin_socs)
+
+        # ----- Route segments -----
+
+        max_route_distance = context.max_route_distance
+        num_segments = int(np.ceil(max_route_distance / segment_length))
+
+        self.segment_boundaries = np.minimum(np.arange(num_segments + 1) * segment_length, max_route_distance)
+        self.segment_lengths = np.diff(self.segment_boundaries)
+
+        boundary_indices = helpers.calculate_closest_indices(self.segment_boundaries, context.path_midpoints)
+        boundary_elevations = context.path_elevations[boundary_indices]
+
+        # the average gradient of the segment
+        self.segment_gradients = np.diff(boundary_elevations) / self.segment_lengths
+
+        segment_midpoints = (self.segment_boundaries[:-1] + self.segment_boundaries[1:]) / 2
+        midpoint_indices = helpers.calculate_closest_indices(segment_midpoints, context.path_midpoints)
+        weather_indices = helpers.calculate_closest_indices(segment_midpoints, context.weather_midpoints)
+
+        # ----- Solar energy and wind along the route -----
+
+        self.grid_times = np.arange(0, self.simulation_duration + time_step, time_step)
+
+        time_zones = context.path_time_zones[midpoint_indices]
+        # local time of every point of the time grid at every segment (see helpers.adjust_timestamps_to_local_times)
+        local_times = np.array(self.grid_times + simulation_model.time_of_initialization -
+                               (context.path_time_zones[0] - time_zones[:, np.newaxis]), dtype=np.uint64)
+
+        day_of_year, local_hour = time_utils.get_day_of_year_and_local_hour(local_times)
+
+        coords = context.route_coords[midpoint_indices]
+        solar_irradiances = simulation_model.solar_calculations.calculate_GHI(
+            coords[:, 0, np.newaxis], coords[:, 1, np.newaxis], time_zones[:, np.newaxis], day_of_year, local_hour,
+            context.path_elevations[midpoint_indices, np.newaxis], np.zeros(local_times.shape))
+
+        # energy produced by the array from the start of the simulation, at every point of the time grid
+        array_powers = simulation_model.basic_array.calculate_produced_energy(solar_irradiances, 1)
+        self.cumulative_array_energy = np.cumsum(
+            np.insert((array_powers[:, 1:] + array_powers[:, :-1]) / 2 * time_step, 0, 0, axis=1), axis=1)
+
+        weather_forecasts = simulation_model.weather.get_weather_forecast_in_time(
+            np.broadcast_to(weather_indices[:, np.newaxis], local_times.shape), local_times)
+
+        # same shift in time as the wind of the simulation (see Simulation.__run_simulation_calculations)
+        roll_by_step = 3600 * (24 + simulation_model.start_hour -
+                               helpers.hour_from_unix_timestamp(weather_forecasts[0, 0, 2])) // time_step
+        self.wind_speeds = helpers.get_array_directional_wind_speed(
+            context.path_bearings[midpoint_indices, np.newaxis],
+            np.roll(weather_forecasts[..., 5], -roll_by_step, -1),
+            np.roll(weather_forecasts[..., 6], -roll_by_step, -1))
+
+        # ----- Driving windows -----
+
+        # the car can only drive between the start and the end of each driving window (see SimulationContext)
+        window_edges = np.diff(context.not_charge.astype(int), prepend=0, append=0)
+        self.window_starts = context.timestamps[np.flatnonzero(window_edges[:-1] == 1)].astype(float)
+        self.window_ends = context.timestamps[np.flatnonzero(window_edges[1:] == -1)] + context.tick
+
+    def plan(self, objective="distance", target_distance=None, initial_soc=None, start_distance=0, start_time=0):
+        """
+        Computes the optimal speed on every segment from a starting point on the route.
+
+        :param objective: "distance" to travel as far as possible within the simulation duration, or "time" to
+            reach target_distance as early as possible
+        :param target_distance: (float) distance from the start of the route to reach, in km. Only used when
+            objective is "time", where it defaults to the end of the route.
+        :param initial_soc: (float) battery state of charge at the starting point (0 - 1). Defaults to the
+            initial state of charge of the simulation.
+        :param start_distance: (float) distance from the start of the route of the starting point, in km. If it
+            is between two segment boundaries, the first segment of the plan is the rest of that segment.
+        :param start_time: (float) time since the start of the simulation at the starting point, in seconds
+        :returns: SpeedPlan object of the optimal plan
+        """
+
+        assert objective in ["distance", "time"]
+
+        battery = self.simulation_model.basic_battery
+        initial_soc = battery.state_of_charge if initial_soc is None else initial_soc
+
+        num_boundaries = len(self.segment_boundaries)
+        start_boundary = min(int(start_distance * 1000 // self.segment_length), num_boundaries - 1)
+
+        # length of the segments from the starting point on, the first of which may already be partly driven
+        segment_lengths = self.segment_lengths.copy()
+        if start_boundary < num_boundaries - 1:
+            segment_lengths[start_boundary] = self.segment_boundaries[start_boundary + 1] - start_distance * 1000
+
+        if objective == "time":
+            target_boundary = num_boundaries - 1 if target_distance is None else \
+                min(int(np.ceil(target_distance * 1000 / self.segment_length)), num_boundaries - 1)
+        else:
+            target_boundary = num_boundaries - 1
+
+        # earliest arrival time at every boundary, for every state of charge bin
+        arrival_times = np.full((num_boundaries, self.soc_bins), np.inf)
+
+        # bin and speed index that every state was reached from
+        previous_bins = np.full((num_boundaries, self.soc_bins), -1, dtype=np.int32)
+        speed_indices = np.full((num_boundaries, self.soc_bins), -1, dtype=np.int32)
+
+        initial_bin = self.__get_soc_bin(self.__calculate_energy_from_soc(initial_soc))
+        arrival_times[start_boundary, initial_bin] = start_time
+
+        last_boundary = start_boundary
+
+        for segment in range(start_boundary, target_boundary):
+            reached_bins = np.flatnonzero(np.isfinite(arrival_times[segment]))
+
+            if reached_bins.size == 0:
+                break
+
+            last_boundary = segment
+
+            new_arrival_times, new_energies = self.__extend_states(
+                segment, arrival_times[segment, reached_bins], self.bin_energies[reached_bins],
+                segment_lengths[segment])
+
+            feasible = np.logical_and(new_arrival_times <= self.simulation_duration, new_energies >= 0)
+            from_bins, speed_choices = np.nonzero(feasible)
+
+            if from_bins.size == 0:
+                break
+
+            new_arrival_times = new_arrival_times[feasible]
+            new_energies = new_energies[feasible]
+            new_bins = self.__get_soc_bin(new_energies)
+
+            # keep the earliest arrival in every bin
+            order = np.lexsort((new_arrival_times, new_bins))
+            new_bins, first_in_bin = np.unique(new_bins[order], return_index=True)
+            best = order[first_in_bin]
+
+            arrival_times[segment + 1, new_bins] = new_arrival_times[best]
+            previous_bins[segment + 1, new_bins] = reached_bins[from_bins[best]]
+            speed_indices[segment + 1, new_bins] = speed_choices[best]
+
+            last_boundary = segment + 1
+
+        if objective == "time" and last_boundary != target_boundary:
+            raise ValueError("The target distance cannot be reached within the simulation duration")
+
+        # ----- Backtracking -----
+
+        reached_bins = np.flatnonzero(np.isfinite(arrival_times[last_boundary]))
+
+        if objective == "time":
+            current_bin = reached_bins[np.argmin(arrival_times[last_boundary, reached_bins])]
+        else:
+            current_bin = reached_bins[-1]
+
+        bins = [current_bin]
+        chosen_speeds = []
+
+        for boundary in range(last_boundary, start_boundary, -1):
+            chosen_speeds.append(speed_indices[boundary, current_bin])
+            current_bin = previous_bins[boundary, current_bin]
+            bins.append(current_bin)
+
+        bins = np.array(bins[::-1])
+        boundaries = np.arange(start_boundary, last_boundary + 1)
+        speeds = self.speeds[np.array(chosen_speeds[::-1], dtype=int)]
+
+        plan_arrival_times = arrival_times[boundaries, bins]
+
+        # the departure times are recomputed, since the car may have waited for a driving window to start
+        travel_times = segment_lengths[boundaries[:-1]] / (speeds / 3.6)
+        departure_times = plan_arrival_times[1:] - travel_times
+
+        plan_boundaries = self.segment_boundaries[boundaries] / 1000
+        plan_boundaries[0] = min(start_distance, self.segment_boundaries[-1] / 1000)
+
+        return SpeedPlan(plan_boundaries, speeds, departure_times, plan_arrival_times[1:], self.bin_socs[bins])
+
+    def __extend_states(self, segment, times, energies, segment_length):
+        """
+        Drives a segment from every state with every candidate speed.
+
+        :param segment: (int) index of the segment
+        :param times: (float[B]) time at which each state is at the start of the segment, in seconds
+        :param energies: (float[B]) energy stored in the battery in each state, in Wh
+        :param segment_length: (float) length of the segment left to drive, in m
+        :returns: tuple of the arrival times at the end of the segment (float[B][V]) in seconds, and the energy
+            stored there (float[B][V]) in Wh
+        """
+
+        times = times[:, np.newaxis]
+        travel_times = segment_length / (self.speeds / 3.6)
+
+        # the segment has to be driven within a single driving window, otherwise the car waits for the next one
+        window_starts = np.append(self.window_starts, [np.inf, np.inf])
+        window_ends = np.append(self.window_ends, [np.inf, np.inf])
+
+        window_indices = np.searchsorted(self.window_ends, times, side="right")
+        departure_times = np.maximum(times, window_starts[window_indices])
+
+        fits_in_window = departure_times + travel_times <= window_ends[window_indices]
+        departure_times = np.where(fits_in_window, departure_times, window_starts[window_indices + 1])
+        arrival_times = departure_times + travel_times
+
+        valid = np.isfinite(arrival_times)
+
+        # ----- Energy calculations -----
+
+        grid_indices = np.where(valid, departure_times, 0) // self.time_step
+        grid_indices = np.minimum(grid_indices, len(self.grid_times) - 1).astype(int)
+
+        wind_speeds = self.wind_speeds[segment][grid_indices]
+        gradients = np.full(grid_indices.shape, self.segment_gradients[segment])
+        speeds = np.broadcast_to(self.speeds, grid_indices.shape)
+
+        motor_consumed_energy = self.simulation_model.basic_motor.calculate_energy_in(speeds, gradients, wind_speeds,
+                                                                                      travel_times)
+
+        # the array charges the battery while the car waits and while it drives
+        end_times = np.where(valid, arrival_times, times)
+        array_produced_energy = self.__get_array_energy(segment, end_times) - self.__get_array_energy(segment, times)
+        lvs_consumed_energy = self.lvs_power_loss * (end_times - times)
+
+        delta_energy = array_produced_energy - motor_consumed_energy - lvs_consumed_energy
+
+        battery = self.simulation_model.basic_battery
+        new_energies = np.minimum(energies[:, np.newaxis] + delta_energy / 3600, battery.max_energy_capacity)
+
+        return arrival_times, np.where(valid, new_energies, -np.inf)
+
+    def __get_array_energy(self, segment, times):
+        """
+        :returns: energy produced by the array on a segment from the start of the simulation up to each time, in J
+        """
+
+        return np.interp(times, self.grid_times, self.cumulative_array_energy[segment])
+
+    def __get_soc_bin(self, energies):
+        soc = self.__calculate_soc_from_energy(energies)
+        return np.clip(np.rint(soc * (self.soc_bins - 1)).astype(int), 0, self.soc_bins - 1)
+
+    def __calculate_soc_from_energy(self, energies):
+        battery = self.simulation_model.basic_battery
+        discharge_capacity = battery.calculate_discharge_capacity_from_energy(battery.max_energy_capacity -
+                                                                              np.asarray(energies))
+        return battery.calculate_soc_from_discharge_capacity(discharge_capacity)
+
+    def __calculate_energy_from_soc(self, soc):
+        battery = self.simulation_model.basic_battery
+        discharge_capacity = battery.calculate_discharge_capacity_from_soc(soc)
+        return battery.max_energy_capacity - battery.calculate_energy_from_discharge_capacity(discharge_capacity)
+
@@ -0,0 +1,251 @@
+import time
+
+import numpy as np
+
+from simulation.common import helpers, time_utils
+from simulation.main.SimulationResult import SimulationResult
+
+
+def _run_realizations(task):
+    weather_ensemble, speed = helpers.get_worker_object()
+    return weather_ensemble.run_realizations(speed, *task)
+
+
+class WeatherEnsemble:
+    def __init__(self, simulation_model, wind_speed_std=1.5, wind_direction_std=30, cloud_cover_std=20,
+                 use_cloud_cover=True):
+        """
+        Instantiates a WeatherEnsemble object. This runs a speed profile through Simulation.run_model under many
+        randomly perturbed copies (realizations) of the weather forecast, to show how sensitive the result is to
+        forecast errors.
+
+        Every weather cell, i.e. every forecast time at every weather coordinate, is perturbed independently with
+        normally distributed errors: the wind speed (clipped at 0) and direction are shifted, and so is the cloud
+        cover (clipped to 0 - 100%). The position of the car does not depend on the weather until the battery is
+        empty, so the weather cells visited at every tick are found once per speed profile, and each realization
+        only has to look up its perturbed weather and recalculate the energy and state of charge. The clear sky
+        irradiance is also calculated once, since cloud cover only scales it.
+
+        :param simulation_model: Simulation object whose route, forecast, settings and car models are simulated
+        :param wind_speed_std: (float) standard deviation of the wind speed error in m/s
+        :param wind_direction_std: (float) standard deviation of the wind direction error in degrees
+        :param cloud_cover_std: (float) standard deviation of the cloud cover error in %, only used if
+            use_cloud_cover is True
+        :param use_cloud_cover: if True, the perturbed forecast cloud cover is applied to the solar irradiance.
+            run_model currently ignores cloud cover, so set this to False to compare the ensemble with run_model.
+        """
+
+        self.simulation_model = simulation_model
+        self.context = simulation_model.context
+        self.wind_speed_std = wind_speed_std
+        self.wind_direction_std = wind_direction_std
+        self.cloud_cover_std = cloud_cover_std
+        self.use_cloud_cover = use_cloud_cover
+
+        # every run starts at the same place and time, so the shift of the wind is the same for every run
+        first_forecast = simulation_model.weather.get_weather_forecast_in_time(
+            np.zeros(1, dtype=int), [simulation_model.time_of_initialization])
+        self.roll_by_tick = 3600 * (24 + simulation_model.start_hour -
+                                    helpers.hour_from_unix_timestamp(first_forecast[0, 2])) // self.context.tick
+
+        # cached setup of the last speed profile, see __get_profile
+        self.__profile_speed = None
+        self.__profile = None
+
+    def run(self, speed, num_realizations=200, chunk_size=32, seed=None, workers=1):
+        """
+        Simulates a speed profile under num_realizations perturbed weather forecasts.
+
+        Realizations are simulated chunk_size at a time as rows of 2D arrays, to bound memory usage. With
+        workers > 1 the chunks are spread over a pool of worker processes, forked where the platform supports it.
+        The perturbations of every chunk come from their own random stream derived from seed, so the results do
+        not depend on the number of workers.
+
+        :param speed: (float[M]) speed set-points in km/h, stretched over the simulation duration as in run_model
+        :param num_realizations: (int) number of perturbed forecasts to simulate
+        :param chunk_size: (int) maximum number of realizations to simulate at once
+        :param seed: seed of the random perturbations
+        :param workers: (int) number of worker processes
+        :returns: tuple of a SimulationResult where distance_travelled (km), time_taken (s) and final_soc (%) are
+            (float[num_realizations]) arrays, and a report dictionary summarizing their distributions
+        """
+
+        assert num_realizations >= 1 and chunk_size >= 1, "num_realizations and chunk_size must be positive"
+
+        speed = np.asarray(speed, dtype=float)
+        chunk_starts = range(0, num_realizations, chunk_size)
+        chunk_seeds = np.random.SeedSequence(seed).spawn(len(chunk_starts))
+        tasks = [(min(chunk_size, num_realizations - start), chunk_seed)
+                 for start, chunk_seed in zip(chunk_starts, chunk_seeds)]
+
+        start_time = time.perf_counter()
+
+        if workers > 1:
+            # the profile is set up before forking so the workers inherit it
+            self.__get_profile(speed)
+            with helpers.make_worker_pool((self, speed), workers) as pool:
+                chunk_results = pool.map(_run_realizations, tasks)
+        else:
+            chunk_results = [self.run_realizations(speed, *task) for task in tasks]
+
+        elapsed_time = time.perf_counter() - start_time
+
+        result = SimulationResult(
+            distance_travelled=np.concatenate([chunk.distance_travelled for chunk in chunk_results]),
+            time_taken=np.concatenate([chunk.time_taken for chunk in chunk_results]),
+            final_soc=np.concatenate([chunk.final_soc for chunk in chunk_results]))
+
+        report = {
+            "num_realizations": num_realizations,
+            "realizations_per_second": num_realizations / elapsed_time,
+            "distance": self.__summarize(result.distance_travelled),
+            "final_soc": self.__summarize(result.final_soc),
+            "empty_battery_probability": np.mean(result.final_soc == 0),
+        }
+
+        return result, report
+
+    def run_realizations(self, speed, num_realizations, seed=None):
+        """
+        Simulates a speed profile under num_realizations perturbed weather forecasts at once.
+
+        :param speed: (float[M]) speed set-points in km/h
+        :param num_realizations: (int) number of perturbed forecasts to simulate
+        :param seed: seed (or SeedSequence) of the random perturbations
+        :returns: SimulationResult where distance_travelled (km), time_taken (s) and final_soc (%) are
+            (float[num_realizations]) arrays
+        """
+
+        simulation_model = self.simulation_model
+        context = self.context
+        weather_forecast = simulation_model.weather.weather_forecast
+
+        speed_kmh, gradients, bearings, clear_sky_irradiances, cells = self.__get_profile(
+            np.asarray(speed, dtype=float))
+
+        # ----- Perturbed weather -----
+
+        rng = np.random.default_rng(seed)
+        perturbation_shape = (num_realizations,) + weather_forecast.shape[:2]
+
+        wind_speed_errors = rng.normal(0, self.wind_speed_std, perturbation_shape)
+        wind_direction_errors = rng.normal(0, self.wind_direction_std, perturbation_shape)
+        cloud_cover_errors = rng.normal(0, self.cloud_cover_std, perturbation_shape)
+
+        absolute_wind_speeds = np.maximum(weather_forecast[cells + (5,)] + wind_speed_errors[(slice(None),) + cells],
+                                          0)
+        wind_directions = (weather_forecast[cells + (6,)] + wind_direction_errors[(slice(None),) + cells]) % 360
+
+        wind_speeds = helpers.get_array_directional_wind_speed(bearings, absolute_wind_speeds, wind_directions)
+
+        if self.use_cloud_cover:
+            cloud_covers = np.clip(weather_forecast[cells + (7,)] + cloud_cover_errors[(slice(None),) + cells], 0, 100)
+        else:
+            cloud_covers = np.zeros(wind_speeds.shape)
+
+        solar_irradiances = (1 - (cloud_covers / 100)) * clear_sky_irradiances
+
+        # ----- Energy calculations -----
+
+        simulation_model.basic_lvs.update(context.tick)
+
+        lvs_consumed_energy = simulation_model.basic_lvs.get_consumed_energy()
+        motor_consumed_energy = simulation_model.basic_motor.calculate_energy_in(speed_kmh, gradients, wind_speeds,
+                                                                                 context.tick)
+        array_produced_energy = simulation_model.basic_array.calculate_produced_energy(solar_irradiances,
+                                                                                       context.tick)
+
+        motor_consumed_energy = np.logical_and(motor_consumed_energy, context.not_charge) * motor_consumed_energy
+
+        delta_energy = array_produced_energy - (motor_consumed_energy + lvs_consumed_energy)
+
+        state_of_charge = simulation_model.basic_battery.update_array(np.cumsum(delta_energy, axis=-1))[0]
+        state_of_charge[np.abs(state_of_charge) < 1e-03] = 0
+
+        # ----- Distance travelled -----
+
+        speed_kmh = np.logical_and(context.not_charge, state_of_charge) * speed_kmh
+        time_in_motion = np.logical_and(context.motion_tick_array, speed_kmh) * context.tick
+
+        distances = np.cumsum(speed_kmh * (time_in_motion / 3600), axis=-1)
+        distances = distances.clip(0, context.max_route_distance / 1000)
+
+        # the car is not in motion once it has reached the end of the route
+        reached_route_end = distances == context.max_route_distance / 1000
+        max_dist_index = np.where(np.any(reached_route_end, axis=-1), np.argmax(reached_route_end, axis=-1),
+                                  distances.shape[-1])
+        in_motion_before_end = np.arange(distances.shape[-1]) < np.expand_dims(max_dist_index, -1)
+
+        return SimulationResult(distance_travelled=distances[:, -1],
+                                time_taken=np.sum(np.where(in_motion_before_end, time_in_motion, 0), axis=-1),
+                                final_soc=state_of_charge[:, -1] * 100 + 0.)
+
+    def __get_profile(self, speed):
+        """
+        Calculates everything about a speed profile that does not depend on the weather, following
+        Simulation.run_model. The result for the last speed profile is cached.
+
+        :param speed: (float[M]) speed set-points in km/h
+        :returns: tuple of the speed (float[N], km/h), gradient (float[N]), vehicle bearing (float[N]) and
+            clear sky solar irradiance (float[N], W/m^2) at every tick, and the weather cells that the wind and
+            cloud cover of every tick are taken from, as a tuple of coordinate indices (int[N]) and forecast time
+            indices (int[N])
+        """
+
+        if self.__profile_speed is not None and np.array_equal(self.__profile_speed, speed):
+            return self.__profile
+
+        simulation_model = self.simulation_model
+        context = self.context
+
+        speed_kmh = helpers.reshape_and_repeat(speed, context.num_ticks, verbose=False)
+        speed_kmh = helpers.add_acceleration(np.insert(speed_kmh, 0, 0), 500 * context.tick)
+        speed_kmh = np.logical_and(speed_kmh, context.not_charge) * speed_kmh
+
+        cumulative_distances = np.cumsum(context.tick_array * speed_kmh / 3.6)
+
+        closest_gis_indices = helpers.calculate_closest_indices(cumulative_distances, context.path_midpoints)
+        closest_weather_indices = helpers.calculate_closest_indices(cumulative_distances, context.weather_midpoints)
+
+        time_zones = context.path_time_zones[closest_gis_indices]
+        local_times = helpers.adjust_timestamps_to_local_times(context.timestamps,
+                                                               simulation_model.time_of_initialization, time_zones)
+
+        closest_time_indices = simulation_model.weather.get_weather_forecast_time_indices(closest_weather_indices,
+                                                                                          local_times)
+
+        # run_model uses the wind of roll_by_tick ticks later at every tick, and cloud cover is to be rolled the
+        # same way once it is enabled there
+        cells = (np.roll(closest_weather_indices, -self.roll_by_tick),
+                 np.roll(closest_time_indices, -self.roll_by_tick))
+
+        route_coords = context.route_coords[closest_gis_indices]
+        day_of_year, local_hour = time_utils.get_day_of_year_and_local_hour(local_times)
+        clear_sky_irradiances = simulation_model.solar_calculations.calculate_GHI(
+            route_coords[:, 0], route_coords[:, 1], time_zones, day_of_year, local_hour,
+            context.path_elevations[closest_gis_indices], np.zeros(len(local_times)))
+
+        self.__profile_speed = speed
+        self.__profile = (speed_kmh, context.path_gradients[closest_gis_indices],
+                          context.path_bearings[closest_gis_indices], clear_sky_irradiances, cells)
+
+        return self.__profile
+
+    @staticmethod
+    def __summarize(values):
+        """
+        :param values: (float[K]) results of every realization
+        :returns: dictionary with the mean, standard deviation, minimum, maximum and 5th, 50th and 95th percentiles
+        """
+
+        percentiles = np.percentile(values, [5, 50, 95])
+
+        return {
+            "mean": np.mean(values),
+            "std": np.std(values),
+            "min": np.min(values),
+            "p5": percentiles[0],
+            "p50": percentiles[1],
+            "p95": percentiles[2],
+            "max": np.max(values),
+        }
@@ -1,2 +1,12 @@
 from simulation.main.MainSimulation import Simulation
+from simulation.main.DistanceSimulation import DistanceSimulation
+from simulation.main.SimulationCache import SimulationCache
+from simulation.main.SimulationContext import SimulationContext
 from simulation.main.SimulationResult import SimulationResult
+from simulation.main.SpeedPlan import SpeedPlan
+from simulation.main.SpeedPlanner import SpeedPlanner
+from simulation.main.WeatherEnsemble import WeatherEnsemble
+from simulation.main.SensitivityAnalysis import SensitivityAnalysis
+from simulation.main.Replanner import Replanner
+from simulation.main.SimulationServer import SimulationServer
+from simulation.main.SimulationClient import SimulationClient
@@ -113,7 +113,7 @@ class BasicMotor(BaseMotor):
         """
 
         # Power = Energy / Time
-        motor_output_power = motor_output_energy * tick
+        motor_output_power = motor_output_energy / tick
         rads_rpm_conversion_factor = 30 / math.pi
 
         revolutions_per_minute = motor_angular_speed * rads_rpm_conversion_factor
@@ -190,7 +190,7 @@ class BasicMotor(BaseMotor):
         required_speed_ms = required_speed_kmh / 3.6
 
         required_angular_speed_rads = required_speed_ms / self.tire_radius
-        required_angular_speed_rads_array = np.ones(len(gradients)) * required_angular_speed_rads
+        required_angular_speed_rads_array = np.ones(np.shape(gradients)) * required_angular_speed_rads
 
         drag_forces = 0.5 * self.air_density * (
                 (required_speed_ms + wind_speeds) ** 2) * self.drag_coefficient * self.vehicle_frontal_area
@@ -212,6 +212,144 @@ class BasicMotor(BaseMotor):
 
         return motor_controller_input_energies
 
+    @staticmethod
+    def calculate_motor_efficiency_derivatives(motor_angular_speed, motor_output_energy, tick):
+        """
+        Calculates the partial derivatives of the motor efficiency model of calculate_motor_efficiency with respect
+        to its two inputs. Where the efficiency is clamped, both derivatives are 0.
+
+        :param motor_angular_speed: (float[N]) angular speed motor operates in rad/s
+        :param motor_output_energy: (float[N]) energy motor outputs to the wheel in J
+        :param tick: length of 1 update cycle in seconds
+
+        :returns: tuple of (float[N]) arrays, the derivatives of e_m with respect to the angular speed (per rad/s)
+            and with respect to the output energy (per J)
+        """
+
+        motor_output_power = motor_output_energy / tick
+        rads_rpm_conversion_factor = 30 / math.pi
+
+        revolutions_per_minute = motor_angular_speed * rads_rpm_conversion_factor
+
+        p = motor_output_power
+        r = revolutions_per_minute
+
+        d_e_m_d_power = -6.281e-5 - (2 * 2.89e-8 * p) + (2.416e-7 * r) + (3 * 5.653e-12 * p ** 2) \
+            - (2 * 1.74e-11 * p * r) - (7.322e-11 * r ** 2)
+
+        d_e_m_d_rpm = 6.708e-4 + (2.416e-7 * p) - (2 * 8.672e-7 * r) - (1.74e-11 * p ** 2) \
+            - (2 * 7.322e-11 * p * r) + (3 * 3.263e-10 * r ** 2)
+
+        e_m = BasicMotor.calculate_motor_efficiency(motor_angular_speed, motor_output_energy, tick)
+        clamped = np.logical_or(e_m <= 0.7382, e_m >= 1)
+
+        d_e_m_d_angular_speed = np.where(clamped, 0, d_e_m_d_rpm * rads_rpm_conversion_factor)
+        d_e_m_d_output_energy = np.where(clamped, 0, d_e_m_d_power / tick)
+
+        return d_e_m_d_angular_speed, d_e_m_d_output_energy
+
+    @staticmethod
+    def calculate_motor_controller_efficiency_derivatives(motor_angular_speed, motor_output_energy, tick):
+        """
+        Calculates the partial derivatives of the motor controller efficiency model of
+        calculate_motor_controller_efficiency with respect to its two inputs. Where the efficiency is clamped, or
+        the motor is not turning, both derivatives are 0.
+
+        :param motor_angular_speed: (float[N]) angular speed motor operates in rad/s
+        :param motor_output_energy: (float[N]) energy motor outputs to the wheel in J
+        :param tick: length of 1 update cycle in seconds
+
+        :returns: tuple of (float[N]) arrays, the derivatives of e_mc with respect to the angular speed (per rad/s)
+            and with respect to the output energy (per J)
+        """
+
+        turning = motor_angular_speed != 0
+        safe_angular_speed = np.where(turning, motor_angular_speed, 1)
+
+        # Torque = Power / Angular Speed
+        motor_torque_array = np.where(turning, motor_output_energy / tick / safe_angular_speed, 0)
+
+        w = motor_angular_speed
+        t = motor_torque_array
+
+        d_e_mc_d_w = 0.007818 - (2 * 1.658e-4 * w) - (1.806e-5 * t) + (3 * 1.602e-6 * w ** 2) \
+            + (2 * 4.236e-7 * w * t) - (2.306e-7 * t ** 2) - (4 * 5.701e-09 * w ** 3) \
+            - (3 * 2.054e-9 * w ** 2 * t) - (2 * 3.126e-10 * w * t ** 2) + (1.708e-09 * t ** 3)
+
+        d_e_mc_d_t = 0.007043 - (1.806e-5 * w) - (2 * 1.909e-4 * t) + (4.236e-7 * w ** 2) \
+            - (2 * 2.306e-7 * w * t) + (3 * 2.122e-06 * t ** 2) - (2.054e-9 * w ** 3) \
+            - (2 * 3.126e-10 * w ** 2 * t) + (3 * 1.708e-09 * w * t ** 2) - (4 * 8.094e-09 * t ** 3)
+
+        e_mc = BasicMotor.calculate_motor_controller_efficiency(motor_angular_speed, motor_output_energy, tick)
+        varying = np.logical_and(turning, np.logical_and(e_mc > 0.9, e_mc < 1))
+
+        # the torque depends on both inputs: t = E / (tick * w)
+        d_t_d_w = -motor_torque_array / safe_angular_speed
+        d_t_d_output_energy = 1 / (tick * safe_angular_speed)
+
+        d_e_mc_d_angular_speed = np.where(varying, d_e_mc_d_w + d_e_mc_d_t * d_t_d_w, 0)
+        d_e_mc_d_output_energy = np.where(varying, d_e_mc_d_t * d_t_d_output_energy, 0)
+
+        return d_e_mc_d_angular_speed, d_e_mc_d_output_energy
+
+    def calculate_energy_in_derivative(self, required_speed_kmh, gradients, wind_speeds, tick):
+        """
+        Calculates the derivative of calculate_energy_in with respect to the required speed at every tick. The
+        energy consumed at a tick only depends on the speed at that same tick, so this is the diagonal of the
+        Jacobian.
+
+        :param required_speed_kmh: (float[N]) required speed array in km/h
+        :param gradients: (float[N]) gradient at parts of the road
+        :param wind_speeds: (float[N]) speeds of wind in m/s, where > 0 means against the direction of the vehicle
+        :param tick: (int) length of 1 update cycle in seconds
+
+        returns: (float[N]) derivative of the energy expended by the motor at every tick in J/(km/h)
+        """
+
+        required_speed_ms = required_speed_kmh / 3.6
+
+        required_angular_speed_rads = required_speed_ms / self.tire_radius
+        required_angular_speed_rads_array = np.ones(np.shape(gradients)) * required_angular_speed_rads
+
+        drag_forces = 0.5 * self.air_density * (
+                (required_speed_ms + wind_speeds) ** 2) * self.drag_coefficient * self.vehicle_frontal_area
+
+        angles = np.arctan(gradients)
+        g_forces = self.vehicle_mass * self.acceleration_g * np.sin(angles)
+
+        road_friction_array = np.full_like(g_forces, fill_value=self.road_friction)
+        road_friction_array = road_friction_array * self.vehicle_mass * self.acceleration_g * np.cos(angles)
+
+        total_forces = road_friction_array + drag_forces + g_forces
+
+        motor_output_energies = required_angular_speed_rads_array * total_forces * self.tire_radius * tick
+
+        # ----- Derivatives with respect to the speed in km/h -----
+
+        d_angular_speed = 1 / (3.6 * self.tire_radius)
+        d_drag_forces = self.air_density * (required_speed_ms + wind_speeds) * self.drag_coefficient \
+            * self.vehicle_frontal_area / 3.6
+
+        d_motor_output_energies = (d_angular_speed * total_forces + required_angular_speed_rads_array *
+                                   d_drag_forces) * self.tire_radius * tick
+
+        e_m = self.calculate_motor_efficiency(required_angular_speed_rads_array, motor_output_energies, tick)
+        e_mc = self.calculate_motor_controller_efficiency(required_angular_speed_rads_array,
+                                                          motor_output_energies, tick)
+
+        d_e_m_d_w, d_e_m_d_e = self.calculate_motor_efficiency_derivatives(required_angular_speed_rads_array,
+                                                                           motor_output_energies, tick)
+        d_e_mc_d_w, d_e_mc_d_e = self.calculate_motor_controller_efficiency_derivatives(
+            required_angular_speed_rads_array, motor_output_energies, tick)
+
+        d_e_m = d_e_m_d_w * d_angular_speed + d_e_m_d_e * d_motor_output_energies
+        d_e_mc = d_e_mc_d_w * d_angular_speed + d_e_mc_d_e * d_motor_output_energies
+
+        efficiency = e_m * e_mc
+        d_efficiency = d_e_m * e_mc + e_m * d_e_mc
+
+        return d_motor_output_energies / efficiency - motor_output_energies * d_efficiency / efficiency ** 2
+
     def __str__(self):
         return (f"Tire radius: {self.tire_radius}m\n"
                 f"Rolling resistance coefficient: {self.road_friction}\n"
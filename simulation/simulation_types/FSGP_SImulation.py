@@ -6,7 +6,7 @@ import seaborn as sns
 import pandas as pd
 import matplotlib.pyplot as plt
 from tqdm import tqdm
-from simulation.common import helpers
+from simulation.common import helpers, time_utils
 from simulation.config import settings_directory
 from simulation.simulation_types import *
 import numpy as np
@@ -106,12 +106,8 @@ class FSGP_Simulation(BaseSimulation):
         # Local times in UNIX timestamps - this contains UNIX timestamps for every second for the simulation
         local_times = helpers.adjust_timestamps_to_local_times(timestamps, self.time_of_initialization, time_zones)
 
-        # only for reference (may be used in the future)
-        local_times_datetime = np.array(
-            [datetime.datetime.utcfromtimestamp(local_unix_time) for local_unix_time in local_times])
-
         # time_of_day_hour based of UNIX timestamps
-        time_of_day_hour = np.array([helpers.hour_from_unix_timestamp(ti) for ti in local_times])
+        time_of_day_hour = time_utils.get_hour_of_day(local_times)
 
         # Get the weather at every location
         weather_forecasts = self.weather.get_weather_forecast_in_time(closest_weather_indices, local_times)
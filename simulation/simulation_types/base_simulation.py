@@ -2,7 +2,7 @@ import json
 from abc import ABC, abstractmethod
 
 import simulation
-from simulation.common import helpers
+from simulation.common import helpers, time_utils
 
 
 class BaseSimulation(ABC):
@@ -84,6 +84,16 @@ class BaseSimulation(ABC):
 
         self.local_times = 0
 
+    def get_local_times_datetime(self):
+        """
+        Returns the local time at every tick of the most recent simulation run as a NumPy datetime64 array.
+        These are only for reference, so they are produced on request rather than during every run.
+
+        :returns: (datetime64[s][N]) local times of the most recent simulation run
+        """
+
+        return time_utils.to_datetime64(self.local_times)
+
     @abstractmethod
     def run_model(self):
         raise NotImplementedError
@@ -0,0 +1,43 @@
+import simulation
+import numpy as np
+import pytest
+
+from simulation.main import DistanceSimulation
+
+
+@pytest.fixture(scope="module")
+def simulation_model():
+    # Initialises the Simulation object as a PyTest fixture so it can be used in all subsequent test functions
+    return simulation.Simulation("ASC")
+
+
+def test_distance_simulation_matches_run_model(simulation_model):
+    distance_simulation = DistanceSimulation(simulation_model)
+
+    for input_speed in [np.full(8, 40), np.array([35, 38, 42, 40, 41, 39, 37, 36])]:
+        result = distance_simulation.run(input_speed)
+
+        assert result.distance_travelled == pytest.approx(simulation_model.objective(speed=input_speed), rel=1e-6)
+        assert result.time_taken == "9:00:00"
+
+    # the battery runs empty, where the small difference in energy shows up in the distance
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+    result = distance_simulation.run(input_speed)
+
+    assert result.distance_travelled == pytest.approx(simulation_model.objective(speed=input_speed), rel=0.05)
+    assert result.final_soc == 0
+
+
+def test_distance_simulation_time_series(simulation_model):
+    distance_simulation = DistanceSimulation(simulation_model)
+    result = distance_simulation.run(np.array([20, 60, 45, 80, 30, 70, 55, 25]))
+
+    speed_kmh, distances, state_of_charge = distance_simulation.get_time_series(result)
+
+    assert speed_kmh.shape == distances.shape == state_of_charge.shape == simulation_model.context.timestamps.shape
+    assert distances[-1] == pytest.approx(result.distance_travelled)
+    assert np.all(np.diff(distances) >= 0)
+    assert state_of_charge[0] == simulation_model.basic_battery.state_of_charge
+
+    # the car does not move while charging
+    assert np.all(speed_kmh[np.logical_not(simulation_model.context.not_charge)] == 0)
@@ -38,6 +38,21 @@ def test_calculate_closest_gis_indices(gis):
     assert np.all(result == np.array([0, 0, 1, 1, 1, 2, 2, 2, 2, 3, 3]))
 
 
+def test_calculate_closest_gis_indices_batch(gis):
+    test_cumulative_distances = np.array([[0, 9, 18, 19, 27, 35, 38, 47, 48, 56, 63],
+                                          [0, 15, 45, 75, 105, 135, 165, 195, 225, 255, 285]])
+    test_path_distances = np.repeat(20, 13)
+    test_path_distances[0] = 0
+
+    gis.path_distances = test_path_distances
+
+    result = gis.calculate_closest_gis_indices(test_cumulative_distances)
+
+    assert result.shape == test_cumulative_distances.shape
+    assert np.all(result[0] == np.array([0, 0, 1, 1, 1, 2, 2, 2, 2, 3, 3]))
+    assert np.all(result[1] == np.array([0, 1, 2, 4, 5, 7, 8, 10, 11, 11, 11]))
+
+
 def test_calculate_time_zones1(gis):
     expected_time_zone = np.array(np.append(np.repeat(-18000., 625 * 2), np.repeat(-21600., 625 * 3)), dtype=np.uint64)
     test_coord = np.append(np.tile([39.0918, -94.4172], 625 * 2), np.tile([43.6142, -116.2080], 625 * 3)).reshape(
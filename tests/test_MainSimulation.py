@@ -0,0 +1,174 @@
+import datetime
+
+import simulation
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def simulation_model():
+    # Initialises the Simulation object as a PyTest fixture so it can be used in all subsequent test functions
+    return simulation.Simulation("ASC")
+
+
+def test_objective_matches_run_model(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    distance_travelled = simulation_model.run_model(speed=input_speed, plot_results=False)
+
+    # a single profile gives a scalar, as before run_batch shared this code path
+    assert np.isscalar(distance_travelled)
+    assert np.isscalar(simulation_model.objective(speed=input_speed))
+    assert simulation_model.objective(speed=input_speed) == distance_travelled
+    assert simulation_model.objective(**{f"x{i}": speed for i, speed in enumerate(input_speed)}) == distance_travelled
+
+
+def test_run_batch_matches_objective(simulation_model):
+    speed_matrix = np.array([[40, 40, 40, 40],
+                             [20, 60, 45, 80],
+                             [90, 90, 90, 90]])
+
+    result = simulation_model.run_batch(speed_matrix, chunk_size=2)
+
+    assert result.distance_travelled.shape == (3,)
+    assert result.time_taken.shape == (3,)
+    assert result.final_soc.shape == (3,)
+    for row in range(speed_matrix.shape[0]):
+        assert result.distance_travelled[row] == simulation_model.objective(speed=speed_matrix[row])
+
+
+def test_incremental_objective_matches_full_run(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    assert simulation_model.objective(speed=input_speed, incremental=True) == simulation_model.objective(input_speed)
+
+    # perturb one set-point at a time, as a coordinate-wise optimizer would
+    for segment, new_speed in [(6, 35), (3, 90), (7, 10), (0, 50), (6, 35)]:
+        input_speed = input_speed.copy()
+        input_speed[segment] = new_speed
+
+        distance_travelled = simulation_model.objective(speed=input_speed, incremental=True)
+
+        assert distance_travelled == simulation_model.objective(speed=input_speed)
+
+
+def test_incremental_objective_after_car_changes(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    distance_travelled = simulation_model.objective(speed=input_speed, incremental=True)
+
+    # the checkpoints of the original car are not resumed from with a heavier one
+    simulation_model.basic_motor.vehicle_mass *= 2
+    heavier_distance_travelled = simulation_model.objective(speed=input_speed, incremental=True)
+
+    assert heavier_distance_travelled != distance_travelled
+    assert heavier_distance_travelled == simulation_model.objective(speed=input_speed)
+
+
+def test_cached_objective(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    cache = simulation_model.enable_cache(resolution=0.1)
+    distance_travelled = simulation_model.objective(speed=input_speed)
+
+    assert simulation_model.objective(speed=input_speed + 0.01) == distance_travelled
+    assert cache.hits == 1 and cache.misses == 1
+    assert simulation_model.get_fingerprint() == simulation.Simulation("ASC").get_fingerprint()
+
+
+def test_cache_cleared_when_car_changes(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    cache = simulation_model.enable_cache(resolution=0.1)
+    distance_travelled = simulation_model.objective(speed=input_speed)
+
+    # results simulated with the original car are not returned for a heavier one
+    simulation_model.basic_motor.vehicle_mass *= 2
+    assert simulation_model.objective(speed=input_speed) != distance_travelled
+    assert cache.hits == 0 and len(cache) == 1
+
+
+def test_distance_gradient_matches_finite_differences(simulation_model):
+    # slow enough that the battery never runs empty, so the distance is smooth in the speed
+    input_speed = np.array([35, 38, 42, 40, 41, 39, 37, 36], dtype=float)
+
+    distance_travelled, distance_gradient, final_soc, soc_gradient = simulation_model.calculate_gradients(input_speed)
+
+    assert distance_travelled == simulation_model.objective(speed=input_speed)
+    assert distance_gradient.shape == soc_gradient.shape == (8,)
+    assert 0 <= final_soc <= 100
+
+    for segment in range(8):
+        step = np.zeros(8)
+        step[segment] = 0.5
+        finite_difference = (simulation_model.objective(speed=input_speed + step) -
+                             simulation_model.objective(speed=input_speed - step)) / 1.0
+
+        assert np.isclose(distance_gradient[segment], finite_difference, rtol=1e-3, atol=1e-6)
+
+
+def test_with_fidelity(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    assert simulation_model.with_fidelity().objective(speed=input_speed) == simulation_model.objective(input_speed)
+
+    coarse_model = simulation_model.with_fidelity(tick=60, route_stride=50)
+
+    assert coarse_model.context.num_ticks == simulation_model.simulation_duration // 60
+    assert simulation_model.tick == 1 and simulation_model.context.num_ticks == simulation_model.simulation_duration
+    assert coarse_model.objective(speed=input_speed) == pytest.approx(simulation_model.objective(input_speed),
+                                                                      rel=0.05)
+
+
+def test_run_stream_matches_run_batch(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    # a chunk length that does not divide the simulation duration, so the last chunk is shorter
+    chunks = list(simulation_model.run_stream(input_speed, chunk_duration=5000))
+    result = simulation_model.run_batch(input_speed[np.newaxis, :])
+
+    assert sum(len(chunk.arrays[0]) for chunk in chunks) == len(simulation_model.context.timestamps)
+    assert np.all(np.diff([chunk.distance_travelled for chunk in chunks]) >= 0)
+
+    assert chunks[-1].distance_travelled == result.distance_travelled[0]
+    assert chunks[-1].final_soc == result.final_soc[0]
+    assert chunks[-1].time_taken == str(datetime.timedelta(seconds=int(result.time_taken[0])))
+
+
+@pytest.mark.parametrize("input_speed, expected_distance, expected_final_soc", [
+    ([40] * 8, 360.00000000016115, 27.430803134793624),
+    ([20, 60, 45, 80, 30, 70, 55, 25], 168.69722222221748, 0.),
+    ([90] * 8, 84.75000000000215, 0.),
+    ([55], 203.36250000004316, 0.),
+])
+def test_distances_match_whole_forecast_roll(simulation_model, input_speed, expected_distance, expected_final_soc):
+    # recorded before only the wind columns of the weather forecast were rolled instead of the whole forecast
+    input_speed = np.array(input_speed)
+
+    assert simulation_model.run_model(speed=input_speed, plot_results=False) == pytest.approx(expected_distance,
+                                                                                             rel=1e-12)
+    assert simulation_model.objective(speed=input_speed) == pytest.approx(expected_distance, rel=1e-12)
+
+    result = simulation_model.run_batch(input_speed[np.newaxis, :])
+    assert result.final_soc[0] == pytest.approx(expected_final_soc, rel=1e-12)
+
+
+def test_parallel_optimization(simulation_model):
+    from bayes_opt import BayesianOptimization, UtilityFunction
+
+    bounds = {f"x{i}": (20, 80) for i in range(8)}
+    optimizer = BayesianOptimization(f=None, pbounds=bounds, verbose=0, random_state=0)
+
+    simulation_model._Simulation__maximize_in_parallel(optimizer, bounds, init_points=4, n_iter=3,
+                                                       utility=UtilityFunction(kind='ucb', kappa=10, xi=1e-1),
+                                                       workers=2, batch_size=2)
+
+    # every point evaluated by the workers is registered with the distance of that point
+    assert len(optimizer.space) == 7
+    distances = simulation_model.run_batch(optimizer.space.params).distance_travelled
+    assert np.array_equal(optimizer.space.target, distances)
+    assert optimizer.max["target"] == np.max(distances)
+
+    result = simulation_model.optimize(init_points=4, n_iter=2, workers=2, batch_size=2)
+    speed = np.array(list(result["params"].values()))
+    assert result["target"] == simulation_model.run_batch(speed[np.newaxis, :]).distance_travelled[0]
@@ -0,0 +1,33 @@
+import simulation
+import numpy as np
+import pytest
+
+from simulation.main import Replanner
+
+
+@pytest.fixture(scope="module")
+def replanner():
+    return Replanner(simulation.Simulation("ASC"))
+
+
+def test_replan_from_current_state(replanner):
+    simulation_model = replanner.simulation_model
+    wall_clock_time = simulation_model.time_of_initialization + 30000
+
+    plan = replanner.replan(distance=300.2, state_of_charge=0.3, wall_clock_time=wall_clock_time)
+
+    assert replanner.latest_plan is plan
+    assert replanner.latency < 1
+    assert plan.segment_boundaries[0] == 300.2
+    assert plan.departure_times[0] >= 30000
+    assert np.all(plan.arrival_times <= simulation_model.simulation_duration)
+
+
+def test_replan_outside_of_race(replanner):
+    time_of_initialization = replanner.simulation_model.time_of_initialization
+
+    with pytest.raises(ValueError):
+        replanner.replan(distance=0, state_of_charge=1, wall_clock_time=time_of_initialization - 1)
+
+    with pytest.raises(ValueError):
+        replanner.replan(distance=-5, state_of_charge=1, wall_clock_time=time_of_initialization)
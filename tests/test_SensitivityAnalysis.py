@@ -0,0 +1,45 @@
+import simulation
+import numpy as np
+import pytest
+
+from simulation.main import SensitivityAnalysis
+
+
+@pytest.fixture(scope="module")
+def simulation_model():
+    # Initialises the Simulation object as a PyTest fixture so it can be used in all subsequent test functions
+    return simulation.Simulation("ASC")
+
+
+def test_nominal_parameters_match_run_batch(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    sensitivity_analysis = SensitivityAnalysis(simulation_model, input_speed)
+    nominal_parameters = [getattr(getattr(simulation_model, component), name)
+                          for name, component in SensitivityAnalysis.PARAMETERS.items()]
+
+    distances = sensitivity_analysis.evaluate(np.tile(nominal_parameters, (2, 1)))
+
+    assert np.all(distances == simulation_model.run_batch(input_speed[np.newaxis, :]).distance_travelled[0])
+
+    # the car components of the Simulation object are left untouched
+    assert simulation_model.basic_motor.vehicle_mass == nominal_parameters[0]
+
+
+def test_morris_ranking(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    sensitivity_analysis = SensitivityAnalysis(simulation_model, input_speed,
+                                               parameter_bounds={"drag_coefficient": None, "tire_radius": None})
+    report = sensitivity_analysis.morris(num_trajectories=3, seed=0)
+
+    assert report["num_simulations"] == 9
+    assert report["ranking"] == ["drag_coefficient", "tire_radius"]
+
+    # more drag always means less distance
+    assert report["indices"]["drag_coefficient"]["mu"] < 0
+
+
+def test_unknown_parameter(simulation_model):
+    with pytest.raises(ValueError):
+        SensitivityAnalysis(simulation_model, np.full(8, 40), parameter_bounds={"wing_span": (1, 2)})
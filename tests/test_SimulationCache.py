@@ -0,0 +1,42 @@
+import numpy as np
+
+from simulation.main.SimulationCache import SimulationCache
+
+
+def test_cache_quantized_keys():
+    cache = SimulationCache("fingerprint", resolution=0.5)
+
+    cache.put(np.array([20.1, 39.8]), 100)
+
+    assert cache.get(np.array([20.0, 40.0])) == 100
+    assert cache.get(np.array([19.9, 40.2])) == 100
+    assert cache.get(np.array([21.0, 40.0])) is None
+    assert cache.hits == 2 and cache.misses == 1
+    assert np.all(cache.quantize(np.array([20.1, 39.8])) == np.array([20.0, 40.0]))
+
+
+def test_cache_evicts_least_recently_used():
+    cache = SimulationCache("fingerprint", resolution=1, max_size=2)
+
+    cache.put(np.array([10]), 1)
+    cache.put(np.array([20]), 2)
+    cache.get(np.array([10]))
+    cache.put(np.array([30]), 3)
+
+    assert len(cache) == 2
+    assert cache.get(np.array([20])) is None
+    assert cache.get(np.array([10])) == 1
+    assert cache.get(np.array([30])) == 3
+
+
+def test_cache_persistence(tmp_path):
+    cache_file = tmp_path / "cache.pkl"
+
+    cache = SimulationCache("fingerprint", cache_file=cache_file)
+    cache.put(np.array([20, 30]), 150)
+    cache.save()
+
+    assert SimulationCache("fingerprint", cache_file=cache_file).get(np.array([20, 30])) == 150
+
+    # results of a different route, weather or settings are ignored
+    assert len(SimulationCache("other fingerprint", cache_file=cache_file)) == 0
@@ -0,0 +1,60 @@
+import simulation
+import numpy as np
+import pytest
+
+from simulation.main import SimulationContext
+
+
+@pytest.fixture
+def simulation_model():
+    # Initialises the Simulation object as a PyTest fixture so it can be used in all subsequent test functions
+    return simulation.Simulation("ASC")
+
+
+def test_context_is_immutable(simulation_model):
+    context = simulation_model.context
+
+    with pytest.raises(AttributeError):
+        context.tick = 5
+
+    with pytest.raises(ValueError):
+        context.not_charge[0] = True
+
+    # the arrays owned by the route objects are not affected
+    assert simulation_model.gis.path_elevations.flags.writeable
+
+
+def test_context_not_charge(simulation_model):
+    context = simulation_model.context
+
+    simulation_hours = np.arange(simulation_model.start_hour,
+                                 simulation_model.start_hour + simulation_model.simulation_duration / 3600)
+    simulation_hours_by_second = np.append(np.repeat(simulation_hours, 3600),
+                                           simulation_model.start_hour +
+                                           simulation_model.simulation_duration / 3600).astype(int)
+    expected_not_charge = np.logical_and(simulation_hours_by_second % 24 > 8, simulation_hours_by_second % 24 < 18)
+
+    assert np.all(context.not_charge == expected_not_charge)
+    assert context.tick_array[0] == 0 and np.all(context.tick_array[1:] == simulation_model.tick)
+    assert context.motion_tick_array.dtype == np.float64
+    assert context.motion_tick_array[0] == 0 and np.all(context.motion_tick_array[1:] == simulation_model.tick)
+
+
+def test_context_route(simulation_model):
+    context = simulation_model.context
+
+    assert context.max_route_distance == np.cumsum(simulation_model.gis.path_distances)[-1]
+    assert context.route_length == pytest.approx(context.max_route_distance / 1000)
+
+
+def test_context_route_stride(simulation_model):
+    context = simulation_model.context
+    coarse_context = SimulationContext(simulation_model.tick, simulation_model.simulation_duration,
+                                       simulation_model.start_hour, simulation_model.gis,
+                                       simulation_model.weather, route_stride=50)
+
+    # the coordinates kept are every 50th one and the last one, and the route length does not change
+    assert np.array_equal(coarse_context.route_coords[:-1], context.route_coords[::50])
+    assert np.array_equal(coarse_context.route_coords[-1], context.route_coords[-1])
+    assert coarse_context.max_route_distance == pytest.approx(context.max_route_distance)
+    assert len(coarse_context.path_gradients) == len(coarse_context.route_coords) - 1
@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+import pytest
+
+from simulation.common.exceptions import SimulationServerError
+from simulation.main import SimulationClient, SimulationServer, SpeedPlanner
+
+
+@pytest.fixture(scope="module")
+def simulation_server():
+    # the server listens on a free port, chosen by the operating system
+    server = SimulationServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="module")
+def simulation_client(simulation_server):
+    host, port = simulation_server.server_address
+    return SimulationClient(f"http://{host}:{port}")
+
+
+def test_client_matches_simulation(simulation_server, simulation_client):
+    simulation_model = simulation_server.simulations["ASC"]
+    speed_matrix = np.array([[20, 60, 45, 80, 30, 70, 55, 25],
+                             [40, 40, 40, 40, 40, 40, 40, 40]])
+
+    assert simulation_client.run_model(speed_matrix[0]) == simulation_model.run_model(speed_matrix[0],
+                                                                                      plot_results=False)
+
+    result = simulation_client.run_batch(speed_matrix, chunk_size=2)
+    expected_result = simulation_model.run_batch(speed_matrix)
+
+    assert np.array_equal(result.distance_travelled, expected_result.distance_travelled)
+    assert np.array_equal(result.time_taken, expected_result.time_taken)
+    assert np.array_equal(result.final_soc, expected_result.final_soc)
+
+
+def test_client_plan(simulation_server, simulation_client):
+    plan = simulation_client.plan(objective="time", target_distance=100)
+    expected_plan = SpeedPlanner(simulation_server.simulations["ASC"]).plan(objective="time", target_distance=100)
+
+    assert np.array_equal(plan.speeds, expected_plan.speeds)
+    assert plan.time_taken == expected_plan.time_taken
+
+
+def test_concurrent_requests(simulation_client):
+    speeds = [np.full(8, speed) for speed in [30, 50, 70, 90]]
+    distances = [None] * len(speeds)
+
+    def run(i):
+        distances[i] = simulation_client.run_model(speeds[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(speeds))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert distances == [simulation_client.run_model(speed) for speed in speeds]
+
+
+def test_server_errors(simulation_client):
+    with pytest.raises(SimulationServerError, match="400"):
+        SimulationClient(simulation_client.url, race_type="FSGP").run_model(np.full(8, 40))
+
+    # the end of the route cannot be reached within the simulation duration
+    with pytest.raises(SimulationServerError, match="400"):
+        simulation_client.plan(objective="time")
+
+    assert simulation_client.get_status()["race_types"] == ["ASC"]
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import simulation
+
+
+@pytest.fixture
+def solar_calculations():
+    return simulation.SolarCalculations()
+
+
+def test_calculate_solar_irradiance_intermediates(solar_calculations):
+    latitude = np.array([39.0918, 40.8838, 42.5840])
+    longitude = np.array([-94.4172, -98.3734, -114.4703])
+    time_zone_utc = np.array([-18000., -18000., -21600.])
+    day_of_year = np.array([216, 216, 217])
+    local_time = np.array([7.5, 12.25, 19.0])
+    elevation = np.array([250., 600., 1400.])
+    cloud_cover = np.array([0., 50., 100.])
+
+    result = solar_calculations.calculate_solar_irradiance(latitude, longitude, time_zone_utc, day_of_year,
+                                                           local_time, elevation, cloud_cover,
+                                                           return_intermediates=True)
+
+    expected_hour_angle = solar_calculations.calculate_hour_angle(time_zone_utc, day_of_year, local_time, longitude)
+    expected_zenith_angle = solar_calculations.calculate_zenith_angle(latitude, longitude, time_zone_utc,
+                                                                      day_of_year, local_time)
+
+    assert np.all(result["hour_angle"] == expected_hour_angle)
+    assert np.all(result["zenith_angle"] == expected_zenith_angle)
+    assert np.all(result["DHI"] == 0.1 * result["DNI"])
+    assert np.allclose(result["GHI"], (1 - cloud_cover / 100) *
+                       (result["DNI"] * np.cos(np.radians(expected_zenith_angle)) + result["DHI"]))
+    assert np.all(solar_calculations.calculate_GHI(latitude, longitude, time_zone_utc, day_of_year, local_time,
+                                                   elevation, cloud_cover) == result["GHI"])
+    assert result["GHI"][-1] == 0
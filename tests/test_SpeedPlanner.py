@@ -0,0 +1,64 @@
+import simulation
+import numpy as np
+import pytest
+
+from simulation.main import SpeedPlan, SpeedPlanner
+
+
+@pytest.fixture(scope="module")
+def simulation_model():
+    # Initialises the Simulation object as a PyTest fixture so it can be used in all subsequent test functions
+    return simulation.Simulation("ASC")
+
+
+@pytest.fixture(scope="module")
+def speed_planner(simulation_model):
+    return SpeedPlanner(simulation_model)
+
+
+def test_speed_plan_speed_array():
+    plan = SpeedPlan(segment_boundaries=np.array([0, 1, 2]), speeds=np.array([36, 72]),
+                     departure_times=np.array([100, 300]), arrival_times=np.array([200, 350]),
+                     state_of_charge=np.array([0.5, 0.45, 0.4]))
+
+    speed_array = plan.get_speed_array(np.array([100, 101, 200, 250, 301, 350, 400]))
+
+    assert np.array_equal(speed_array, [0, 36, 36, 0, 72, 72, 0])
+    assert plan.distance_travelled == 2 and plan.time_taken == 150 and plan.final_soc == pytest.approx(40)
+
+
+def test_distance_plan_matches_simulation(simulation_model, speed_planner):
+    plan = speed_planner.plan(objective="distance")
+
+    assert np.all(np.isin(plan.speeds, speed_planner.speeds))
+    assert np.all(plan.state_of_charge >= 0)
+    assert np.all(plan.departure_times[1:] >= plan.arrival_times[:-1])
+    assert plan.arrival_times[-1] <= simulation_model.simulation_duration
+
+    # the car may not leave while it is charging
+    departure_ticks = np.ceil(plan.departure_times).astype(int) // simulation_model.tick
+    assert np.all(simulation_model.context.not_charge[departure_ticks])
+
+    speed_array = plan.get_speed_array(simulation_model.context.timestamps[1:])
+    assert simulation_model.objective(speed=speed_array) == pytest.approx(plan.distance_travelled, rel=0.02)
+
+
+def test_time_plan(speed_planner):
+    distance_plan = speed_planner.plan(objective="distance")
+    time_plan = speed_planner.plan(objective="time", target_distance=200)
+
+    assert time_plan.segment_boundaries[-1] == 200
+    assert time_plan.arrival_times[-1] <= distance_plan.arrival_times[np.searchsorted(
+        distance_plan.segment_boundaries[1:], 200)]
+
+    with pytest.raises(ValueError):
+        speed_planner.plan(objective="time")
+
+
+def test_plan_from_middle_of_segment(speed_planner):
+    plan = speed_planner.plan(objective="distance", initial_soc=0.6, start_distance=123.4, start_time=20000)
+
+    assert plan.segment_boundaries[0] == 123.4
+    assert plan.segment_boundaries[1] == pytest.approx(125)
+    assert plan.departure_times[0] >= 20000
+    assert plan.state_of_charge[0] == pytest.approx(0.6, abs=1e-3)
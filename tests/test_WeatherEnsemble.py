@@ -0,0 +1,51 @@
+import simulation
+import numpy as np
+import pytest
+
+from simulation.main import WeatherEnsemble
+
+
+@pytest.fixture(scope="module")
+def simulation_model():
+    # Initialises the Simulation object as a PyTest fixture so it can be used in all subsequent test functions
+    return simulation.Simulation("ASC")
+
+
+def test_unperturbed_ensemble_matches_run_batch(simulation_model):
+    input_speed = np.array([20, 60, 45, 80, 30, 70, 55, 25])
+
+    # run_model ignores cloud cover
+    weather_ensemble = WeatherEnsemble(simulation_model, wind_speed_std=0, wind_direction_std=0, cloud_cover_std=0,
+                                       use_cloud_cover=False)
+    ensemble_result = weather_ensemble.run_realizations(input_speed, 2)
+    batch_result = simulation_model.run_batch(input_speed[np.newaxis, :])
+
+    assert np.all(ensemble_result.distance_travelled == batch_result.distance_travelled[0])
+    assert np.all(ensemble_result.time_taken == batch_result.time_taken[0])
+    assert np.all(ensemble_result.final_soc == batch_result.final_soc[0])
+
+
+def test_ensemble_report(simulation_model):
+    input_speed = np.full(8, 40)
+
+    weather_ensemble = WeatherEnsemble(simulation_model)
+    result, report = weather_ensemble.run(input_speed, num_realizations=10, chunk_size=4, seed=0)
+    repeated_result, _ = weather_ensemble.run(input_speed, num_realizations=10, chunk_size=4, seed=0)
+
+    assert result.distance_travelled.shape == (10,)
+    assert np.array_equal(result.distance_travelled, repeated_result.distance_travelled)
+
+    assert report["num_realizations"] == 10
+    assert report["realizations_per_second"] > 0
+    assert report["distance"]["min"] <= report["distance"]["p50"] <= report["distance"]["max"]
+    assert report["distance"]["mean"] == pytest.approx(np.mean(result.distance_travelled))
+
+
+def test_cloud_cover_perturbed_by_default(simulation_model):
+    input_speed = np.full(8, 30)
+
+    weather_ensemble = WeatherEnsemble(simulation_model, wind_speed_std=0, wind_direction_std=0)
+    result, _ = weather_ensemble.run(input_speed, num_realizations=4, chunk_size=4, seed=0)
+
+    # the battery runs out, so cloud cover errors change how far the car gets
+    assert np.ptp(result.distance_travelled) > 0
@@ -0,0 +1,28 @@
+import simulation
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def weather():
+    return simulation.Simulation("ASC").weather
+
+
+def test_get_weather_forecast_time_indices(weather):
+    forecast_times = weather.weather_forecast[:, :, 4]
+    rng = np.random.default_rng(0)
+
+    # timestamps before, between, on, halfway between and after the forecast times of every coordinate
+    indices = rng.integers(0, len(forecast_times), 5000)
+    unix_timestamps = rng.uniform(forecast_times.min() - 7200, forecast_times.max() + 7200, 5000).round()
+    unix_timestamps[:100] = forecast_times[indices[:100], 3]
+    unix_timestamps[100:200] = (forecast_times[indices[100:200], 3] + forecast_times[indices[100:200], 4]) / 2
+
+    expected_indices = np.array([np.argmin(np.abs(forecast_times[index] - timestamp))
+                                 for index, timestamp in zip(indices, unix_timestamps)])
+
+    result = weather.get_weather_forecast_time_indices(indices, unix_timestamps)
+    assert np.array_equal(result, expected_indices)
+
+    batch_result = weather.get_weather_forecast_time_indices(indices.reshape(2, -1), unix_timestamps.reshape(2, -1))
+    assert np.array_equal(batch_result, expected_indices.reshape(2, -1))
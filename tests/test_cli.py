@@ -0,0 +1,42 @@
+import json
+
+import simulation
+import numpy as np
+import pytest
+
+from simulation import cli
+
+
+@pytest.fixture(scope="module")
+def simulation_model():
+    # Initialises the Simulation object as a PyTest fixture so it can be used in all subsequent test functions
+    return simulation.Simulation("ASC")
+
+
+def test_run_command(simulation_model, capsys):
+    input_speed = [20, 60, 45, 80, 30, 70, 55, 25]
+
+    cli.main(["run", "--speed", *map(str, input_speed), "--quiet"])
+    output = json.loads(capsys.readouterr().out)
+
+    assert output["command"] == "run"
+    assert output["distance_travelled"] == simulation_model.run_model(np.array(input_speed), plot_results=False)
+    assert set(output["timings"]) == {"setup", "run", "total"}
+
+
+def test_sweep_command(simulation_model, capsys):
+    cli.main(["sweep", "--speeds", "30", "50", "70"])
+    captured = capsys.readouterr()
+    output = json.loads(captured.out)
+
+    # the progress of the simulation is printed to stderr
+    assert captured.err
+
+    expected_distances = simulation_model.run_batch(np.repeat([[30], [50], [70]], 8, axis=1)).distance_travelled
+    assert output["distance_travelled"] == list(expected_distances)
+    assert output["best_speed"] == [30, 50, 70][np.argmax(expected_distances)]
+
+
+def test_invalid_command():
+    with pytest.raises(SystemExit):
+        cli.main(["fly"])
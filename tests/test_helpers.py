@@ -28,6 +28,97 @@ def test_find_runs1():
     assert (expected_output_run_lengths == test_output_run_lengths).all()
 
 
+def test_find_nearest_sorted_indices():
+    sorted_values = np.array([0., 30., 60., 90., 120.])
+    test_values = np.array([-10., 0., 14., 15., 16., 100., 105., 119., 500.])
+
+    expected_indices = np.array([np.argmin(np.abs(sorted_values - value)) for value in test_values])
+
+    result = helpers.find_nearest_sorted_indices(sorted_values, test_values)
+
+    assert (result == expected_indices).all()
+    assert (result == np.array([0, 0, 0, 0, 1, 3, 3, 4, 4])).all()
+
+
+def test_calculate_path_bearings():
+    # north, east, south, west along the equator / prime meridian
+    test_coords = np.array([[0., 0.], [1., 0.], [1., 1.], [0., 1.], [0., 0.]])
+    expected_bearings = np.array([0., 90., 180., 270., 270.])
+
+    result = helpers.calculate_path_bearings(test_coords)
+    assert np.allclose(result, expected_bearings, atol=1e-2)
+
+    batch_result = helpers.calculate_path_bearings(np.stack((test_coords, test_coords[::-1])))
+    assert np.allclose(batch_result[0], result)
+    assert np.allclose(batch_result[1], np.array([90., 0., 270., 180., 180.]), atol=1e-2)
+
+
+def test_add_acceleration():
+    # expected outputs are those of the previous nested while-loop implementation
+    test_speeds_1 = np.array([0, 0, 5, 5, 5, 5, 5, 5, 2, 2, 2, 2, 2, 2])
+    expected_speeds_1 = np.array([0, 0, 1, 2, 3, 4, 5, 5, 4, 3, 2, 2, 2, 2])
+
+    test_speeds_2 = np.array([10, 10, 4, 4, 4, 4, 8, 8, 8, 8, 8, 8])
+    expected_speeds_2 = np.array([10, 10, 8, 6, 4, 4, 6, 8, 8, 8, 8, 8])
+
+    assert np.all(helpers.add_acceleration(test_speeds_1, 3600) == expected_speeds_1)
+    assert np.all(helpers.add_acceleration(test_speeds_2, 3600 * 2) == expected_speeds_2)
+
+
+def test_add_acceleration_does_not_overshoot():
+    # the previous implementation produced [0, 2, 4, 3, 3, 1, -1, 1, 3, 5, 7, 6, 6, 6, 6] here
+    test_speeds = np.array([0, 3, 3, 3, 3, 0, 0, 6, 6, 6, 6, 6, 6, 6, 6])
+    expected_speeds = np.array([0, 2, 3, 3, 3, 1, 0, 2, 4, 6, 6, 6, 6, 6, 6])
+
+    assert np.all(helpers.add_acceleration(test_speeds, 7200) == expected_speeds)
+
+
+def test_add_acceleration_batch():
+    test_speeds = np.array([[0, 0, 5, 5, 5, 5, 5, 5, 2, 2, 2, 2, 2, 2],
+                            [0, 3, 3, 3, 3, 0, 0, 6, 6, 6, 6, 6, 6, 6]])
+
+    result = helpers.add_acceleration(test_speeds, 3600)
+
+    assert result.shape == test_speeds.shape
+    for row in range(test_speeds.shape[0]):
+        assert np.all(result[row] == helpers.add_acceleration(test_speeds[row], 3600))
+
+
+def test_reshape_and_repeat_batch():
+    test_speeds = np.array([[10, 20, 30],
+                            [40, 50, 60]])
+
+    result = helpers.reshape_and_repeat(test_speeds, 8)
+
+    assert result.shape == (2, 8)
+    for row in range(test_speeds.shape[0]):
+        assert np.all(result[row] == helpers.reshape_and_repeat(test_speeds[row], 8))
+    assert np.all(result[1] == np.array([40, 40, 50, 50, 60, 60, 60, 60]))
+
+
+def _scale_by_worker_object(value):
+    return helpers.get_worker_object() * value
+
+
+def test_make_worker_pool():
+    with helpers.make_worker_pool(np.array([1., 2.]), 2) as pool:
+        results = pool.map(_scale_by_worker_object, [1, 2, 3])
+
+    assert np.array_equal(np.stack(results), [[1, 2], [2, 4], [3, 6]])
+    assert helpers.get_worker_object() is None
+
+
+def test_get_acceleration_source_indices():
+    input_array = np.array([0, 0, 0.3, 0.3, 0.3, 0.3, 0, 0, 0.1])
+
+    source_indices = helpers.get_acceleration_source_indices(input_array, 500)
+
+    # ticks that are still ramping towards a set-point depend on the speed they ramped from
+    assert np.array_equal(source_indices, [0, 1, 1, 1, 4, 5, 5, 5, 8])
+    assert np.array_equal(helpers.add_acceleration(input_array, 500) == input_array[source_indices],
+                          [True, True, False, False, True, True, False, False, True])
+
+
 if __name__ == "__main__":
     test_find_runs1()
     test_checkForNonConsecutiveZeros()
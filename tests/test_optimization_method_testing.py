@@ -0,0 +1,39 @@
+import simulation
+import numpy as np
+import pytest
+
+from optimization import optimization_method_testing
+from simulation.common import helpers
+
+
+@pytest.fixture(scope="module")
+def simulation_model():
+    return simulation.Simulation("ASC")
+
+
+def test_negative_population_distances(simulation_model):
+    # scipy passes the population with one speed profile per column
+    speed_matrix = np.random.default_rng(0).uniform(20, 104, (8, 5))
+    expected_distances = simulation_model.run_batch(speed_matrix.T).distance_travelled
+
+    serial_distances = optimization_method_testing.negative_population_distances(speed_matrix, simulation_model,
+                                                                                  chunk_size=2)
+
+    with helpers.make_worker_pool(simulation_model, 2) as pool:
+        pooled_distances = optimization_method_testing.negative_population_distances(
+            speed_matrix, simulation_model, chunk_size=2, pool=pool, workers=2)
+
+    assert np.array_equal(serial_distances, -expected_distances)
+    assert np.array_equal(pooled_distances, serial_distances)
+    assert optimization_method_testing.negative_population_distances(speed_matrix[:, 0], simulation_model) == \
+        serial_distances[0]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_vectorized_differential_evolution_optimization(workers):
+    # polishing runs L-BFGS-B with finite differences, one simulation per call, so it is left out here
+    optimal_speed = optimization_method_testing.vectorized_differential_evolution_optimization(
+        workers=workers, maxiter=1, polish=False)
+
+    assert optimal_speed.shape == (8,)
+    assert np.all((optimal_speed >= 20) & (optimal_speed <= 104))
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import numpy as np
+from simulation.common import helpers, time_utils
+
+test_local_times = np.array([1612029600, 1612634399, 1583020800, 1609459199, 1628080245], dtype=np.uint64)
+
+
+def test_get_day_of_year_and_local_hour():
+    expected_day_of_year = []
+    expected_local_hour = []
+    for local_time in test_local_times:
+        date = datetime.utcfromtimestamp(int(local_time))
+        expected_day_of_year.append(helpers.get_day_of_year(date.day, date.month, date.year))
+        expected_local_hour.append(date.hour + (float(date.minute * 60 + date.second) / 3600))
+
+    day_of_year, local_hour = time_utils.get_day_of_year_and_local_hour(test_local_times)
+
+    assert (day_of_year == np.array(expected_day_of_year)).all()
+    assert (local_hour == np.array(expected_local_hour)).all()
+
+
+def test_get_hour_of_day():
+    expected_hours = np.array([helpers.hour_from_unix_timestamp(int(local_time)) for local_time in test_local_times])
+
+    assert (time_utils.get_hour_of_day(test_local_times) == expected_hours).all()
+
+
+def test_get_local_date():
+    expected_dates = np.array([datetime.utcfromtimestamp(int(local_time)).date() for local_time in test_local_times],
+                              dtype="datetime64[D]")
+
+    assert (time_utils.get_local_date(test_local_times) == expected_dates).all()
+    assert (time_utils.get_local_date(time_utils.to_datetime64(test_local_times)) == expected_dates).all()